@@ -0,0 +1,210 @@
+import asyncio
+import json
+from typing import Awaitable, Callable, Dict, Optional, Set, Union
+
+from fastapi import APIRouter, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from starlette.requests import ClientDisconnect
+
+from api_routes.routers import EVENT_HANDLERS
+from src.core.lifecycle import lifecycle
+from src.core.metrics import INGEST_EVENTS_TOTAL
+from src.core.settings import settings
+from src.core.tracing import TraceContext, tracer
+
+router = APIRouter(prefix="/book-eat/api/v1", tags=["order event stream"])
+
+Ack = Callable[[dict], Awaitable[None]]
+
+
+class IngestStream:
+    """Обработка потока событий заказа из одного соединения.
+
+    Событие — JSON ``{"id": ..., "type": "send_chat" | "edit_chat", "data": {...}}``,
+    где ``data`` — тело соответствующего эндпоинта. Одновременно в работе не
+    больше ``max_in_flight`` событий: пока мест нет, следующее событие не
+    читается, и отправитель упирается в буферы соединения. События одного
+    заказа выполняются по порядку, разных заказов — параллельно. На каждое
+    событие отправляется подтверждение с его ``id``. Каждое событие — своя
+    трасса; поле ``traceparent`` события продолжает трассу отправителя.
+    """
+
+    def __init__(self, ack: Ack, transport: str, max_in_flight: Optional[int] = None):
+        self._ack = ack
+        self._transport = transport
+        self._slots = asyncio.Semaphore(max_in_flight or settings.INGEST_MAX_IN_FLIGHT)
+        self._tasks: Set[asyncio.Task] = set()
+        # Последнее событие каждого заказа, за которым встаёт следующее
+        self._tails: Dict[str, asyncio.Task] = {}
+
+    async def submit(self, raw: Union[str, bytes]) -> None:
+        """Принимает событие; ждёт, если в работе уже ``max_in_flight`` событий."""
+        await self._slots.acquire()
+        try:
+            event = json.loads(raw)
+            if not isinstance(event, dict):
+                raise ValueError("event must be a JSON object")
+        except ValueError as e:
+            await self._reply({"status": 400, "message": f"Invalid event: {e}"})
+            return
+        event_id = event.get("id")
+        kind = event.get("type")
+        data = event.get("data")
+        if kind not in EVENT_HANDLERS or not isinstance(data, dict):
+            await self._reply({
+                "id": event_id,
+                "type": kind,
+                "status": 400,
+                "message": f"Event type must be one of {sorted(EVENT_HANDLERS)} with a data object.",
+            })
+            return
+        if lifecycle.draining:
+            await self._reply(
+                {"id": event_id, "type": kind, "status": 503, "message": "Server is shutting down."}
+            )
+            return
+
+        message = data.get("message")
+        order_id = message.get("id") if isinstance(message, dict) else None
+        previous = self._tails.get(order_id) if order_id is not None else None
+        parent = TraceContext.parse(event.get("traceparent")) if tracer.enabled else None
+        task = asyncio.create_task(self._process(event_id, kind, data, previous, parent))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        if order_id is not None:
+            self._tails[order_id] = task
+            task.add_done_callback(lambda done: self._forget_tail(order_id, done))
+
+    def _forget_tail(self, order_id: str, task: asyncio.Task) -> None:
+        if self._tails.get(order_id) is task:
+            del self._tails[order_id]
+
+    async def _process(
+        self,
+        event_id,
+        kind: str,
+        data: dict,
+        previous: Optional[asyncio.Task],
+        parent: Optional[TraceContext],
+    ) -> None:
+        with lifecycle.track(), tracer.span(
+            f"ingest.{kind}", parent=parent, root=True,
+            transport=self._transport, event_id=event_id,
+        ) as span:
+            if previous is not None:
+                await asyncio.wait([previous])
+            try:
+                result = await EVENT_HANDLERS[kind](data)
+            except Exception as e:
+                result = {"status": 500, "message": f"An error occurred: {str(e)}"}
+            result.pop("response_data", None)
+            span.set(status=result["status"])
+            await self._reply({"id": event_id, "type": kind, **result})
+
+    async def _reply(self, ack: dict) -> None:
+        INGEST_EVENTS_TOTAL.inc(transport=self._transport, status=ack["status"])
+        try:
+            await self._ack(ack)
+        except Exception:
+            # Соединение закрыто: событие выполнено, подтверждение некуда отправить
+            pass
+        finally:
+            self._slots.release()
+
+    async def drain(self) -> None:
+        """Дожидается всех принятых событий."""
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+def encode_ack(ack: dict) -> str:
+    return json.dumps(ack, ensure_ascii=False, default=str)
+
+
+@router.websocket("/ingest/ws")
+async def ingest_websocket(websocket: WebSocket):
+    """Поток событий заказа по WebSocket: событие или подтверждение в каждом сообщении."""
+    if lifecycle.draining:
+        # 1013 — «попробуйте позже»
+        await websocket.close(code=1013)
+        return
+    await websocket.accept()
+    send_lock = asyncio.Lock()
+
+    async def ack(payload: dict) -> None:
+        async with send_lock:
+            await websocket.send_text(encode_ack(payload))
+
+    stream = IngestStream(ack, "websocket")
+    try:
+        while True:
+            await stream.submit(await websocket.receive_text())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        # Принятые события выполняются и после закрытия соединения
+        await stream.drain()
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """Потоковый ответ, который отправляется, пока тело запроса ещё читается.
+
+    Обычный ``StreamingResponse`` сам читает ``receive`` в ожидании разрыва
+    соединения и забрал бы части тела запроса; здесь тело читает генератор.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+
+
+@router.post("/ingest/ndjson")
+async def ingest_ndjson(request: Request):
+    """Поток событий заказа в теле запроса, по одному JSON на строку.
+
+    Подтверждения возвращаются в ответе тоже построчно по мере выполнения,
+    не дожидаясь конца запроса.
+    """
+    acks: asyncio.Queue = asyncio.Queue(maxsize=settings.INGEST_MAX_IN_FLIGHT)
+    closed = asyncio.Event()
+
+    async def ack(payload: Optional[dict]) -> None:
+        if not closed.is_set():
+            await acks.put(payload)
+
+    stream = IngestStream(ack, "ndjson")
+
+    async def read() -> None:
+        buffer = b""
+        try:
+            async for chunk in request.stream():
+                buffer += chunk
+                *lines, buffer = buffer.split(b"\n")
+                for line in lines:
+                    if line.strip():
+                        await stream.submit(line)
+            if buffer.strip():
+                await stream.submit(buffer)
+        except ClientDisconnect:
+            pass
+        finally:
+            await stream.drain()
+            await ack(None)
+
+    async def body():
+        reader = asyncio.create_task(read())
+        try:
+            while True:
+                payload = await acks.get()
+                if payload is None:
+                    break
+                yield encode_ack(payload) + "\n"
+        finally:
+            if not reader.done():
+                # Ответ больше не читают: новые события не берутся, принятые
+                # дорабатывают, их подтверждения отбрасываются
+                closed.set()
+                while not acks.empty():
+                    acks.get_nowait()
+                reader.cancel()
+
+    return DuplexStreamingResponse(body(), media_type="application/x-ndjson")
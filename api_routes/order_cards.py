@@ -0,0 +1,324 @@
+import asyncio
+import json
+import time
+from typing import Awaitable, Callable, Iterable, List, Optional
+
+from api_routes.parse_utills import order_message_chunks
+from api_routes.py_models import OrderMessage
+from src.core.edit_coalescer import edit_coalescer
+from src.core.message_state import digest, message_state_store
+from src.core.order_index import OrderMessageRef, OrderTrace, order_index
+from src.core.settings import settings
+from src.core.telegram_client import telegram_client
+from src.core.telegram_scheduler import chat_key
+from src.core.tracing import current_context, tracer
+
+
+def build_order_keyboard(order: OrderMessage, confirm_text: str = "✅ Взять в работу"):
+    """Формирует inline-клавиатуру управления заказом в зависимости от статуса."""
+    status = order.status
+    if status == "PAID":
+        return {
+            "inline_keyboard": [
+                [
+                    {
+                        "text": confirm_text,
+                        "callback_data": f"order_confirm:{order.id}",
+                    },
+                    {
+                        "text": "❌ Отменить заказ",
+                        "callback_data": f"order_cancel:{order.id}",
+                    },
+                ]
+            ]
+        }
+    if status == "IN_PROGRESS":
+        return {
+            "inline_keyboard": [
+                [
+                    {
+                        "text": "✅ Выполнить заказ",
+                        "callback_data": f"order_complete:{order.id}",
+                    },
+                ]
+            ]
+        }
+    return None
+
+
+def order_restaurant(order: OrderMessage) -> str:
+    """Ресторан заказа для метрик и трассировки.
+
+    Берётся ``places.id``: название места — свободный текст и сделало бы
+    число значений метки неограниченным.
+    """
+    return order.places.id or "unknown"
+
+
+async def _send_message(chat_id, text: str, reply_markup: Optional[str] = None) -> dict:
+    response = await telegram_client.send_message(chat_id, text, reply_markup)
+    if response.status != 200:
+        return {
+            "status": response.status,
+            "message": f"Failed to send message to Telegram: {response.text}",
+        }
+    response_data = response.json()
+    message_id = response_data["result"]["message_id"]
+    await message_state_store.remember(chat_id, message_id, text, reply_markup)
+    return {
+        "status": 200,
+        "message": "Message sent to Telegram successfully.",
+        "message_id": message_id,
+        "response_data": response_data,
+    }
+
+
+async def _edit_message(
+    chat_id, message_id: int, text: str, reply_markup: Optional[str] = None
+) -> dict:
+    """Меняет текст и клавиатуру сообщения, пропуская правки без изменений."""
+    # Не тратим запрос к Telegram, если на экране уже то же самое
+    text_digest = digest(text)
+    previous = await message_state_store.get(chat_id, message_id, text_digest)
+    if previous is not None and previous.text_digest == text_digest:
+        if previous.markup_digest == digest(reply_markup):
+            message_state_store.skipped_edits += 1
+            return {"status": 200, "message": "Message is not modified."}
+        message_state_store.markup_only_edits += 1
+        response = await telegram_client.edit_message_reply_markup(
+            chat_id, message_id, reply_markup
+        )
+    else:
+        response = await telegram_client.edit_message_text(
+            chat_id, message_id, text, reply_markup
+        )
+
+    if response.status == 200:
+        result = {
+            "status": 200,
+            "message": "Message edited successfully.",
+            "response_data": response.json(),
+        }
+    elif "message is not modified" in response.text:
+        # Telegram уже показывает этот текст — запоминаем и не повторяем
+        result = {"status": 200, "message": "Message is not modified."}
+    else:
+        return {
+            "status": response.status,
+            "message": f"Failed to edit message: {response.text}",
+        }
+    await message_state_store.remember(chat_id, message_id, text, reply_markup)
+    return result
+
+
+async def _delete_message(chat_id, message_id: int) -> dict:
+    response = await telegram_client.delete_message(chat_id, message_id)
+    if response.status != 200:
+        return {
+            "status": response.status,
+            "message": f"Failed to delete message: {response.text}",
+        }
+    response_data = response.json()
+    if not response_data.get("ok"):
+        return {
+            "status": response.status,
+            "message": f"Failed to delete message: {response_data.get('description')}",
+        }
+    await message_state_store.forget(chat_id, message_id)
+    return {
+        "status": 200,
+        "message": "Message deleted successfully.",
+        "response_data": response_data,
+    }
+
+
+async def _sync_parts(chat_id, message_id: int, chunks: Iterable[str]) -> Optional[dict]:
+    """Приводит продолжения карточки к новым частям текста.
+
+    Существующие продолжения правятся (неизменные пропускаются), недостающие
+    отправляются, лишние удаляются. Возвращает ошибку первой неудачной части.
+    """
+    existing = await order_index.parts(chat_id, message_id)
+    part_ids: List[int] = []
+    error = None
+    for number, text in enumerate(chunks):
+        if number < len(existing):
+            result = await _edit_message(chat_id, existing[number], text)
+            part_id = existing[number]
+        else:
+            result = await _send_message(chat_id, text)
+            part_id = result.get("message_id")
+        if result["status"] != 200:
+            error = result
+            break
+        part_ids.append(part_id)
+    if error is None:
+        for stale_id in existing[len(part_ids):]:
+            await _delete_message(chat_id, stale_id)
+    else:
+        # Неотправленные части оставляем в индексе, чтобы потом удалить их вместе с карточкой
+        part_ids.extend(existing[len(part_ids):])
+    if part_ids or existing:
+        await order_index.save_parts(chat_id, message_id, part_ids)
+    return error
+
+
+async def send_order_card(
+    chat_id,
+    chunks: Iterable[str],
+    inline_keyboard=None,
+    order: Optional[OrderMessage] = None,
+    payload: Optional[dict] = None,
+) -> dict:
+    """Отправляет текст заказа, поделённый на сообщения, по порядку.
+
+    Кнопки прикрепляются к первому сообщению; с ``order`` оно попадает в
+    индекс заказов, а остальные сообщения — в его продолжения. В ответе
+    ``message_id`` первого сообщения и ``message_ids`` всех сообщений.
+    """
+    with tracer.span(
+        "order_card.send", chat_id=chat_id, order_id=order.id if order is not None else None
+    ) as span:
+        result = await _send_order_card(chat_id, chunks, inline_keyboard, order, payload)
+        span.set(status=result["status"], message_ids=result.get("message_ids"))
+        return result
+
+
+async def _send_order_card(
+    chat_id,
+    chunks: Iterable[str],
+    inline_keyboard,
+    order: Optional[OrderMessage],
+    payload: Optional[dict],
+) -> dict:
+    chunks = iter(chunks)
+    reply_markup = json.dumps(inline_keyboard) if inline_keyboard else None
+    result = await _send_message(chat_id, next(chunks), reply_markup)
+    if result["status"] != 200:
+        return result
+    message_id = result["message_id"]
+    if order is not None:
+        # Нажатие кнопки продолжит трассу отправки и посчитает время реакции
+        context = current_context()
+        trace = OrderTrace(order_restaurant(order), time.time(), *(context or (None, None)))
+        await order_index.save_message(
+            order.id, payload, chat_id, message_id, order.status, trace
+        )
+
+    message_ids = [message_id]
+    error = None
+    for text in chunks:
+        part = await _send_message(chat_id, text)
+        if part["status"] != 200:
+            error = part
+            break
+        message_ids.append(part["message_id"])
+    if order is not None and len(message_ids) > 1:
+        await order_index.save_parts(chat_id, message_id, message_ids[1:])
+    if error is not None:
+        return {
+            "status": error["status"],
+            "message": f"Sent {len(message_ids)} parts, then: {error['message']}",
+            "message_id": message_id,
+            "message_ids": message_ids,
+        }
+    return {**result, "message_ids": message_ids}
+
+
+async def edit_order_card(
+    chat_id, message_id: int, order: OrderMessage, payload: Optional[dict] = None
+) -> dict:
+    """Перерисовывает карточку заказа в сообщении и его продолжениях.
+
+    Правка, которая ничего не меняет, в Telegram не отправляется; если
+    изменилась только клавиатура, меняется только она. ``payload`` — JSON
+    заказа для индекса, по умолчанию сериализуется модель. С
+    ``EDIT_COALESCE_WINDOW`` частые правки одной карточки склеиваются и
+    уходит только последняя.
+    """
+    result = await edit_coalescer.submit(
+        (chat_key(chat_id), int(message_id)),
+        lambda: _edit_order_card(chat_id, message_id, order, payload),
+    )
+    # Результат общий для склеенных вызовов, каждому — своя копия
+    return dict(result)
+
+
+async def _edit_order_card(
+    chat_id, message_id: int, order: OrderMessage, payload: Optional[dict]
+) -> dict:
+    with tracer.span(
+        "order_card.edit", chat_id=chat_id, message_id=message_id,
+        order_id=order.id, order_status=order.status,
+    ) as span:
+        result = await _edit_order_card_parts(chat_id, message_id, order, payload)
+        span.set(status=result["status"])
+        return result
+
+
+async def _edit_order_card_parts(
+    chat_id, message_id: int, order: OrderMessage, payload: Optional[dict]
+) -> dict:
+    chunks = order_message_chunks(order)
+    inline_keyboard = build_order_keyboard(order, confirm_text="✅ Подтвердить заказ")
+    reply_markup = json.dumps(inline_keyboard) if inline_keyboard else None
+    result = await _edit_message(chat_id, message_id, next(chunks), reply_markup)
+    if result["status"] != 200:
+        return result
+    await order_index.save_message(
+        order.id,
+        payload if payload is not None else order.model_dump(mode="json"),
+        chat_id,
+        message_id,
+        order.status,
+    )
+    error = await _sync_parts(chat_id, message_id, chunks)
+    if error is not None:
+        return {
+            "status": error["status"],
+            "message": f"Message edited, continuation failed: {error['message']}",
+        }
+    return result
+
+
+async def delete_order_card(chat_id, message_id: int) -> dict:
+    """Удаляет сообщение с карточкой заказа вместе с продолжениями и забывает его."""
+    for part_id in await order_index.parts(chat_id, message_id):
+        await _delete_message(chat_id, part_id)
+    result = await _delete_message(chat_id, message_id)
+    if result["status"] == 200:
+        await order_index.remove_message(chat_id, message_id)
+    return result
+
+
+async def _fan_out(
+    refs: List[OrderMessageRef], action: Callable[[OrderMessageRef], Awaitable[dict]]
+) -> List[dict]:
+    semaphore = asyncio.Semaphore(settings.BATCH_SEND_CONCURRENCY)
+
+    async def run_one(ref: OrderMessageRef) -> dict:
+        async with semaphore:
+            try:
+                result = await action(ref)
+            except Exception as e:
+                result = {"status": 500, "message": f"An error occurred: {str(e)}"}
+        result.pop("response_data", None)
+        return {"chat_id": ref.chat_id, "message_id": ref.message_id, **result}
+
+    return list(await asyncio.gather(*(run_one(ref) for ref in refs)))
+
+
+async def refresh_order_cards(
+    order_id: str, order: OrderMessage, payload: Optional[dict] = None
+) -> List[dict]:
+    """Перерисовывает все сообщения заказа параллельно."""
+    refs = await order_index.messages(order_id)
+    return await _fan_out(
+        refs, lambda ref: edit_order_card(ref.chat_id, ref.message_id, order, payload)
+    )
+
+
+async def delete_order_cards(order_id: str) -> List[dict]:
+    """Удаляет все сообщения заказа параллельно."""
+    refs = await order_index.messages(order_id)
+    return await _fan_out(refs, lambda ref: delete_order_card(ref.chat_id, ref.message_id))
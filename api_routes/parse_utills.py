@@ -1,5 +1,96 @@
 import re
 from datetime import datetime, timedelta
+from functools import lru_cache
+from string import Formatter
+from types import MappingProxyType
+from typing import Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from api_routes.py_models import AdditionProduct, Delivery, Number, OrderMessage, Product
+from src.core.cache import LRUCache, content_key
+from src.core.metrics import ORDER_RENDER_SECONDS, REGISTRY
+from src.core.settings import settings
+from src.core.tracing import tracer
+
+# Сокращения месяцев на русском языке
+MONTHS_RU = ("янв.", "февр.", "марта", "апр.", "мая", "июня", "июля",
+             "авг.", "сент.", "октб.", "нояб.", "дек.")
+
+# Смещение московского времени относительно UTC
+MSK_OFFSET = timedelta(hours=3)
+
+DELIVERY_TYPE_MAPPING = MappingProxyType({
+    "DELIVERY": "Доставка",
+    "TO_OUTSIDE": "Самовывоз",
+    "ON_PLACE": "На месте",
+})
+
+STATUS_MAPPING = MappingProxyType({
+    "CANCELLED_BY_PROVIDER": "Отменен кассиром.",
+    "CANCELLED_BY_CLIENT": "Отменен клиентом.",
+    "IN_PROGRESS": "Взят в работу",
+    "PAID": "Оплачен",
+    "CANCELED_BY_TIMEOUT": "Заказ отменён - не был взят в работу",
+    "COMPLETED": "Выполнен",
+})
+
+# Символы, которые экранируются для Telegram Markdown V2
+MARKDOWN_ESCAPE_CHARS = "~`>#=|{}"
+_MARKDOWN_ESCAPE_RE = re.compile("[" + re.escape(MARKDOWN_ESCAPE_CHARS) + "]")
+
+DEFAULT_ORDER_TEMPLATE = (
+    "Заказ №: *{order_number}*\n"
+    "🕒 Время выдачи: *{ready_time}*\n"
+    "📦 Способ получения: *{delivery_type}*\n"
+    "💳 Статус заказа: *{status_text}*\n"
+    "👤 Клиент: *{customer_name}* ({customer_phone})\n"
+    "👥 Количество персон: *{persons_count}*\n\n"
+    "📍 Место: {place_title}\n"
+    "{delivery_info}\n\n"
+    "🛒 Состав заказа:\n"
+    "{products}\n"
+    "{delivery_price}"
+    "💰 Итого: {total_cost} ₽"
+)
+
+TEMPLATE_FIELDS = frozenset({
+    "order_number", "ready_time", "delivery_type", "status_text",
+    "customer_name", "customer_phone", "persons_count", "place_title",
+    "delivery_info", "products", "delivery_price", "total_cost",
+})
+
+
+class OrderTemplate:
+    """Шаблон текста заказа, проверенный и подготовленный один раз.
+
+    Поля шаблона — имена из ``TEMPLATE_FIELDS``; значения подставляются уже
+    экранированными, сам шаблон считается доверенным и не экранируется.
+    """
+
+    def __init__(self, template: str):
+        unknown = {
+            field for _, field, _, _ in Formatter().parse(template)
+            if field is not None
+        } - TEMPLATE_FIELDS
+        if unknown:
+            raise ValueError(f"Unknown template fields: {', '.join(sorted(unknown))}")
+        self.template = template
+        self._render = template.format_map
+
+    def render(self, fields: dict) -> str:
+        return self._render(fields)
+
+
+_default_template = OrderTemplate(DEFAULT_ORDER_TEMPLATE)
+_status_templates = {}
+
+
+def register_status_template(status: str, template: str) -> None:
+    """Задаёт собственный шаблон текста для заказов с указанным статусом."""
+    _status_templates[status] = OrderTemplate(template)
+
+
+def get_status_template(status: str) -> OrderTemplate:
+    return _status_templates.get(status, _default_template)
 
 
 def format_date(date_string):
@@ -11,148 +102,401 @@ def format_date(date_string):
     Returns:
         Строка с форматированной датой.
     """
-    # Парсим строку в объект datetime
-    date_obj = datetime.fromisoformat(date_string.replace("Z", "+00:00"))
-
-    # Добавляем 3 часа для перевода времени в Московское
-    date_obj = date_obj + timedelta(hours=3)
+    date_obj = datetime.fromisoformat(date_string.replace("Z", "+00:00")) + MSK_OFFSET
+    return f"{date_obj.day} {MONTHS_RU[date_obj.month - 1]} {date_obj.year} {date_obj.hour:02}:{date_obj.minute:02}"
 
-    # Список сокращений месяцев на русском языке
-    months_ru = ["янв.", "февр.", "марта", "апр.", "мая", "июня", "июля",
-                 "авг.", "сент.", "октб.", "нояб.", "дек."]
 
-    # Форматируем и возвращаем строку
-    return f"{date_obj.day} {months_ru[date_obj.month - 1]} {date_obj.year} {date_obj.hour:02}:{date_obj.minute:02}"
+@lru_cache(maxsize=8192)
+def _escape_text(text: str) -> str:
+    # Названия блюд и добавок повторяются из заказа в заказ, поэтому кешируем
+    if _MARKDOWN_ESCAPE_RE.search(text) is None:
+        return text
+    return _MARKDOWN_ESCAPE_RE.sub(r"\\\g<0>", text)
 
 
 def escape_markdown_v2(text):
     """
     Экранирует текст для использования в Telegram Markdown V2.
     """
-    escape_chars = r"~`>#=|{}"
-    return re.sub(r"([{}])".format(re.escape(escape_chars)), r"\\\1", text)
+    if type(text) is str:
+        return _escape_text(text)
+    if type(text) in (int, float):
+        # В числах нет экранируемых символов
+        return str(text)
+    return _escape_text(str(text))
 
 
-def parse_order_message(message_data: dict):
+def render_delivery_info(delivery: Delivery, restaurant_address: Optional[str]) -> str:
+    """Формирует блок со сведениями о доставке или адресом ресторана."""
+    esc = escape_markdown_v2
+    if delivery.type == "DELIVERY":
+        address = delivery.address if delivery.address is not None else "Адрес не указан"
+        pickup_code = delivery.pickupCode if delivery.pickupCode is not None else "не указан"
+        parts = [
+            f"🗺  Адрес доставки: *{esc(address)}*\n",
+            f"🔐 Код для курьера: *{esc(pickup_code)}*\n",
+        ]
+        additional_info = [
+            f"{label} *{esc(value)}*"
+            for value, label in (
+                (delivery.flat, "кв."),
+                (delivery.floor, "этаж"),
+                (delivery.porch, "подъезд"),
+                (delivery.doorCode, "код двери"),
+            )
+            if value
+        ]
+        if additional_info:
+            parts.append("Дополнительные сведения: " + ", ".join(additional_info))
+        return "".join(parts)
+    if delivery.type in {"TO_OUTSIDE", "ON_PLACE"}:
+        if restaurant_address is None:
+            restaurant_address = "Адрес ресторана не указан"
+        return f"📍 Адрес ресторана: {esc(restaurant_address)}"
+    return ""
+
+
+def aggregate_additions(additions: List[AdditionProduct]) -> List[Tuple[str, Number, int]]:
+    """Сводит одинаковые добавки (название и цена) в одну, складывая количество."""
+    amounts = {}
+    for add in additions:
+        # 90 и 90.0 выводятся по-разному, поэтому тип цены входит в ключ
+        price = add["price"]
+        key = (add["title"], type(price), price)
+        amounts[key] = amounts.get(key, 0) + add["amount"]
+    return [(title, price, amount) for (title, _, price), amount in amounts.items()]
+
+
+def render_products(products: List[Product], compact: bool = False) -> str:
+    """Формирует список позиций заказа с добавками.
+
+    Количество и цена уже проверены моделью как числа и не экранируются.
+    В компактном режиме одинаковые добавки позиции выводятся одной строкой.
+    """
+    esc = escape_markdown_v2
+    lines = []
+    append = lines.append
+    for product in products:
+        weight = product.get("weight")
+        weight_info = f" (вес: {esc(weight)})" if weight else ""
+        append(
+            f"▫️ *{esc(product['title'])}*{weight_info} "
+            f"*(х{product['amount']})* — {product['price']} ₽"
+        )
+        additions = product.get("additions") or ()
+        if compact:
+            additions = aggregate_additions(additions)
+        else:
+            additions = [(add["title"], add["price"], add["amount"]) for add in additions]
+        for title, price, amount in additions:
+            append(f"     + {esc(title)} (х{amount}) — {price} ₽")
+    return "\n".join(lines)
+
+
+def render_header_fields(order: OrderMessage) -> dict:
+    """Формирует экранированные поля шапки заказа (кроме статуса)."""
+    esc = escape_markdown_v2
+    customer = order.customerInfo
+    return {
+        "order_number": esc(order.orderNumber),
+        "ready_time": format_date(order.readyTime) if order.readyTime else "Не указано",
+        "customer_name": esc(customer.customerName),
+        "customer_phone": esc(customer.customerPhone),
+        "persons_count": esc(
+            order.personsCount if order.personsCount is not None else "не указано"
+        ),
+        "place_title": esc(
+            order.places.title if order.places.title is not None else "Место не указано"
+        ),
+        "total_cost": esc(order.totalCost),
+    }
+
+
+def render_delivery_fields(delivery: Delivery, restaurant_address: Optional[str]) -> dict:
+    """Формирует поля шаблона, относящиеся к способу получения заказа."""
+    delivery_price = ""
+    if delivery.price and delivery.type == "DELIVERY":
+        delivery_price = f"🏎  Доставка: {escape_markdown_v2(delivery.price)} ₽\n"
+    return {
+        "delivery_type": DELIVERY_TYPE_MAPPING.get(
+            delivery.type, "Неизвестный тип доставки"
+        ),
+        "delivery_info": render_delivery_info(delivery, restaurant_address),
+        "delivery_price": delivery_price,
+    }
+
+
+# Кеши готовых секций: при смене статуса заказа перерисовывается только
+# строка статуса, а шапка, доставка и состав берутся из кеша
+_section_caches = {
+    "header": LRUCache(settings.RENDER_CACHE_SIZE),
+    "delivery": LRUCache(settings.RENDER_CACHE_SIZE),
+    "products": LRUCache(settings.RENDER_CACHE_SIZE),
+}
+
+
+def render_cache_stats() -> dict:
+    """Размер и счётчики попаданий/промахов кешей секций."""
+    return {name: cache.stats() for name, cache in _section_caches.items()}
+
+
+def _collect_render_cache():
+    for name, cache in _section_caches.items():
+        yield "order_render_cache_total", {"section": name, "result": "hit"}, cache.hits
+        yield "order_render_cache_total", {"section": name, "result": "miss"}, cache.misses
+
+
+REGISTRY.register_collector(
+    "order_render_cache_total", "counter",
+    "Попадания и промахи кеша секций текста заказа", _collect_render_cache,
+)
+
+
+def clear_render_cache() -> None:
+    for cache in _section_caches.values():
+        cache.clear()
+
+
+def parse_order_message(message_data: Union[OrderMessage, dict], compact: Optional[bool] = None):
     """
     Формирует текст сообщения из JSON-данных заказа, добавляет кнопки управления.
+
+    Принимает проверенную модель ``OrderMessage``; словарь предварительно
+    проверяется той же моделью. ``compact`` по умолчанию берётся из
+    ``ORDER_COMPACT_ADDITIONS``.
     """
-    # Тип доставки
-    delivery_type = message_data["delivery"]["type"]
-    delivery_type_mapping = {
-        "DELIVERY": "Доставка",
-        "TO_OUTSIDE": "Самовывоз",
-        "ON_PLACE": "На месте",
-    }
-    delivery_type_text = delivery_type_mapping.get(
-        delivery_type, "Неизвестный тип доставки"
+    if compact is None:
+        compact = settings.ORDER_COMPACT_ADDITIONS
+    order = (
+        message_data
+        if isinstance(message_data, OrderMessage)
+        else OrderMessage.model_validate(message_data)
     )
+    with tracer.span("order.render", order_id=order.id), ORDER_RENDER_SECONDS.time():
+        customer = order.customerInfo
+        # 1250 == 1250.0 в Python, но выводятся они по-разному: для чисел в
+        # ключе кеша учитывается и тип
+        header_key = (
+            order.orderNumber, order.readyTime, customer.customerName,
+            customer.customerPhone, order.personsCount, order.places.title,
+            type(order.totalCost), order.totalCost,
+        )
+        fields = dict(_section_caches["header"].get_or_set(
+            header_key, lambda: render_header_fields(order)
+        ))
 
-    # Информация о доставке
-    delivery_info = []
-    if delivery_type == "DELIVERY":
-        delivery_address = message_data["delivery"].get("address", "Адрес не указан")
-        delivery_info.append(f"🗺  Адрес доставки: *{delivery_address}*\n")
-        delivery_info.append(
-            f"🔐 Код для курьера: *{message_data['delivery']['pickupCode']}*\n"
+        delivery = order.delivery
+        delivery_key = (
+            delivery.type, delivery.address, delivery.pickupCode, delivery.flat,
+            delivery.floor, delivery.porch, delivery.doorCode,
+            type(delivery.price), delivery.price, order.restaurantAddress,
         )
-        additional_info = [
-            (
-                f"кв. *{message_data['delivery']['flat']}*"
-                if message_data["delivery"].get("flat")
-                else ""
-            ),
-            (
-                f"этаж *{message_data['delivery']['floor']}*"
-                if message_data["delivery"].get("floor")
-                else ""
-            ),
-            (
-                f"подъезд *{message_data['delivery']['porch']}*"
-                if message_data["delivery"].get("porch")
-                else ""
-            ),
-            (
-                f"код двери *{message_data['delivery']['doorCode']}*"
-                if message_data["delivery"].get("doorCode")
-                else ""
-            ),
+        fields.update(_section_caches["delivery"].get_or_set(
+            delivery_key,
+            lambda: render_delivery_fields(delivery, order.restaurantAddress),
+        ))
 
-        ]
-        additional_info = [info for info in additional_info if info]
-        if additional_info:
-            delivery_info.append(
-                "Дополнительные сведения: " + ", ".join(additional_info)
-            )
-    elif delivery_type in {"TO_OUTSIDE", "ON_PLACE"}:
-        restaurant_address = message_data.get("restaurantAddress",
-                                              "Адрес ресторана не указан")
-        delivery_info.append(f"📍 Адрес ресторана: {restaurant_address}")
-
-    # Формирование списка продуктов
-    products = []
-    for product in message_data["products"]:
-        product_name = f"*{product['title']}*"
-        weight_info = f" (вес: {product['weight']})" if product.get(
-            "weight") else ""
-        product_details = f"*(х{product['amount']})* — {product['price']} ₽"
-        product_line = f"▫️ {product_name}{weight_info} {product_details}"
-        if product.get("additions"):
-            additions = "\n".join(
-                [
-                    f"     + {add['title']} (х{add['amount']}) — {add['price']} ₽"
-                    for add in product["additions"]
-                ]
+        fields["products"] = _section_caches["products"].get_or_set(
+            (content_key(order.products), compact),
+            lambda: render_products(order.products, compact),
+        )
+
+        fields["status_text"] = STATUS_MAPPING.get(order.status, "Статус не определен")
+        message_text = get_status_template(order.status).render(fields)
+
+        if order.order_link:
+            message_text += (
+                f"\n\n[Ссылка для просмотра заказа в браузере]({escape_markdown_v2(order.order_link)}) "
             )
-            product_line += f"\n{additions}"
-        products.append(product_line)
 
-    products_text = "\n".join(products)
+        return message_text
 
-    place = message_data["places"]
-    place_title = place.get("title", "Место не указано")
-    ready_time = (
-        format_date(message_data["readyTime"])
-        if message_data.get("readyTime")
-        else "Не указано"
-    )
 
-    # Определение статуса
-    status_mapping = {
-        "CANCELLED_BY_PROVIDER":  "Отменен кассиром.",
-        "CANCELLED_BY_CLIENT": "Отменен клиентом.",
-        "IN_PROGRESS": "Взят в работу",
-        "PAID": "Оплачен",
-        "CANCELED_BY_TIMEOUT": "Заказ отменён - не был взят в работу",
-        "COMPLETED": "Выполнен"
-    }
-    status_text = status_mapping.get(
-        message_data["status"], "Статус не определен"
-    )
-    delivery_price_text = ""
-    if message_data['delivery'].get("price") and delivery_type == "DELIVERY":
-        delivery_price_text = f"🏎  Доставка: {message_data['delivery']['price']} ₽\n"
-
-    message_text = escape_markdown_v2(
-        f"Заказ №: *{message_data['orderNumber']}*\n"
-        f"🕒 Время выдачи: *{ready_time}*\n"
-        f"📦 Способ получения: *{delivery_type_text}*\n"
-        f"💳 Статус заказа: *{status_text}*\n"
-        f"👤 Клиент: *{message_data['customerInfo']['customerName']}* "
-        f"({message_data['customerInfo']['customerPhone']})\n"
-        f"👥 Количество персон: *{message_data.get('personsCount', 'не указано')}*\n\n"
-        f"📍 Место: {place_title}\n"
-        f"{''.join(delivery_info)}\n\n"
-        f"🛒 Состав заказа:\n"
-        f"{products_text}\n"
-        f"{delivery_price_text}"
-        f"💰 Итого: {message_data['totalCost']} ₽"
+def telegram_length(text: str) -> int:
+    """Длина текста так, как её считает Telegram, — в кодовых единицах UTF-16."""
+    return len(text) + sum(1 for char in text if ord(char) > 0xFFFF)
+
+
+def markdown_error(text: str) -> Optional[str]:
+    """
+    Проверяет разметку Telegram Markdown (не V2) так, как её разбирает Telegram.
+
+    Возвращает описание первой ошибки или None. Незакрытые ``*``, ``_``,
+    обратную кавычку и ``[`` Telegram отклоняет ответом 400; литеральный
+    символ экранируется обратной косой чертой.
+    """
+    index, size = 0, len(text)
+    while index < size:
+        char = text[index]
+        if char == "\\" and index + 1 < size and text[index + 1] in "_*`[":
+            index += 2
+            continue
+        if text.startswith("```", index):
+            end = text.find("```", index + 3)
+            if end < 0:
+                return f"unclosed ``` at position {index}"
+            index = end + 3
+        elif char in "*_`":
+            # Вложенных сущностей нет: всё до парного символа — текст
+            end = text.find(char, index + 1)
+            if end < 0:
+                return f"unclosed {char} at position {index}"
+            index = end + 1
+        elif char == "[":
+            end = text.find("]", index + 1)
+            if end < 0 or not text.startswith("(", end + 1):
+                return f"[ at position {index} is not a link [text](url), escape it as \\["
+            end = text.find(")", end + 2)
+            if end < 0:
+                return f"unclosed link at position {index}"
+            index = end + 1
+        else:
+            index += 1
+    return None
+
+
+class _Unit(NamedTuple):
+    """Неделимый кусок строки Markdown и сущность, открытая после него."""
+
+    text: str
+    width: int
+    kind: str  # "open", "close", "space" или "text"
+    entity: Optional[str]
+
+
+def _markdown_units(line: str) -> List[_Unit]:
+    # Экранирование и ссылка не делятся; *, _ и ` открывают и закрывают сущность
+    units: List[_Unit] = []
+    entity = None
+    index, size = 0, len(line)
+    while index < size:
+        char = line[index]
+        end = index + 1
+        kind = "space" if char.isspace() else "text"
+        if char == "\\" and index + 1 < size and line[index + 1] in "_*`[":
+            end = index + 2
+        elif entity is None and line.startswith("```", index):
+            close = line.find("```", index + 3)
+            if close >= 0:
+                end = close + 3
+        elif char in "*_`" and entity in (None, char):
+            kind = "open" if entity is None else "close"
+            entity = char if entity is None else None
+        elif char == "[" and entity is None:
+            middle = line.find("](", index + 1)
+            close = line.find(")", middle + 2) if middle >= 0 else -1
+            if close >= 0:
+                end = close + 1
+        text = line[index:end]
+        units.append(_Unit(text, telegram_length(text), kind, entity))
+        index = end
+    return units
+
+
+def _can_cut(units: List[_Unit], index: int) -> bool:
+    # Разрез после units[index] не должен оставлять пустую сущность
+    return units[index].kind != "open" and (
+        index + 1 == len(units) or units[index + 1].kind != "close"
     )
-    order_link = message_data.get("order_link")
-    if order_link:
-        message_text += escape_markdown_v2(
-            f"\n\n[Ссылка для просмотра заказа в браузере]({order_link})"
-        ) + " "
 
-    return message_text
 
+def _wrap_line(line: str, limit: int) -> Iterator[str]:
+    """Режет строку длиннее ``limit`` (например, огромный комментарий).
+
+    Строка режется по пробелу, а если его нет — между символами, но не
+    внутри экранирования или ссылки. Открытая на разрезе сущность (``*``,
+    ``_`` или обратная кавычка) закрывается в конце части и открывается
+    заново в следующей, чтобы каждая часть оставалась корректной разметкой.
+    """
+    if telegram_length(line) <= limit:
+        yield line
+        return
+    units = _markdown_units(line)
+    start, prefix = 0, ""
+    while start < len(units):
+        size = len(prefix)
+        cut = space_cut = None
+        end = start
+        while end < len(units):
+            unit = units[end]
+            reserve = len(unit.entity) if unit.entity else 0
+            if size + unit.width + reserve > limit:
+                break
+            size += unit.width
+            if _can_cut(units, end):
+                cut = end + 1
+                if unit.kind == "space":
+                    space_cut = end + 1
+            end += 1
+        if end == len(units):
+            yield prefix + "".join(unit.text for unit in units[start:])
+            return
+        if end == start:
+            # Неделимый кусок сам длиннее лимита: режем его по символам
+            text = prefix + units[start].text
+            for offset in range(0, len(text), limit):
+                yield text[offset:offset + limit]
+            start, prefix = start + 1, ""
+            continue
+        # Без подходящего места (лимит меньше сущности) режем там, где кончилось место
+        cut = space_cut or cut or end
+        entity = units[cut - 1].entity
+        stop = cut
+        if cut == space_cut and cut - 1 > start and units[cut - 2].kind != "open":
+            # Пробел на разрезе заменяет перенос строки
+            stop = cut - 1
+        body = prefix + "".join(unit.text for unit in units[start:stop])
+        yield body + entity if entity else body.rstrip()
+        start, prefix = cut, entity or ""
+
+
+def split_message(
+    text: str, limit: Optional[int] = None, continuation: str = ""
+) -> Iterator[str]:
+    """Делит текст на сообщения не длиннее ``limit`` по границам строк.
+
+    Части отдаются по мере готовности; каждая часть после первой начинается
+    с ``continuation``. Пустые строки на стыке частей отбрасываются.
+    """
+    if limit is None:
+        limit = settings.TELEGRAM_MESSAGE_LIMIT
+    lines: List[str] = []
+    size = 0
+    first = True
+    for line in text.split("\n"):
+        for piece in _wrap_line(line, limit - telegram_length(continuation)):
+            piece_size = telegram_length(piece)
+            if lines and size + 1 + piece_size > limit:
+                yield "\n".join(lines).rstrip()
+                lines, size, first = [], 0, False
+            if not lines:
+                if not first:
+                    if not piece.strip():
+                        continue
+                    piece = continuation + piece
+                    piece_size = telegram_length(piece)
+                lines.append(piece)
+                size = piece_size
+            else:
+                lines.append(piece)
+                size += 1 + piece_size
+    if lines:
+        yield "\n".join(lines).rstrip()
+
+
+def continuation_header(order: OrderMessage) -> str:
+    """Начало сообщений с продолжением заказа."""
+    return f"Заказ №: *{escape_markdown_v2(order.orderNumber)}* (продолжение)\n\n"
+
+
+def order_message_chunks(
+    order: OrderMessage, compact: Optional[bool] = None, limit: Optional[int] = None
+) -> Iterator[str]:
+    """Текст заказа, поделённый на сообщения Telegram.
+
+    Первая часть начинается с шапки заказа (к ней прикрепляются кнопки),
+    следующие — с пометки о продолжении с номером заказа.
+    """
+    return split_message(
+        parse_order_message(order, compact), limit, continuation_header(order)
+    )
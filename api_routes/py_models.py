@@ -1,60 +1,80 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, ConfigDict, with_config
+from typing import List, Optional, Union
+from typing_extensions import NotRequired, TypedDict
 
 
-class AdditionProduct(BaseModel):
-    id: str
+# Целые числа остаются целыми: 590 выводится как «590», а не «590.0»
+Number = Union[int, float]
+
+
+class OrderModel(BaseModel):
+    """Базовая модель частей заказа.
+
+    Поля, без которых parse_order_message обходится, необязательны; числа в
+    строковых полях (телефон, код двери) принимаются и приводятся к строке.
+    """
+
+    model_config = ConfigDict(coerce_numbers_to_str=True)
+
+
+# Позиции и добавки проверяются в обычные словари: в большом заказе их
+# сотни, и экземпляр модели на каждую обходится вдвое дороже
+@with_config(ConfigDict(coerce_numbers_to_str=True))
+class AdditionProduct(TypedDict):
+    id: NotRequired[Optional[str]]
     amount: int
     title: str
-    price: float
+    price: Number
 
 
-class Product(BaseModel):
-    id: str
+@with_config(ConfigDict(coerce_numbers_to_str=True))
+class Product(TypedDict):
+    id: NotRequired[Optional[str]]
     amount: int
     title: str
-    price: float
-    additions: Optional[List[AdditionProduct]] = []
+    price: Number
+    weight: NotRequired[Optional[Union[str, Number]]]
+    additions: NotRequired[Optional[List[AdditionProduct]]]
 
 
-class CustomerInfo(BaseModel):
+class CustomerInfo(OrderModel):
     customerName: str
-    customerEmail: str
+    customerEmail: Optional[str] = None
     customerPhone: str
 
 
-class Delivery(BaseModel):
-    id: str = None
+class Delivery(OrderModel):
+    id: Optional[str] = None
     address: Optional[str] = None
     flat: Optional[str] = None
     floor: Optional[str] = None
     porch: Optional[str] = None
-    price: Optional[int] = None
+    price: Optional[Number] = None
     doorCode: Optional[str] = None
     type: str
     pickupCode: Optional[str] = None
 
 
-class Place(BaseModel):
-    id: str = None
-    title: str
+class Place(OrderModel):
+    id: Optional[str] = None
+    title: Optional[str] = None
 
 
-class OrderMessage(BaseModel):
+class OrderMessage(OrderModel):
     id: str
     comment: Optional[str] = None
-    personsCount: int
-    totalCost: float
-    readyTime: str
-    createdAt: str
+    personsCount: Optional[Union[int, str]] = None
+    totalCost: Number
+    readyTime: Optional[str] = None
+    createdAt: Optional[str] = None
     customerInfo: CustomerInfo
     delivery: Delivery
     products: List[Product]
-    order_link: str
+    order_link: Optional[str] = None
     places: Place
-    orderNumber: int
+    orderNumber: Union[int, str]
     status: str
-    restaurantAddress: str
+    restaurantAddress: Optional[str] = None
 
 
 class SendChatRequest(BaseModel):
@@ -68,6 +88,25 @@ class EditChatRequest(BaseModel):
     message: OrderMessage
 
 
+class OrderEditRequest(BaseModel):
+    message: OrderMessage
+
+
+class BatchSendItem(BaseModel):
+    chat_id: int
+    message: dict
+
+
+class BatchSendRequest(BaseModel):
+    items: List[BatchSendItem] = []
+    chat_ids: List[int] = []
+    message: Optional[dict] = None
+
+
+class BroadcastRequest(BaseModel):
+    text: str
+
+
 class InputData(BaseModel):
     phone_number: str
     user_id: int
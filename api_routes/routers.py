@@ -1,16 +1,50 @@
+import asyncio
+import csv
+import hmac
 import json
+import logging
+from functools import partial
+from typing import Optional
 
 from dotenv import load_dotenv
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import JSONResponse
+from pydantic import ValidationError
 
-import aiohttp
-
-from api_routes.py_models import EditChatRequest, InputData, SendChatRequest
+from api_routes.order_cards import (
+    build_order_keyboard,
+    delete_order_card,
+    delete_order_cards,
+    edit_order_card,
+    refresh_order_cards,
+    send_order_card,
+)
+from api_routes.py_models import (
+    BatchSendRequest,
+    BroadcastRequest,
+    EditChatRequest,
+    InputData,
+    OrderEditRequest,
+    OrderMessage,
+    SendChatRequest,
+)
+from src.core.broadcast import broadcast_engine
+from src.core.edit_coalescer import edit_coalescer
+from src.core.job_queue import job_queue
+from src.core.message_state import message_state_store
+from src.core.phones import phone_registry
 from src.core.settings import settings
-from api_routes.parse_utills import parse_order_message
+from api_routes.parse_utills import (
+    continuation_header,
+    markdown_error,
+    parse_order_message,
+    render_cache_stats,
+    split_message,
+    telegram_length,
+)
 
 load_dotenv()
-bot_token = settings.BOT
+logger = logging.getLogger(__name__)
 url = settings.EXTERNAL_API_URL
 router = APIRouter(prefix="/book-eat/api/v1", tags=["test API endpoints"])
 
@@ -27,233 +61,349 @@ async def update_order_status(
     return {"message": f"запрос по  id {order_id} получили, статус : {status}"}
 
 
+@router.get("/render_cache/stats")
+async def get_render_cache_stats():
+    """Счётчики кешей текста заказа и пропущенных правок сообщений."""
+    return {
+        "status": 200,
+        "caches": render_cache_stats(),
+        "message_state": message_state_store.stats(),
+        "edit_coalescing": edit_coalescer.stats(),
+    }
+
+
 @router.post("/check_access")
 async def send_from_telegram(data: InputData):
-    print(data)
-    numbers = ["12345", "43213", "22333"]
-    if data.phone_number in numbers:
-        print(f"пользователь с user_id:{data.user_id}")
-        return {"authorized": True}
-    return {"authorized": False}
+    # Номер телефона в лог не пишем
+    authorized = phone_registry.contains(data.phone_number)
+    logger.info("check_access user_id=%s authorized=%s", data.user_id, authorized)
+    return {"authorized": authorized}
+
+
+def _import_error(status: int, message: str) -> JSONResponse:
+    return JSONResponse(status_code=status, content={"status": status, "message": message})
+
+
+async def _read_limited(request: Request, limit: int) -> Optional[bytes]:
+    """Читает тело запроса, но не больше ``limit`` байт; иначе ``None``."""
+    length = request.headers.get("Content-Length")
+    if length and length.isdigit() and int(length) > limit:
+        return None
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > limit:
+            return None
+    return bytes(body)
+
+
+@router.post("/phones/import")
+async def import_phones(
+    request: Request,
+    fmt: str = Query(
+        "csv", alias="format", regex="^(csv|json)$", description="Формат тела запроса"
+    ),
+    replace: bool = Query(False, description="Заменить реестр целиком, а не дополнить"),
+):
+    """Загружает телефоны сотрудников в реестр для ``/check_access``.
+
+    Доступно только с ``Authorization: Bearer <PHONE_IMPORT_TOKEN>``. Номера
+    приводятся к E.164; все процессы API подхватят изменения без перезапуска.
+    """
+    token = settings.PHONE_IMPORT_TOKEN
+    if not token:
+        return _import_error(403, "Phone import is disabled: PHONE_IMPORT_TOKEN is not set.")
+    scheme, _, credentials = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(
+        credentials.strip().encode(), token.encode()
+    ):
+        return _import_error(401, "Invalid admin token.")
+
+    limit = settings.PHONE_IMPORT_MAX_BYTES
+    body = await _read_limited(request, limit)
+    if body is None:
+        return _import_error(413, f"Phone list is larger than {limit} bytes.")
+    source = request.client.host if request.client else "unknown"
+    try:
+        result = await phone_registry.import_phones(body, fmt, replace)
+    except (ValueError, csv.Error) as e:
+        logger.warning("Rejected phone import from %s: %s", source, e)
+        return {"status": 400, "message": f"Invalid phone list: {e}"}
+    logger.info(
+        "Imported %d phones (%d invalid, format=%s, replace=%s) from %s, registry has %d",
+        result["imported"], result["invalid"], fmt, replace, source, result["total"],
+    )
+    return {"status": 200, "message": f"Imported {result['imported']} phones.", **result}
+
+
+@router.get("/phones/stats")
+async def get_phone_registry_stats():
+    return {"status": 200, **phone_registry.stats()}
+
+
+def validation_error(error: ValidationError, prefix: str = "Invalid data format"):
+    """Превращает ошибку pydantic в ответ API со статусом 400."""
+    details = "; ".join(
+        f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}"
+        for item in error.errors()
+    )
+    return {"status": 400, "message": f"{prefix}: {details}."}
+
+
+async def enqueue_job(kind: str, dict_data: dict):
+    """Кладёт запрос в фоновую очередь и сразу отвечает 202 с id задания."""
+    job_id = await job_queue.enqueue(kind, dict_data)
+    return JSONResponse(
+        status_code=202,
+        content={"status": 202, "message": "Job accepted.", "job_id": job_id},
+    )
 
 
 @router.post("/send_chat")
-async def send_to_telegram(dict_data: dict):
-    telegram_url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
+async def send_to_telegram(
+    dict_data: dict,
+    async_mode: bool = Query(
+        False, description="Поставить отправку в фоновую очередь и вернуть id задания"
+    ),
+):
     # dict_data = data.dict()
     try:
-        if (
-            not isinstance(dict_data, dict)
-            or "message" not in dict_data
-            or "chat_id" not in dict_data
-        ):
-            return {
-                "status": 400,
-                "message": "Invalid data format: missing 'message' or 'chat_id'.",
-            }
-
-        required_keys = [
-            "delivery",
-            "products",
-            "places",
-            "status",
-            "orderNumber",
-            "customerInfo",
-            "totalCost",
-        ]
-        message_data = dict_data["message"]
-        missing_keys = [key for key in required_keys if key not in message_data]
-        if missing_keys:
-            return {
-                "status": 400,
-                "message": f"Invalid message data: missing keys {', '.join(missing_keys)}.",
-            }
+        try:
+            request = SendChatRequest.model_validate(dict_data)
+        except ValidationError as e:
+            return validation_error(e)
+
+        if async_mode:
+            return await enqueue_job("send_chat", dict_data)
 
         # Формируем текст сообщения
-        text = parse_order_message(message_data)
+        text = parse_order_message(request.message)
         if "Ошибка" in text:  # Если парсер вернул ошибку
             return {"status": 400, "message": f"Message parsing failed: {text}"}
 
         # Определяем кнопки для сообщения
-        status = message_data["status"]
-        inline_keyboard = None
-
-        if status == "PAID":
-            inline_keyboard = {
-                "inline_keyboard": [
-                    [
-                        {
-                            "text": "✅ Взять в работу",
-                            "callback_data": f"order_confirm:{message_data['id']}",
-                        },
-                        {
-                            "text": "❌ Отменить заказ",
-                            "callback_data": f"order_cancel:{message_data['id']}",
-                        },
-                    ]
-                ]
-            }
-        elif status == "IN_PROGRESS":
-            inline_keyboard = {
-                "inline_keyboard": [
-                    [
-                        {
-                            "text": "✅ Выполнить заказ",
-                            "callback_data": f"order_complete:{message_data['id']}",
-                        },
-                    ]
-                ]
-            }
-
-        # Формируем payload для Telegram
-        payload = {
-            "chat_id": dict_data["chat_id"],
-            "text": text,
-            "parse_mode": "Markdown",
-            "disable_web_page_preview": True,
-        }
-        if inline_keyboard:
-            payload["reply_markup"] = json.dumps(inline_keyboard)
-
-        # Отправка сообщения в Telegram
-        async with aiohttp.ClientSession() as session:
-            async with session.post(telegram_url, json=payload) as response:
-                if response.status == 200:
-                    response_data = await response.json()
-                    message_id = response_data["result"]["message_id"]
-                    return {
-                        "status": 200,
-                        "message": "Message sent to Telegram successfully.",
-                        "message_id": message_id,
-                        "response_data": response_data,
-                    }
-                else:
-                    error_message = await response.text()
-                    return {
-                        "status": response.status,
-                        "message": f"Failed to send message to Telegram: {error_message}",
-                    }
+        inline_keyboard = build_order_keyboard(request.message)
+
+        # Длинный заказ уходит несколькими сообщениями, кнопки — на первом
+        chunks = split_message(text, continuation=continuation_header(request.message))
+        return await send_order_card(
+            request.chat_id, chunks, inline_keyboard, request.message, dict_data["message"]
+        )
     except Exception as e:
         return {"status": 500, "message": f"An error occurred: {str(e)}"}
 
 
+@router.post("/send_chat/batch")
+async def send_to_telegram_batch(data: BatchSendRequest):
+    """Рассылает один или несколько заказов в несколько чатов за один запрос.
+
+    Текст каждого заказа формируется один раз, отправка идёт параллельно с
+    ограничением ``BATCH_SEND_CONCURRENCY`` одновременных запросов.
+    """
+    pairs = [(item.chat_id, item.message) for item in data.items]
+    if data.message is not None:
+        pairs.extend((chat_id, data.message) for chat_id in data.chat_ids)
+    if not pairs:
+        return {"status": 400, "message": "Batch is empty.", "results": []}
+
+    # Рендерим каждый уникальный заказ один раз
+    rendered = {}
+    for _, message_data in pairs:
+        key = json.dumps(message_data, sort_keys=True, default=str)
+        if key in rendered:
+            continue
+        try:
+            order = OrderMessage.model_validate(message_data)
+        except ValidationError as e:
+            rendered[key] = (None, None, None, validation_error(e, "Invalid message data"))
+            continue
+        try:
+            text = parse_order_message(order)
+        except Exception as e:
+            text = f"Ошибка: {e}"
+        if "Ошибка" in text:
+            error = {"status": 400, "message": f"Message parsing failed: {text}"}
+            rendered[key] = (None, None, None, error)
+            continue
+        chunks = list(split_message(text, continuation=continuation_header(order)))
+        rendered[key] = (chunks, build_order_keyboard(order), order, None)
+
+    semaphore = asyncio.Semaphore(settings.BATCH_SEND_CONCURRENCY)
+
+    async def send_one(chat_id, message_data):
+        key = json.dumps(message_data, sort_keys=True, default=str)
+        chunks, inline_keyboard, order, error = rendered[key]
+        if error:
+            return {"chat_id": chat_id, **error}
+        async with semaphore:
+            try:
+                result = await send_order_card(
+                    chat_id, chunks, inline_keyboard, order, message_data
+                )
+            except Exception as e:
+                result = {"status": 500, "message": f"An error occurred: {str(e)}"}
+        result.pop("response_data", None)
+        return {"chat_id": chat_id, **result}
+
+    results = await asyncio.gather(
+        *(send_one(chat_id, message_data) for chat_id, message_data in pairs)
+    )
+    sent = sum(1 for result in results if result["status"] == 200)
+    return {
+        "status": 200 if sent == len(results) else 207,
+        "message": f"Sent {sent} of {len(results)} messages.",
+        "results": results,
+    }
+
+
 @router.delete("/delete_message")
 async def delete_telegram_message(chat_id: int, message_id: int):
-    telegram_url = f"https://api.telegram.org/bot{bot_token}/deleteMessage"
-    payload = {
-        "chat_id": chat_id,
-        "message_id": message_id,
-    }
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(telegram_url, data=payload) as response:
-                if response.status == 200:
-                    response_data = await response.json()
-                    if response_data.get("ok"):
-                        return {
-                            "status": 200,
-                            "message": "Message deleted successfully.",
-                            "response_data": response_data,
-                        }
-                    else:
-                        return {
-                            "status": response.status,
-                            "message": f"Failed to delete message: {response_data.get('description')}",
-                        }
-                else:
-                    error_message = await response.text()
-                    return {
-                        "status": response.status,
-                        "message": f"Failed to delete message: {error_message}",
-                    }
+        return await delete_order_card(chat_id, message_id)
     except Exception as e:
         return {"status": 500, "message": f"An error occurred: {str(e)}"}
 
 
 @router.post("/edit_chat")
-async def edit_message(dict_data: dict):
-    telegram_url = f"https://api.telegram.org/bot{bot_token}/editMessageText"
+async def edit_message(
+    dict_data: dict,
+    async_mode: bool = Query(
+        False, description="Поставить изменение в фоновую очередь и вернуть id задания"
+    ),
+):
     # dict_data = data.dict()
     try:
-        if (
-            not isinstance(dict_data, dict)
-            or "message" not in dict_data
-            or "chat_id" not in dict_data
-        ):
-            return {
-                "status": 400,
-                "message": "Invalid data format: missing 'message' or 'chat_id'.",
-            }
-
-        required_keys = [
-            "delivery",
-            "products",
-            "places",
-            "status",
-            "orderNumber",
-            "customerInfo",
-            "totalCost",
-        ]
-        message_data = dict_data["message"]
-        missing_keys = [key for key in required_keys if key not in message_data]
-        if missing_keys:
-            return {
-                "status": 400,
-                "message": f"Invalid message data: missing keys {', '.join(missing_keys)}.",
-            }
-        text = parse_order_message(dict_data["message"])
-        status = dict_data["message"]["status"]
-        inline_keyboard = None
-
-        if status == "PAID":
-            inline_keyboard = {
-                "inline_keyboard": [
-                    [
-                        {
-                            "text": "✅ Подтвердить заказ",
-                            "callback_data": f"order_confirm:{dict_data['message']['id']}",
-                        },
-                        {
-                            "text": "❌ Отменить заказ",
-                            "callback_data": f"order_cancel:{dict_data['message']['id']}",
-                        },
-                    ]
-                ]
-            }
-        elif status == "IN_PROGRESS":
-            inline_keyboard = {
-                "inline_keyboard": [
-                    [
-                        {
-                            "text": "✅ Выполнить заказ",
-                            "callback_data": f"order_complete:{dict_data['message']['id']}",
-                        },
-                    ]
-                ]
-            }
-        payload = {
-            "chat_id": dict_data["chat_id"],
-            "message_id": dict_data["message_id"],
-            "text": text,
-            "parse_mode": "Markdown",
-            "disable_web_page_preview": True
-        }
-        if inline_keyboard:
-            payload["reply_markup"] = json.dumps(inline_keyboard)
-        async with aiohttp.ClientSession() as session:
-            async with session.post(telegram_url, data=payload) as response:
-                if response.status == 200:
-                    response_data = await response.json()
-                    return {
-                        "status": 200,
-                        "message": "Message edited successfully.",
-                        "response_data": response_data,
-                    }
-                else:
-                    error_message = await response.text()
-                    return {
-                        "status": response.status,
-                        "message": f"Failed to edit message: {error_message}",
-                    }
+        try:
+            request = EditChatRequest.model_validate(dict_data)
+        except ValidationError as e:
+            return validation_error(e)
+        if async_mode:
+            return await enqueue_job("edit_chat", dict_data)
+        return await edit_order_card(
+            request.chat_id, request.message_id, request.message, dict_data["message"]
+        )
     except Exception as e:
         return {"status": 500, "message": f"An error occurred: {str(e)}"}
+
+
+def fan_out_response(results: list, done: str) -> dict:
+    succeeded = sum(1 for result in results if result["status"] == 200)
+    return {
+        "status": 200 if succeeded == len(results) else 207,
+        "message": f"{done} {succeeded} of {len(results)} messages.",
+        "results": results,
+    }
+
+
+def order_not_found():
+    return JSONResponse(
+        status_code=404,
+        content={"status": 404, "message": "No messages found for this order."},
+    )
+
+
+@router.post("/orders/{order_id}/edit")
+async def edit_order_messages(order_id: str, dict_data: dict):
+    """Перерисовывает все сообщения заказа, отправленные через ``/send_chat``."""
+    try:
+        request = OrderEditRequest.model_validate(dict_data)
+    except ValidationError as e:
+        return validation_error(e)
+    if request.message.id != order_id:
+        return {"status": 400, "message": "Order id in the path and in the message differ."}
+    results = await refresh_order_cards(order_id, request.message, dict_data["message"])
+    if not results:
+        return order_not_found()
+    return fan_out_response(results, "Edited")
+
+
+@router.delete("/orders/{order_id}/delete")
+async def delete_order_messages(order_id: str):
+    """Удаляет все сообщения заказа, отправленные через ``/send_chat``."""
+    results = await delete_order_cards(order_id)
+    if not results:
+        return order_not_found()
+    return fan_out_response(results, "Deleted")
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Возвращает состояние фонового задания и, когда оно готово, его результат."""
+    job = await job_queue.get(job_id)
+    if job is None:
+        return JSONResponse(
+            status_code=404, content={"status": 404, "message": "Job not found."}
+        )
+    result = job["result"] or {}
+    return {
+        "status": 200,
+        "job_id": job["id"],
+        "kind": job["kind"],
+        "state": job["status"],
+        "message_id": result.get("message_id"),
+        "message_ids": result.get("message_ids"),
+        "result": result,
+    }
+
+
+@router.post("/broadcast")
+async def start_broadcast(data: BroadcastRequest):
+    """Рассылает сообщение всем пользователям, авторизованным в боте.
+
+    Рассылка идёт в фоне; ответ 202 содержит ``broadcast_id`` для
+    ``GET /broadcast/{broadcast_id}``.
+    """
+    if settings.BOT_STORAGE != "sqlite":
+        return JSONResponse(
+            status_code=409,
+            content={"status": 409, "message": "Broadcast requires BOT_STORAGE=sqlite."},
+        )
+    if not data.text.strip():
+        return {"status": 400, "message": "Broadcast text is empty."}
+    if telegram_length(data.text) > settings.TELEGRAM_MESSAGE_LIMIT:
+        return {
+            "status": 400,
+            "message": f"Broadcast text is longer than {settings.TELEGRAM_MESSAGE_LIMIT} characters.",
+        }
+    # Иначе Telegram отклонит сообщение каждому получателю
+    error = markdown_error(data.text)
+    if error is not None:
+        return {"status": 400, "message": f"Invalid Markdown: {error}."}
+    broadcast_id = await broadcast_engine.create(data.text)
+    return JSONResponse(
+        status_code=202,
+        content={"status": 202, "message": "Broadcast started.", "broadcast_id": broadcast_id},
+    )
+
+
+@router.get("/broadcast/{broadcast_id}")
+async def get_broadcast(broadcast_id: str):
+    """Прогресс рассылки: сколько получателей обработано и с каким итогом."""
+    broadcast = await broadcast_engine.get(broadcast_id)
+    if broadcast is None:
+        return JSONResponse(
+            status_code=404, content={"status": 404, "message": "Broadcast not found."}
+        )
+    return {
+        "status": 200,
+        "broadcast_id": broadcast["id"],
+        "state": broadcast["status"],
+        "total": broadcast["total"],
+        "processed": broadcast["processed"],
+        "sent": broadcast["sent"],
+        "blocked": broadcast["blocked"],
+        "failed": broadcast["failed"],
+        "created_at": broadcast["created_at"],
+        "finished_at": broadcast["finished_at"],
+    }
+
+
+# Обработчики событий заказа для фоновой очереди и потокового приёма
+EVENT_HANDLERS = {
+    "send_chat": partial(send_to_telegram, async_mode=False),
+    "edit_chat": partial(edit_message, async_mode=False),
+}
+# Повтор прерванной отправки может продублировать карточку заказа
+NON_IDEMPOTENT_EVENTS = frozenset({"send_chat"})
+for kind, handler in EVENT_HANDLERS.items():
+    job_queue.register(kind, handler, idempotent=kind not in NON_IDEMPOTENT_EVENTS)
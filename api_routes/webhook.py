@@ -0,0 +1,49 @@
+import asyncio
+
+from aiogram import types
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+
+from bot import dp, get_bot, set_bot_webhook
+from src.core.lifecycle import lifecycle
+from src.core.settings import settings
+
+router = APIRouter(tags=["telegram webhook"])
+
+# Ссылки на фоновые задачи, чтобы их не собрал сборщик мусора
+_background_tasks = set()
+
+
+@router.post(settings.WEBHOOK_PATH)
+async def telegram_webhook(request: Request):
+    """Принимает обновление Telegram и обрабатывает его в фоне."""
+    secret = request.headers.get("X-Telegram-Bot-Api-Secret-Token")
+    if settings.WEBHOOK_SECRET and secret != settings.WEBHOOK_SECRET:
+        return JSONResponse(
+            status_code=401, content={"status": 401, "message": "Invalid secret token."}
+        )
+    bot = get_bot()
+    update = types.Update.model_validate(await request.json(), context={"bot": bot})
+    task = asyncio.create_task(dp.feed_update(bot, update))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return {"ok": True}
+
+
+async def start_webhook() -> None:
+    bot = get_bot()
+    await dp.emit_startup(bot=bot, dispatcher=dp)
+    await set_bot_webhook()
+
+
+async def stop_webhook() -> None:
+    """Дожидается обработки принятых обновлений до конца времени остановки."""
+    bot = get_bot()
+    tasks = list(_background_tasks)
+    if tasks:
+        _, pending = await asyncio.wait(tasks, timeout=lifecycle.remaining())
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    await dp.emit_shutdown(bot=bot, dispatcher=dp)
+    await bot.session.close()
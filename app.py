@@ -1,14 +1,154 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
+from api_routes import ingest
 from api_routes.routers import router
+from src.core.settings import settings
+from src.core.broadcast import broadcast_engine
+from src.core.edit_coalescer import edit_coalescer
+from src.core.http_client import http_client, origins
+from src.core.job_queue import job_queue
+from src.core.lifecycle import lifecycle
+from src.core.message_state import message_state_store
+from src.core.order_index import order_index
+from src.core.phones import phone_registry
+from src.core.metrics import (
+    CONTENT_TYPE,
+    HTTP_REQUEST_SECONDS,
+    HTTP_REQUESTS_IN_FLIGHT,
+    REGISTRY,
+)
+from src.core.telegram_scheduler import telegram_scheduler
+from src.core.tracing import TraceContext, tracer
+
+
+# Бот принимает вебхук в этом же процессе
+webhook_enabled = settings.BOT_MODE == "webhook" and settings.WEBHOOK_IN_API
+if webhook_enabled:
+    from api_routes import webhook
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await http_client.start()
+    # Соединения и DNS готовы до первого заказа
+    await http_client.warmup(origins(
+        settings.TELEGRAM_API_BASE,
+        settings.EXTERNAL_API_URL,
+        settings.EXTERNAL_API_CHECK_ACCESS,
+    ))
+    await phone_registry.start()
+    await job_queue.start()
+    await broadcast_engine.start()
+    if webhook_enabled:
+        await webhook.start_webhook()
+    lifecycle.mark_ready()
+    yield
+    # uvicorn уже не принимает соединения; дорабатываем начатое до SHUTDOWN_TIMEOUT
+    lifecycle.begin_drain()
+    # Отложенные правки карточек уходят сразу, не дожидаясь окна склейки
+    await edit_coalescer.flush()
+    await lifecycle.wait_idle()
+    if webhook_enabled:
+        await webhook.stop_webhook()
+    await job_queue.stop(lifecycle.remaining())
+    # Прерванные рассылки продолжатся после перезапуска
+    await broadcast_engine.stop()
+    await telegram_scheduler.close(lifecycle.remaining())
+    await phone_registry.stop()
+    message_state_store.close()
+    order_index.close()
+    await http_client.close()
+    tracer.flush()
 
 
-app = FastAPI(title="TestApi", version="0.2.0")
+app = FastAPI(title="TestApi", version="0.2.0", lifespan=lifespan)
 
 
 app.include_router(router)
+app.include_router(ingest.router)
+if webhook_enabled:
+    app.include_router(webhook.router)
+
+
+# Пути, которые отвечают и во время остановки
+PROBE_PATHS = frozenset({"/ready", "/metrics"})
+
+
+class RequestTrackingMiddleware:
+    """Метрики и спан запроса, учёт работы для остановки и 503 во время неё.
+
+    Трасса продолжает заголовок ``traceparent`` запроса, если он есть, и
+    возвращается в таком же заголовке ответа. Чистый ASGI вместо ``@app.middleware("http")``: тот читает ``receive``
+    сам и ломает потоковый приём тела запроса в ``/ingest/ndjson``.
+    """
 
+    def __init__(self, app):
+        self.app = app
 
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if lifecycle.draining and scope["path"] not in PROBE_PATHS:
+            response = JSONResponse(
+                status_code=503, content={"status": 503, "message": "Server is shutting down."}
+            )
+            await response(scope, receive, send)
+            return
+
+        status = 500
+        parent = None
+        if tracer.enabled:
+            headers = dict(scope["headers"])
+            if b"traceparent" in headers:
+                parent = TraceContext.parse(headers[b"traceparent"].decode("latin-1"))
+
+        with lifecycle.track(), HTTP_REQUESTS_IN_FLIGHT.track_inprogress(), tracer.span(
+            f"http {scope['method']}", parent=parent, root=True, path=scope["path"]
+        ) as span:
+
+            async def send_tracked(message):
+                nonlocal status
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    if span.context is not None:
+                        message["headers"] = [
+                            *message.get("headers", []),
+                            (b"traceparent", span.context.traceparent.encode()),
+                        ]
+                await send(message)
+
+            with HTTP_REQUEST_SECONDS.time(
+                method=scope["method"], path="unmatched", status=500
+            ) as labels:
+                try:
+                    await self.app(scope, receive, send_tracked)
+                finally:
+                    route = scope.get("route")
+                    if route is not None:
+                        labels["path"] = route.path
+                    labels["status"] = status
+                    span.set(route=labels["path"], http_status=status)
+
+
+@app.get("/ready", include_in_schema=False)
+async def ready():
+    """Проверка готовности: 503 при запуске и во время остановки."""
+    status = 200 if lifecycle.ready else 503
+    return JSONResponse(
+        status_code=status, content={"status": status, "state": lifecycle.state}
+    )
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(REGISTRY.expose(), media_type=CONTENT_TYPE)
+
+
+app.add_middleware(RequestTrackingMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -19,6 +159,19 @@ app.add_middleware(
 
 
 if __name__ == "__main__":
+    import os
+
     import uvicorn
 
-    uvicorn.run("app:app", host="0.0.0.0", port=8000, reload=True, lifespan="on")
+    workers = settings.API_WORKERS
+    if workers > 1:
+        # Процессы uvicorn читают настройки заново и наследуют окружение
+        os.environ["SHARED_STATE"] = "true"
+    uvicorn.run(
+        "app:app",
+        host=settings.API_HOST,
+        port=settings.API_PORT,
+        workers=workers,
+        reload=settings.API_RELOAD and workers == 1,
+        lifespan="on",
+    )
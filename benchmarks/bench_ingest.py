@@ -0,0 +1,149 @@
+"""Сравнение доставки событий заказа: POST на событие против потока /ingest.
+
+Поднимает FakeTelegramServer и API в этом же процессе и отправляет
+``--events`` событий ``send_chat`` четырьмя способами:
+
+* ``post-new`` — POST /send_chat с новой сессией на каждое событие (как
+  сейчас делает сервис заказов);
+* ``post`` — POST /send_chat через общую сессию с keep-alive;
+* ``ws`` — один WebSocket /ingest/ws;
+* ``ndjson`` — один потоковый POST /ingest/ndjson.
+
+Запуск из корня репозитория::
+
+    python -m benchmarks.bench_ingest --events 2000 --concurrency 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+import aiohttp
+
+from benchmarks.fake_services import FakeTelegramServer
+from benchmarks.payloads import make_order
+
+API_PREFIX = "/book-eat/api/v1"
+MODES = ("post-new", "post", "ws", "ndjson")
+
+
+def event(index: int, chats: int) -> dict:
+    return {
+        "id": index,
+        "type": "send_chat",
+        "data": {"chat_id": index % chats + 1, "message": make_order(order_id=f"order-{index}")},
+    }
+
+
+async def run_post(api: str, events: list, concurrency: int, reuse: bool) -> int:
+    semaphore = asyncio.Semaphore(concurrency)
+    shared = aiohttp.ClientSession() if reuse else None
+
+    async def post(item: dict) -> int:
+        async with semaphore:
+            if shared is not None:
+                async with shared.post(f"{api}/send_chat", json=item["data"]) as response:
+                    return (await response.json())["status"]
+            async with aiohttp.ClientSession() as session:
+                async with session.post(f"{api}/send_chat", json=item["data"]) as response:
+                    return (await response.json())["status"]
+
+    try:
+        statuses = await asyncio.gather(*(post(item) for item in events))
+    finally:
+        if shared is not None:
+            await shared.close()
+    return sum(1 for status in statuses if status == 200)
+
+
+async def run_ws(api: str, events: list) -> int:
+    async with aiohttp.ClientSession() as session:
+        async with session.ws_connect(f"{api.replace('http', 'ws', 1)}/ingest/ws") as ws:
+            async def produce():
+                for item in events:
+                    await ws.send_str(json.dumps(item))
+
+            producer = asyncio.create_task(produce())
+            acks = [json.loads((await ws.receive()).data) for _ in events]
+            await producer
+    return sum(1 for ack in acks if ack["status"] == 200)
+
+
+async def run_ndjson(api: str, events: list) -> int:
+    async def body():
+        for item in events:
+            yield (json.dumps(item) + "\n").encode()
+
+    ok = 0
+    async with aiohttp.ClientSession() as session:
+        async with session.post(f"{api}/ingest/ndjson", data=body()) as response:
+            async for line in response.content:
+                ok += json.loads(line)["status"] == 200
+    return ok
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=50,
+                        help="одновременных POST и событий в работе для потока")
+    parser.add_argument("--chats", type=int, default=100)
+    parser.add_argument("--tg-latency", type=float, default=0.01)
+    parser.add_argument("--api-port", type=int, default=8123)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    args = parser.parse_args()
+
+    telegram = FakeTelegramServer(latency=args.tg_latency)
+    telegram_url = await telegram.start()
+    os.environ.update(
+        BOT=os.environ.get("BOT", "123:benchmark"),
+        TELEGRAM_API_BASE=telegram_url,
+        EXTERNAL_API_URL=telegram_url + "/",
+        EXTERNAL_API_CHECK_ACCESS=telegram_url + "/check_access",
+        BOT_STORAGE="memory",
+        DATA_DIR=tempfile.mkdtemp(prefix="bench_ingest_"),
+        TELEGRAM_GLOBAL_RATE="100000",
+        TELEGRAM_GLOBAL_BURST="100000",
+        TELEGRAM_CHAT_RATE="100000",
+        TELEGRAM_CHAT_BURST="100000",
+        INGEST_MAX_IN_FLIGHT=str(args.concurrency),
+    )
+
+    import uvicorn
+
+    import app as app_module
+
+    server = uvicorn.Server(uvicorn.Config(
+        app_module.app, host="127.0.0.1", port=args.api_port,
+        log_level="warning", lifespan="on",
+    ))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    api = f"http://127.0.0.1:{args.api_port}{API_PREFIX}"
+
+    events = [event(index, args.chats) for index in range(args.events)]
+    print(f"{'mode':>8} {'ok':>6} {'seconds':>8} {'events/s':>9}")
+    try:
+        for mode in args.modes:
+            started = time.perf_counter()
+            if mode == "post-new":
+                ok = await run_post(api, events, args.concurrency, reuse=False)
+            elif mode == "post":
+                ok = await run_post(api, events, args.concurrency, reuse=True)
+            elif mode == "ws":
+                ok = await run_ws(api, events)
+            else:
+                ok = await run_ndjson(api, events)
+            elapsed = time.perf_counter() - started
+            print(f"{mode:>8} {ok:>6} {elapsed:>8.2f} {args.events / elapsed:>9.0f}")
+    finally:
+        server.should_exit = True
+        await server_task
+        await telegram.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
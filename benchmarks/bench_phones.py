@@ -0,0 +1,90 @@
+"""Бенчмарк реестра телефонов: импорт, загрузка и проверка номеров.
+
+Запуск из корня репозитория::
+
+    python -m benchmarks.bench_phones --entries 100000 --lookups 200000
+
+Сравнивает проверку по реестру (нормализация + множество в памяти) с
+исходной проверкой — поиском строки в списке — на той же выборке.
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+os.environ.setdefault("BOT", "benchmark")
+
+from src.core.phones import PhoneRegistry  # noqa: E402
+
+# Как один и тот же номер приходит от Telegram, из CRM и от людей
+FORMATS = (
+    "7{}",
+    "+7{}",
+    "8{}",
+    "+7 ({0[0]}{0[1]}{0[2]}) {0[3]}{0[4]}{0[5]}-{0[6]}{0[7]}-{0[8]}{0[9]}",
+)
+
+
+def national_numbers(count: int, seed: int) -> list:
+    rng = random.Random(seed)
+    numbers = set()
+    while len(numbers) < count:
+        numbers.add(f"9{rng.randrange(10 ** 9):09d}")
+    return list(numbers)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=100_000)
+    parser.add_argument("--lookups", type=int, default=200_000)
+    parser.add_argument("--linear-lookups", type=int, default=200,
+                        help="проверок для исходного поиска по списку (он медленный)")
+    args = parser.parse_args()
+
+    numbers = national_numbers(args.entries * 2, seed=1)
+    staff, strangers = numbers[:args.entries], numbers[args.entries:]
+    csv_content = ("phone\n" + "\n".join(f"+7{number}" for number in staff)).encode()
+
+    rng = random.Random(2)
+    probes = [
+        rng.choice(FORMATS).format(rng.choice(staff if rng.random() < 0.5 else strangers))
+        for _ in range(args.lookups)
+    ]
+
+    async def prepare() -> PhoneRegistry:
+        registry = PhoneRegistry(os.path.join(tempfile.mkdtemp(), "phones.sqlite3"))
+        started = time.perf_counter()
+        await registry.import_phones(csv_content, "csv", replace=True)
+        print(f"import {args.entries} phones: {time.perf_counter() - started:.2f} s")
+        started = time.perf_counter()
+        await registry.load()
+        print(f"load into memory: {time.perf_counter() - started:.3f} s")
+        return registry
+
+    registry = asyncio.run(prepare())
+
+    started = time.perf_counter()
+    found = sum(1 for probe in probes if registry.contains(probe))
+    elapsed = time.perf_counter() - started
+    print(
+        f"registry: {args.lookups / elapsed:,.0f} lookups/s"
+        f" ({elapsed / args.lookups * 1e6:.2f} us each, {found} found)"
+    )
+
+    # Исходная проверка: точное совпадение строки в списке
+    legacy = [f"+7{number}" for number in staff]
+    sample = probes[:args.linear_lookups]
+    started = time.perf_counter()
+    legacy_found = sum(1 for probe in sample if probe in legacy)
+    elapsed = time.perf_counter() - started
+    print(
+        f"list scan: {len(sample) / elapsed:,.0f} lookups/s"
+        f" ({elapsed / len(sample) * 1e6:.0f} us each, {legacy_found} of {len(sample)} found,"
+        f" other formats never match)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Микробенчмарк формирования текста заказа: исходный парсер против текущего.
+
+Запуск из корня репозитория::
+
+    python -m benchmarks.bench_render --products 10 100 500 --additions 3
+
+Колонки: ``before`` — исходная реализация, ``validate`` — проверка словаря
+моделью ``OrderMessage`` (в API её делает FastAPI до рендера), ``cold`` —
+рендер проверенной модели с пустым кешем секций, ``edit`` — повторный
+рендер того же заказа со сменой статуса (типичный /edit_chat,
+шапка/доставка/состав берутся из кеша).
+"""
+import argparse
+import os
+import timeit
+
+os.environ.setdefault("BOT", "benchmark")
+
+from api_routes.parse_utills import clear_render_cache, parse_order_message  # noqa: E402
+from api_routes.py_models import OrderMessage  # noqa: E402
+from benchmarks.legacy_parse_utills import (  # noqa: E402
+    parse_order_message as legacy_parse_order_message,
+)
+from benchmarks.payloads import make_order  # noqa: E402
+
+EDIT_STATUSES = ("PAID", "IN_PROGRESS", "COMPLETED")
+
+
+def check_numeric_cache_keys() -> None:
+    """Проверяет, что 1250 и 1250.0 не берут друг у друга секции из кеша.
+
+    Исходный парсер выводит числа как есть («1250» и «1250.0»), текущий
+    должен совпадать с ним при рендере таких заказов подряд.
+    """
+    clear_render_cache()
+    for total, price, addition_price in ((1250, 300, 90), (1250.0, 300.0, 90.0)):
+        order = make_order(products=2, additions=2)
+        order["totalCost"] = total
+        order["delivery"] = dict(order["delivery"], price=price)
+        for product in order["products"]:
+            for addition in product["additions"]:
+                addition["price"] = addition_price
+        assert parse_order_message(order) == legacy_parse_order_message(order), (
+            f"totalCost={total!r}, delivery.price={price!r}"
+        )
+
+
+def measure(func, products: int, repeat: int) -> float:
+    """Возвращает лучшее время одного вызова в микросекундах."""
+    number = max(1, 2000 // max(1, products))
+    timings = timeit.repeat(func, number=number, repeat=repeat)
+    return min(timings) / number * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, nargs="+", default=[5, 100, 500])
+    parser.add_argument("--additions", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    check_numeric_cache_keys()
+    print(f"{'products':>8} {'before, us':>12} {'validate, us':>13} {'cold, us':>10} "
+          f"{'edit, us':>10}")
+    for products in args.products:
+        order = make_order(products=products, additions=args.additions)
+        model = OrderMessage.model_validate(order)
+        assert parse_order_message(model) == legacy_parse_order_message(order)
+
+        def cold():
+            clear_render_cache()
+            parse_order_message(model)
+
+        edits = [
+            OrderMessage.model_validate(dict(order, status=status)) for status in EDIT_STATUSES
+        ]
+        counter = iter(range(10 ** 9))
+
+        def edit():
+            parse_order_message(edits[next(counter) % len(edits)])
+
+        before = measure(lambda: legacy_parse_order_message(order), products, args.repeat)
+        validate = measure(lambda: OrderMessage.model_validate(order), products, args.repeat)
+        cold_time = measure(cold, products, args.repeat)
+        edit_time = measure(edit, products, args.repeat)
+        print(f"{products:>8} {before:>12.1f} {validate:>13.1f} {cold_time:>10.1f} "
+              f"{edit_time:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
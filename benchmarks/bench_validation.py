@@ -0,0 +1,103 @@
+"""Пропускная способность проверки и формирования запроса /send_chat.
+
+Сравнивает прежний ручной путь (проверка списка ключей словаря и отрисовка
+из словаря) с текущим: проверка моделью ``SendChatRequest`` и отрисовка из
+атрибутов модели. Отправка в Telegram не выполняется.
+
+Запуск из корня репозитория::
+
+    python -m benchmarks.bench_validation --products 5 50 300
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault("BOT", "benchmark")
+
+from api_routes.parse_utills import clear_render_cache, parse_order_message  # noqa: E402
+from api_routes.py_models import SendChatRequest  # noqa: E402
+from api_routes.routers import build_order_keyboard  # noqa: E402
+from benchmarks.legacy_parse_utills import (  # noqa: E402
+    parse_order_message as legacy_parse_order_message,
+)
+from benchmarks.payloads import make_order  # noqa: E402
+
+LEGACY_REQUIRED_KEYS = [
+    "delivery",
+    "products",
+    "places",
+    "status",
+    "orderNumber",
+    "customerInfo",
+    "totalCost",
+]
+
+
+def manual_path(dict_data: dict):
+    """Прежняя обработка: проверка ключей и отрисовка из словаря."""
+    if "message" not in dict_data or "chat_id" not in dict_data:
+        raise ValueError("invalid")
+    message_data = dict_data["message"]
+    missing_keys = [key for key in LEGACY_REQUIRED_KEYS if key not in message_data]
+    if missing_keys:
+        raise ValueError("invalid")
+    text = legacy_parse_order_message(message_data)
+    status = message_data["status"]
+    keyboard = None
+    if status in ("PAID", "IN_PROGRESS"):
+        keyboard = {"order_id": message_data["id"], "status": status}
+    return text, keyboard
+
+
+def model_path(dict_data: dict):
+    request = SendChatRequest.model_validate(dict_data)
+    return parse_order_message(request.message), build_order_keyboard(request.message)
+
+
+def model_path_cold(dict_data: dict):
+    clear_render_cache()
+    return model_path(dict_data)
+
+
+def throughput(func, payloads, seconds: float) -> float:
+    """Количество обработанных запросов в секунду за ``seconds`` секунд."""
+    count = 0
+    deadline = time.perf_counter() + seconds
+    started = time.perf_counter()
+    while time.perf_counter() < deadline:
+        for payload in payloads:
+            func(payload)
+        count += len(payloads)
+    return count / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, nargs="+", default=[5, 50, 300])
+    parser.add_argument("--additions", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=1.0)
+    args = parser.parse_args()
+
+    print(f"{'products':>8} {'manual, rps':>12} {'model cold, rps':>16} {'model cached, rps':>18}")
+    for products in args.products:
+        payloads = [
+            {
+                "chat_id": 1000 + index,
+                "message": make_order(
+                    products=products,
+                    additions=args.additions,
+                    status=("PAID", "IN_PROGRESS", "COMPLETED")[index % 3],
+                    order_id=f"order-{index}",
+                ),
+            }
+            for index in range(30)
+        ]
+        assert model_path(payloads[0])[0] == manual_path(payloads[0])[0]
+        manual = throughput(manual_path, payloads, args.seconds)
+        cold = throughput(model_path_cold, payloads, args.seconds)
+        cached = throughput(model_path, payloads, args.seconds)
+        print(f"{products:>8} {manual:>12.0f} {cold:>16.0f} {cached:>18.0f}")
+
+
+if __name__ == "__main__":
+    main()
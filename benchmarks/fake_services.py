@@ -0,0 +1,140 @@
+"""Локальные заменители Telegram Bot API и внешнего API заказов для нагрузочных тестов."""
+import asyncio
+import random
+from collections import Counter
+from typing import Optional
+
+from aiohttp import web
+
+
+class FakeService:
+    """Базовый aiohttp-сервер с настраиваемой задержкой ответа."""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, seed: Optional[int] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.calls = Counter()
+        self._random = random.Random(seed)
+        self._runner: Optional[web.AppRunner] = None
+        self.port: Optional[int] = None
+
+    def build_app(self) -> web.Application:
+        raise NotImplementedError
+
+    async def delay(self) -> None:
+        delay = self.latency + self._random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Запускает сервер и возвращает его базовый адрес."""
+        self._runner = web.AppRunner(self.build_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return f"http://{host}:{self.port}"
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+
+class FakeTelegramServer(FakeService):
+    """Заменитель Telegram Bot API: отвечает на методы, которыми пользуются API и бот.
+
+    ``rate_limit_ratio`` — доля ответов 429 с ``retry_after``,
+    ``error_ratio`` — доля ответов 502.
+    """
+
+    def __init__(
+        self,
+        *args,
+        rate_limit_ratio: float = 0.0,
+        retry_after: float = 1.0,
+        error_ratio: float = 0.0,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.rate_limit_ratio = rate_limit_ratio
+        self.retry_after = retry_after
+        self.error_ratio = error_ratio
+        self._message_id = 0
+
+    def build_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        return app
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        if request.content_type == "application/json":
+            payload = await request.json()
+        else:
+            payload = dict(await request.post())
+        await self.delay()
+
+        roll = self._random.random()
+        if roll < self.rate_limit_ratio:
+            self.calls[f"{method}:429"] += 1
+            return web.json_response(
+                {
+                    "ok": False,
+                    "error_code": 429,
+                    "description": "Too Many Requests: retry later",
+                    "parameters": {"retry_after": self.retry_after},
+                },
+                status=429,
+            )
+        if roll < self.rate_limit_ratio + self.error_ratio:
+            self.calls[f"{method}:502"] += 1
+            return web.json_response(
+                {"ok": False, "error_code": 502, "description": "Bad Gateway"}, status=502
+            )
+
+        self.calls[method] += 1
+        return web.json_response({"ok": True, "result": self.result_for(method, payload)})
+
+    def result_for(self, method: str, payload: dict):
+        if method == "getMe":
+            return {"id": 1, "is_bot": True, "first_name": "fake", "username": "fake_bot"}
+        if method in ("sendMessage", "editMessageText", "editMessageReplyMarkup"):
+            if method == "sendMessage":
+                self._message_id += 1
+                message_id = self._message_id
+            else:
+                message_id = int(payload.get("message_id", 0))
+            return {
+                "message_id": message_id,
+                "date": 0,
+                "chat": {"id": int(payload.get("chat_id", 0)), "type": "private"},
+                "text": payload.get("text", ""),
+            }
+        return True
+
+
+class FakeOrderService(FakeService):
+    """Заменитель внешнего API заказов: смена статуса и проверка номера."""
+
+    def __init__(self, *args, error_ratio: float = 0.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.error_ratio = error_ratio
+
+    def build_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_put("/v1/orders/{order_id}/status", self.update_status)
+        app.router.add_post("/v1/check_access", self.check_access)
+        return app
+
+    async def update_status(self, request: web.Request) -> web.Response:
+        await self.delay()
+        if self._random.random() < self.error_ratio:
+            self.calls["status:500"] += 1
+            return web.json_response({"detail": "error"}, status=500)
+        self.calls["status"] += 1
+        return web.json_response({"message": "ok"})
+
+    async def check_access(self, request: web.Request) -> web.Response:
+        await self.delay()
+        self.calls["check_access"] += 1
+        return web.json_response({"authorized": True})
@@ -0,0 +1,319 @@
+"""Нагрузочный тест API и бота на локальных заменителях Telegram и API заказов.
+
+Поднимает FakeTelegramServer и FakeOrderService, направляет на них настройки
+(``TELEGRAM_API_BASE``, ``EXTERNAL_API_URL``), запускает FastAPI-приложение
+через uvicorn и прогоняет жизненный цикл заказа с заданной конкурентностью:
+``/send_chat`` → ``/edit_chat`` → нажатие кнопки в боте → ``/delete_message``.
+
+По умолчанию приложение работает в этом же процессе, а нажатия кнопок
+передаются диспетчеру бота напрямую. С ``--workers N`` API запускается
+отдельной командой ``uvicorn --workers N`` (при N > 1 с ``SHARED_STATE``),
+бот принимает нажатия через вебхук API, и для этапа ``callback`` измеряется
+время приёма обновления.
+
+Запуск из корня репозитория::
+
+    python -m benchmarks.load_test --orders 500 --concurrency 50 --chats 100 \\
+        --tg-latency 0.05 --tg-429-ratio 0.01
+    python -m benchmarks.load_test --workers 4 --tg-global-rate 10000 --tg-chat-rate 1000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+import aiohttp
+
+from benchmarks.fake_services import FakeOrderService, FakeTelegramServer
+from benchmarks.payloads import make_order
+
+API_PREFIX = "/book-eat/api/v1"
+STAGES = ("send_chat", "edit_chat", "callback", "delete_message")
+WEBHOOK_PATH_URL = "{}/telegram/webhook"
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def callback_update(update_id: int, chat_id: int, message_id: int, data: str) -> dict:
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "from": {"id": chat_id, "is_bot": False, "first_name": "Staff"},
+            "chat_instance": str(chat_id),
+            "data": data,
+            "message": {
+                "message_id": message_id,
+                "date": 0,
+                "chat": {"id": chat_id, "type": "private"},
+            },
+        },
+    }
+
+
+class LoadTest:
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.failures: Dict[str, int] = defaultdict(int)
+
+    async def timed(self, stage: str, coroutine) -> dict:
+        started = time.perf_counter()
+        try:
+            result = await coroutine
+        except Exception as e:
+            result = {"status": 599, "message": str(e)}
+        self.latencies[stage].append(time.perf_counter() - started)
+        if result.get("status") not in (200, None):
+            self.failures[stage] += 1
+        return result
+
+    async def api_call(self, session, method: str, path: str, **kwargs) -> dict:
+        async with session.request(method, self.api_url + path, **kwargs) as response:
+            return await response.json()
+
+    async def press_button(self, session, update: dict) -> dict:
+        if self.args.workers:
+            async with session.post(WEBHOOK_PATH_URL.format(self.api_url), json=update) as response:
+                return {"status": response.status}
+
+        from aiogram import types
+
+        import bot as bot_module
+
+        await bot_module.dp.feed_update(
+            bot_module.get_bot(),
+            types.Update.model_validate(update, context={"bot": bot_module.get_bot()}),
+        )
+        return {"status": 200}
+
+    async def run_order(self, session, index: int) -> None:
+        args = self.args
+        chat_id = 10_000 + index % args.chats
+        order = make_order(
+            products=args.products, additions=args.additions, order_id=f"load-{index}"
+        )
+        stages = set(args.stages)
+
+        result = await self.timed(
+            "send_chat",
+            self.api_call(
+                session, "POST", f"{API_PREFIX}/send_chat",
+                json={"chat_id": chat_id, "message": order},
+            ),
+        )
+        message_id = result.get("message_id")
+        if message_id is None:
+            return
+
+        if "edit_chat" in stages:
+            await self.timed(
+                "edit_chat",
+                self.api_call(
+                    session, "POST", f"{API_PREFIX}/edit_chat",
+                    json={
+                        "chat_id": chat_id,
+                        "message_id": message_id,
+                        "message": dict(order, status="IN_PROGRESS"),
+                    },
+                ),
+            )
+
+        if "callback" in stages:
+            update = callback_update(
+                index, chat_id, message_id, f"order_complete:{order['id']}"
+            )
+            await self.timed("callback", self.press_button(session, update))
+
+        if "delete_message" in stages:
+            await self.timed(
+                "delete_message",
+                self.api_call(
+                    session, "DELETE", f"{API_PREFIX}/delete_message",
+                    params={"chat_id": chat_id, "message_id": message_id},
+                ),
+            )
+
+    async def run(self) -> None:
+        args = self.args
+        telegram = FakeTelegramServer(
+            latency=args.tg_latency,
+            jitter=args.tg_jitter,
+            rate_limit_ratio=args.tg_429_ratio,
+            retry_after=args.tg_retry_after,
+            error_ratio=args.tg_error_ratio,
+            seed=1,
+        )
+        orders_api = FakeOrderService(latency=args.order_latency, seed=2)
+        telegram_url = await telegram.start()
+        orders_url = await orders_api.start()
+
+        # Настройки читаются при импорте модулей приложения
+        os.environ.update({
+            "BOT": os.environ.get("BOT", "123456:load-test"),
+            "TELEGRAM_API_BASE": telegram_url,
+            "EXTERNAL_API_URL": orders_url + "/",
+            "EXTERNAL_API_CHECK_ACCESS": orders_url + "/v1/check_access",
+            "BOT_STORAGE": "memory",
+            "BOT_METRICS_PORT": "0",
+            "DATA_DIR": tempfile.mkdtemp(prefix="orders-bot-load-"),
+        })
+        if args.tg_global_rate:
+            os.environ["TELEGRAM_GLOBAL_RATE"] = str(args.tg_global_rate)
+            os.environ["TELEGRAM_GLOBAL_BURST"] = str(args.tg_global_rate)
+        if args.tg_chat_rate:
+            os.environ["TELEGRAM_CHAT_RATE"] = str(args.tg_chat_rate)
+            os.environ["TELEGRAM_CHAT_BURST"] = str(args.tg_chat_rate)
+        self.api_url = f"http://127.0.0.1:{args.api_port}"
+        if args.workers:
+            stop_api = await self.start_api_process(telegram_url)
+        else:
+            stop_api = await self.start_api_inprocess()
+
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def worker(session, index):
+            async with semaphore:
+                await self.run_order(session, index)
+
+        connector = aiohttp.TCPConnector(limit=args.concurrency)
+        started = time.perf_counter()
+        async with aiohttp.ClientSession(connector=connector) as session:
+            await asyncio.gather(*(worker(session, index) for index in range(args.orders)))
+        elapsed = time.perf_counter() - started
+
+        await stop_api()
+        await telegram.stop()
+        await orders_api.stop()
+        self.report(elapsed, telegram)
+
+    async def start_api_inprocess(self):
+        import uvicorn
+
+        import app as app_module
+        import bot as bot_module
+
+        server = uvicorn.Server(
+            uvicorn.Config(
+                app_module.app, host="127.0.0.1", port=self.args.api_port,
+                log_level="warning", lifespan="on",
+            )
+        )
+        server_task = asyncio.create_task(server.serve())
+        while not server.started:
+            await asyncio.sleep(0.05)
+
+        async def stop():
+            server.should_exit = True
+            await server_task
+            await bot_module.get_bot().session.close()
+
+        return stop
+
+    async def start_api_process(self, telegram_url: str):
+        env = dict(
+            os.environ,
+            BOT_MODE="webhook",
+            WEBHOOK_IN_API="true",
+            WEBHOOK_URL=telegram_url,
+            WEBHOOK_PATH="/telegram/webhook",
+            API_RELOAD="false",
+        )
+        if self.args.workers > 1:
+            env["SHARED_STATE"] = "true"
+            # Хранилище бота должно быть общим для процессов
+            env["BOT_STORAGE"] = "sqlite"
+        process = subprocess.Popen(
+            [
+                sys.executable, "-m", "uvicorn", "app:app",
+                "--host", "127.0.0.1", "--port", str(self.args.api_port),
+                "--workers", str(self.args.workers), "--log-level", "warning",
+            ],
+            env=env,
+        )
+        # Ждём, пока ответят все процессы
+        async with aiohttp.ClientSession() as session:
+            for _ in range(600):
+                try:
+                    async with session.get(self.api_url + "/metrics") as response:
+                        if response.status == 200:
+                            break
+                except aiohttp.ClientError:
+                    pass
+                await asyncio.sleep(0.1)
+        await asyncio.sleep(1.0)
+
+        async def stop():
+            process.terminate()
+            await asyncio.to_thread(process.wait)
+
+        return stop
+
+    def report(self, elapsed: float, telegram: FakeTelegramServer) -> None:
+        print(f"orders: {self.args.orders}, concurrency: {self.args.concurrency}, "
+              f"chats: {self.args.chats}, workers: {self.args.workers or 'in-process'}, "
+              f"elapsed: {elapsed:.2f} s")
+        print(f"{'stage':>15} {'count':>7} {'fail':>5} {'p50, ms':>9} "
+              f"{'p95, ms':>9} {'p99, ms':>9} {'mean, ms':>9}")
+        for stage in STAGES:
+            values = self.latencies.get(stage)
+            if not values:
+                continue
+            print(
+                f"{stage:>15} {len(values):>7} {self.failures[stage]:>5} "
+                f"{percentile(values, 0.50) * 1000:>9.1f} "
+                f"{percentile(values, 0.95) * 1000:>9.1f} "
+                f"{percentile(values, 0.99) * 1000:>9.1f} "
+                f"{statistics.fmean(values) * 1000:>9.1f}"
+            )
+        delivered = sum(
+            count for method, count in telegram.calls.items() if ":" not in method
+        )
+        rejected = sum(count for method, count in telegram.calls.items() if ":" in method)
+        print(f"telegram calls: {delivered} ok, {rejected} rejected; "
+              f"{delivered / elapsed:.1f} messages/s")
+        print("by method:", dict(sorted(telegram.calls.items())))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--chats", type=int, default=50)
+    parser.add_argument("--products", type=int, default=10)
+    parser.add_argument("--additions", type=int, default=2)
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--api-port", type=int, default=8765)
+    parser.add_argument(
+        "--workers", type=int, default=0,
+        help="запустить API отдельными процессами uvicorn (0 — в этом процессе)",
+    )
+    parser.add_argument("--tg-latency", type=float, default=0.03)
+    parser.add_argument("--tg-jitter", type=float, default=0.01)
+    parser.add_argument("--tg-429-ratio", type=float, default=0.0)
+    parser.add_argument("--tg-retry-after", type=float, default=1.0)
+    parser.add_argument("--tg-error-ratio", type=float, default=0.0)
+    parser.add_argument("--order-latency", type=float, default=0.02)
+    parser.add_argument(
+        "--tg-global-rate", type=float, default=0.0,
+        help="переопределить TELEGRAM_GLOBAL_RATE (как у локального Bot API сервера)",
+    )
+    parser.add_argument("--tg-chat-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    asyncio.run(LoadTest(args).run())
+
+
+if __name__ == "__main__":
+    main()
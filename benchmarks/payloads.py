@@ -0,0 +1,59 @@
+"""Генераторы реалистичных заказов для бенчмарков."""
+
+
+def make_order(
+    products: int = 5,
+    additions: int = 2,
+    status: str = "PAID",
+    order_id: str = "order-1",
+    delivery_type: str = "DELIVERY",
+) -> dict:
+    """Возвращает заказ в формате ``OrderMessage`` с заданным числом позиций."""
+    return {
+        "id": order_id,
+        "comment": None,
+        "personsCount": 4,
+        "totalCost": 1250.0 * products,
+        "readyTime": "2024-12-24T16:30:00Z",
+        "createdAt": "2024-12-24T15:55:00Z",
+        "customerInfo": {
+            "customerName": "Иван Петров",
+            "customerEmail": "ivan@example.com",
+            "customerPhone": "+79991234567",
+        },
+        "delivery": {
+            "id": "delivery-1",
+            "type": delivery_type,
+            "address": "ул. Ленина, д. 1",
+            "flat": "12",
+            "floor": "3",
+            "porch": "2",
+            "doorCode": "12#34",
+            "price": 300,
+            "pickupCode": "4821",
+        },
+        "products": [
+            {
+                "id": f"product-{index}",
+                "amount": 1 + index % 3,
+                "title": f"Пицца «Маргарита» {{{index}}}",
+                "price": 590.0,
+                "weight": "450 г",
+                "additions": [
+                    {
+                        "id": f"addition-{index}-{sub}",
+                        "amount": 1,
+                        "title": f"Сыр | дополнительный {sub}",
+                        "price": 90.0,
+                    }
+                    for sub in range(additions)
+                ],
+            }
+            for index in range(products)
+        ],
+        "order_link": "https://book-eat.example/orders/1?view=full",
+        "places": {"id": "place-1", "title": "Зал №2"},
+        "orderNumber": 1024,
+        "status": status,
+        "restaurantAddress": "пр. Мира, д. 10",
+    }
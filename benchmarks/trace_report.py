@@ -0,0 +1,72 @@
+"""Сводка по файлу трасс (``TRACING_EXPORTER=file``): где уходит время заказа.
+
+Выводит длительность спанов по имени и время от отправки заказа в чат до
+нажатия кнопки сотрудником по ресторану и действию.
+
+Запуск из корня репозитория::
+
+    TRACING_EXPORTER=file TRACING_FILE=traces.jsonl \\
+        python -m benchmarks.load_test --orders 200
+    python -m benchmarks.trace_report traces.jsonl
+"""
+import argparse
+import json
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from benchmarks.load_test import percentile
+
+
+def read_spans(path: str) -> List[dict]:
+    spans = []
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                spans.append(json.loads(line))
+    return spans
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", help="файл трасс, по умолчанию DATA_DIR/traces.jsonl")
+    args = parser.parse_args()
+
+    spans = read_spans(args.path)
+    durations: Dict[str, List[float]] = defaultdict(list)
+    acks: Dict[Tuple[str, str], List[float]] = defaultdict(list)
+    for span in spans:
+        attributes = span["attributes"]
+        name = span["name"]
+        if name.startswith("http ") and "route" in attributes:
+            name = f"{name} {attributes['route']}"
+        durations[name].append(span["duration"])
+        if span["name"] == "bot.order_callback" and "ack_seconds" in attributes:
+            acks[(attributes["restaurant"], attributes["action"])].append(
+                attributes["ack_seconds"]
+            )
+
+    traces = len({span["trace_id"] for span in spans})
+    print(f"spans: {len(spans)}, traces: {traces}")
+    print(f"{'span':<48} {'count':>7} {'p50, ms':>9} {'p95, ms':>9} {'p99, ms':>9}")
+    for name, values in sorted(durations.items(), key=lambda item: -sum(item[1])):
+        print(
+            f"{name:<48} {len(values):>7} "
+            f"{percentile(values, 0.50) * 1000:>9.1f} "
+            f"{percentile(values, 0.95) * 1000:>9.1f} "
+            f"{percentile(values, 0.99) * 1000:>9.1f}"
+        )
+
+    if acks:
+        print()
+        print(f"{'restaurant':<30} {'action':<16} {'count':>7} {'p50, s':>9} "
+              f"{'p95, s':>9} {'max, s':>9}")
+        for (restaurant, action), values in sorted(acks.items()):
+            print(
+                f"{restaurant:<30} {action:<16} {len(values):>7} "
+                f"{percentile(values, 0.50):>9.1f} {percentile(values, 0.95):>9.1f} "
+                f"{max(values):>9.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,99 @@
 import asyncio
+import logging
+import signal
+import time
+from typing import Optional
 from urllib.parse import urlencode, urljoin
 
 from aiogram import F, Router
 from aiogram.filters import Command, CommandStart
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.types import (
     ReplyKeyboardRemove,
 )
 from aiogram.utils.keyboard import ReplyKeyboardBuilder
-
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+import aiohttp
+from aiohttp import web
+
+from api_routes.order_cards import refresh_order_cards
+from api_routes.parse_utills import STATUS_MAPPING
+from api_routes.py_models import OrderMessage
+from src.core.bot_storage import build_bot_storage
+from src.core.circuit_breaker import CircuitOpenError, circuit_breaker
+from src.core.dedup import ActionDeduplicator, DedupDatabase
+from src.core.edit_coalescer import edit_coalescer
+from src.core.http_client import http_client, origins
+from src.core.lifecycle import lifecycle, ready_handler
+from src.core.message_state import message_state_store
+from src.core.order_index import order_index
+from src.core.outbox import OutboxEntry, OutboxStore, StatusOutbox
+from src.core.phones import normalize_phone
+from src.core.metrics import (
+    BOT_CALLBACKS_TOTAL,
+    BOT_UPDATES_IN_FLIGHT,
+    EXTERNAL_API_SECONDS,
+    ORDER_ACK_SECONDS,
+    REGISTRY,
+    start_metrics_server,
+)
 from src.core.settings import settings
+from src.core.telegram_client import build_bot_session
+from src.core.telegram_scheduler import telegram_scheduler
+from src.core.tracing import TraceContext, trace_headers, tracer
 from aiogram import Bot, Dispatcher, types
 from dotenv import load_dotenv
-import aiohttp
 
 
 load_dotenv()
+logger = logging.getLogger(__name__)
 EXTERNAL_API_URL = settings.EXTERNAL_API_URL
 API_CHECK_PHONE = settings.EXTERNAL_API_CHECK_ACCESS
-bot_key = settings.BOT
-bot = Bot(token=bot_key)
+ORDER_STATUS_TIMEOUT = aiohttp.ClientTimeout(total=settings.EXTERNAL_API_TIMEOUT_ORDER_STATUS)
+CHECK_ACCESS_TIMEOUT = aiohttp.ClientTimeout(total=settings.EXTERNAL_API_TIMEOUT_CHECK_ACCESS)
 
 router = Router()
+_bot: Optional[Bot] = None
 
-dp = Dispatcher(storage=MemoryStorage())
+
+def get_bot() -> Bot:
+    """Создаёт бота при первом обращении, а не при импорте модуля."""
+    global _bot
+    if _bot is None:
+        _bot = Bot(token=settings.BOT, session=build_bot_session())
+    return _bot
+
+
+fsm_storage, auth_cache = build_bot_storage()
+callback_dedup = ActionDeduplicator(
+    settings.CALLBACK_DEDUP_TTL,
+    DedupDatabase.in_data_dir("dedup.sqlite3") if settings.SHARED_STATE else None,
+)
+dp = Dispatcher(storage=fsm_storage)
 dp.include_router(router)
 
 
+REGISTRY.register_collector(
+    "bot_order_callbacks_deduplicated_total", "counter",
+    "Повторные нажатия кнопок заказа, склеенные с первым",
+    lambda: [
+        ("bot_order_callbacks_deduplicated_total", {"stage": "inflight"},
+         callback_dedup.collapsed_inflight),
+        ("bot_order_callbacks_deduplicated_total", {"stage": "recent"},
+         callback_dedup.collapsed_recent),
+    ],
+)
+
+
+@dp.update.outer_middleware()
+async def track_updates(handler, event, data):
+    with lifecycle.track(), BOT_UPDATES_IN_FLIGHT.track_inprogress(), tracer.span(
+        "bot.update", update_id=event.update_id, update_type=event.event_type
+    ):
+        return await handler(event, data)
+
+
 class Authorization(StatesGroup):
     waiting_for_phone_number = State()
 
@@ -49,7 +114,8 @@ async def process_start_command(message: types.Message, state: FSMContext):
 @router.message(F.contact, Authorization.waiting_for_phone_number)
 async def process_contact(message: types.Message, state: FSMContext):
     """Обрабатывает отправленный контакт."""
-    phone_number = message.contact.phone_number
+    # Номер проверяется и кешируется в том же виде, что и в реестре API
+    phone_number = normalize_phone(message.contact.phone_number) or message.contact.phone_number
     user_id = message.from_user.id
 
     await message.reply(
@@ -63,27 +129,47 @@ async def authorize_phone(
 ):
     """Функция для проверки номера телефона через внешний API."""
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                API_CHECK_PHONE,
-                json={"phone_number": phone_number, "user_id": user_id},
-            ) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    is_authorized = data.get("authorized", False)
-
-                    if is_authorized:
-                        await message.reply(
-                            "Вы успешно авторизованы. Теперь вы будете получать уведомления."
-                        )
-                    else:
-                        await message.reply(
-                            "Ваш номер телефона не зарегистрирован в нашей базе. Пожалуйста обратитесь за помощью в службу поддержки Book-Eat."
-                        )
-                else:
-                    await message.reply(
-                        "Произошла ошибка при проверке номера телефона."
-                    )
+        is_authorized = await auth_cache.get(user_id, phone_number)
+        if is_authorized is None:
+            with circuit_breaker("check_access").guard() as attempt, EXTERNAL_API_SECONDS.time(
+                endpoint="check_access", outcome="error"
+            ) as labels, tracer.span("external_api.check_access") as span:
+                session = http_client.session
+                async with session.post(
+                    API_CHECK_PHONE,
+                    json={"phone_number": phone_number, "user_id": user_id},
+                    headers=trace_headers(),
+                    timeout=CHECK_ACCESS_TIMEOUT,
+                ) as response:
+                    span.set(http_status=response.status)
+                    labels["outcome"] = "success" if response.status == 200 else "failure"
+                    attempt["failed"] = response.status >= 500
+                    if response.status == 200:
+                        data = await response.json()
+            if labels["outcome"] != "success":
+                await message.reply(
+                    "Произошла ошибка при проверке номера телефона."
+                )
+                return
+            is_authorized = data.get("authorized", False)
+            await auth_cache.set(user_id, phone_number, is_authorized)
+
+        if is_authorized:
+            await message.reply(
+                "Вы успешно авторизованы. Теперь вы будете получать уведомления."
+            )
+        else:
+            await message.reply(
+                "Ваш номер телефона не зарегистрирован в нашей базе. Пожалуйста обратитесь за помощью в службу поддержки Book-Eat."
+            )
+    except CircuitOpenError:
+        await message.reply(
+            "Сервис проверки номера временно недоступен. Попробуйте через минуту."
+        )
+    except asyncio.TimeoutError:
+        await message.reply(
+            "Сервис проверки номера не ответил вовремя. Попробуйте позже."
+        )
     except Exception as e:
         await message.reply(f"Произошла ошибка {e}. Попробуйте позже.")
     finally:
@@ -123,22 +209,107 @@ async def send_request_to_url(url, params=None):
         if params:
             query_string = urlencode(params)
             external_url = f"{external_url}?{query_string}"
-        async with aiohttp.ClientSession() as session:
-            async with session.put(external_url) as response:
+        with circuit_breaker("order_status").guard() as attempt, EXTERNAL_API_SECONDS.time(
+            endpoint="order_status", outcome="error"
+        ) as labels, tracer.span("external_api.order_status", url=url) as span:
+            session = http_client.session
+            # Бэкенд заказов может продолжить трассу нажатия
+            async with session.put(
+                external_url, headers=trace_headers(), timeout=ORDER_STATUS_TIMEOUT
+            ) as response:
+                span.set(http_status=response.status)
                 if response.status == 200:
+                    labels["outcome"] = "success"
                     return {"success": True, "message": "Request successful"}
                 else:
+                    labels["outcome"] = "failure"
+                    attempt["failed"] = response.status >= 500
                     return {
                         "success": False,
+                        # 5xx — сбой на стороне API, такой запрос стоит повторить
+                        "retryable": response.status >= 500,
                         "message": f"Failed to send request. Status: {response.status}",
                     }
+    except CircuitOpenError as e:
+        return {"success": False, "retryable": True, "unavailable": True, "message": str(e)}
+    except asyncio.TimeoutError:
+        return {"success": False, "retryable": True, "message": "External API timed out"}
     except Exception as e:
-        return {"success": False, "message": f"Error sending request: {e}"}
+        return {"success": False, "retryable": True, "message": f"Error sending request: {e}"}
+
+
+async def send_order_status(order_id: str, status: str) -> dict:
+    return await send_request_to_url(f"v1/orders/{order_id}/status?status={status}")
+
+
+async def update_order_card(order_id: str, status: str) -> bool:
+    """Перерисовывает карточки заказа с новым статусом.
+
+    Возвращает False, если заказа нет в индексе или ни одну карточку
+    изменить не удалось.
+    """
+    payload = await order_index.get_order(order_id)
+    if payload is None:
+        return False
+    payload = dict(payload, status=status)
+    results = await refresh_order_cards(
+        order_id, OrderMessage.model_validate(payload), payload
+    )
+    return any(result["status"] == 200 for result in results)
+
+
+async def notify_replayed_status(entry: OutboxEntry, result: dict, delivered: bool) -> None:
+    """Сообщает о смене статуса, отправленной из очереди повторов."""
+    if delivered:
+        if await update_order_card(entry.order_id, entry.status):
+            return
+        status_text = STATUS_MAPPING.get(entry.status, entry.status)
+        text = f"Статус заказа {entry.order_id} изменён: {status_text}"
+    else:
+        text = (
+            f"Не удалось изменить статус заказа {entry.order_id}. "
+            "Нажмите кнопку ещё раз или обратитесь в поддержку."
+        )
+    if entry.chat_id is not None:
+        await get_bot().send_message(entry.chat_id, text)
+
+
+status_outbox = StatusOutbox(
+    OutboxStore.in_data_dir("outbox.sqlite3"), send_order_status, notify_replayed_status
+)
+
+
+@dp.startup()
+async def start_status_outbox() -> None:
+    await status_outbox.start()
+
+
+@dp.shutdown()
+async def stop_status_outbox() -> None:
+    await status_outbox.stop()
+
+
+QUEUED_MESSAGE = (
+    "Сервис заказов не ответил. Смена статуса сохранена и будет отправлена "
+    "автоматически, нажимать повторно не нужно."
+)
+UNAVAILABLE_MESSAGE = (
+    "Сервис заказов временно недоступен. Смена статуса сохранена и будет "
+    "отправлена автоматически, нажимать повторно не нужно."
+)
+
+
+# Исходы нажатия, при которых сотрудник отреагировал на заказ
+ACKNOWLEDGED_OUTCOMES = frozenset({"success", "queued", "unavailable"})
 
 
 @dp.callback_query(lambda c: c.data and c.data.startswith("order"))
 async def handle_order_callback(callback_query: types.CallbackQuery):
-    """Обрабатывает нажатие кнопки для подтверждения/отмены заказа."""
+    """Обрабатывает нажатие кнопки для подтверждения/отмены заказа.
+
+    Нажатие продолжает трассу отправки заказа из индекса заказов; время
+    от отправки до нажатия пишется в ``order_acknowledgement_seconds``.
+    """
     callback_data = callback_query.data
 
     try:
@@ -147,6 +318,23 @@ async def handle_order_callback(callback_query: types.CallbackQuery):
         await callback_query.answer("Некорректный формат данных")
         return
 
+    sent = await order_index.get_trace(order_id)
+    parent = TraceContext(sent.trace_id, sent.span_id) if sent and sent.trace_id else None
+    with tracer.span(
+        "bot.order_callback", parent=parent, root=True, order_id=order_id, action=action
+    ) as span:
+        outcome = await process_order_callback(callback_query, action, order_id)
+        span.set(outcome=outcome)
+        if sent is not None and outcome in ACKNOWLEDGED_OUTCOMES:
+            ack_seconds = time.time() - sent.sent_at
+            ORDER_ACK_SECONDS.observe(ack_seconds, restaurant=sent.restaurant, action=action)
+            span.set(restaurant=sent.restaurant, ack_seconds=round(ack_seconds, 3))
+
+
+async def process_order_callback(
+    callback_query: types.CallbackQuery, action: str, order_id: str
+) -> str:
+    """Меняет статус заказа по нажатию и возвращает исход для метрик."""
     if action == "order_confirm":
         status = "IN_PROGRESS"
         message = "Вы подтвердили заказ, ожидайте уведомлений."
@@ -160,23 +348,148 @@ async def handle_order_callback(callback_query: types.CallbackQuery):
         status = "UNKNOWN"
         message = "Произошла ошибка при обработке статуса заказа"
 
-    url = f"v1/orders/{order_id}/status?status={status}"
-    response = await send_request_to_url(url)
+    # Двойное нажатие не должно менять статус и писать в чат повторно;
+    # смена статуса, отложенная в очередь повторов, тоже считается принятой
+    response, duplicate = await callback_dedup.run(
+        (order_id, action),
+        lambda: status_outbox.deliver(order_id, status, callback_query.message.chat.id),
+        remember=lambda result: result["success"] or result.get("queued", False),
+    )
+    queued = response.get("queued", False)
+
+    if duplicate:
+        outcome = "duplicate"
+    elif queued:
+        outcome = "unavailable" if response.get("unavailable") else "queued"
+    else:
+        outcome = "success" if response["success"] else "failure"
+    BOT_CALLBACKS_TOTAL.inc(action=action, outcome=outcome)
+
+    # Карточку меняет только обработчик первого нажатия; если заказа нет
+    # в индексе, как раньше пишем в чат отдельное сообщение
+    if not duplicate and not queued:
+        if response["success"]:
+            updated = False
+            if status != "UNKNOWN":
+                try:
+                    updated = await update_order_card(order_id, status)
+                except Exception:
+                    updated = False
+            if not updated:
+                await callback_query.bot.send_message(
+                    callback_query.message.chat.id, message
+                )
+        else:
+            error_message = "Не удалось выполнить действие. Попробуйте позже"
+            await callback_query.bot.send_message(
+                callback_query.message.chat.id, error_message
+            )
 
     if response["success"]:
-        await bot.send_message(callback_query.message.chat.id, message)
+        await callback_query.answer(message)
+    elif queued:
+        # Карточку обновит очередь повторов, когда API ответит
+        await callback_query.answer(
+            UNAVAILABLE_MESSAGE if response.get("unavailable") else QUEUED_MESSAGE,
+            show_alert=True,
+        )
     else:
-        error_message = "Не удалось выполнить действие. Попробуйте позже"
-        await bot.send_message(callback_query.message.chat.id, error_message)
+        await callback_query.answer("Действие не выполнено.")
+    return outcome
+
+
+async def set_bot_webhook() -> None:
+    """Регистрирует вебхук бота в Telegram."""
+    if not settings.WEBHOOK_URL:
+        raise ValueError("WEBHOOK_URL must be set when BOT_MODE=webhook")
+    await get_bot().set_webhook(
+        url=settings.WEBHOOK_URL.rstrip("/") + settings.WEBHOOK_PATH,
+        secret_token=settings.WEBHOOK_SECRET or None,
+        max_connections=settings.WEBHOOK_MAX_CONNECTIONS,
+        allowed_updates=dp.resolve_used_update_types(),
+    )
+
+
+async def run_webhook(bot: Bot) -> None:
+    """Принимает обновления по вебхуку на отдельном aiohttp-сервере.
+
+    Каждое обновление обрабатывается в фоне, Telegram получает ответ сразу.
+    По SIGTERM сервер перестаёт принимать запросы; недоставленные
+    обновления Telegram пришлёт повторно.
+    """
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    app = web.Application()
+    SimpleRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        secret_token=settings.WEBHOOK_SECRET or None,
+        handle_in_background=True,
+    ).register(app, path=settings.WEBHOOK_PATH)
+    setup_application(app, dp, bot=bot)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, settings.WEBHOOK_HOST, settings.WEBHOOK_PORT)
+    await site.start()
+    try:
+        await set_bot_webhook()
+        lifecycle.mark_ready()
+        await stop.wait()
+        lifecycle.begin_drain()
+        await site.stop()
+        await lifecycle.wait_idle()
+    finally:
+        await runner.cleanup()
 
-    await callback_query.answer(
-        message if response["success"] else "Действие не выполнено."
+
+async def warmup(bot: Bot) -> None:
+    """Открывает соединения с внешним API и Telegram до первого нажатия."""
+    await http_client.warmup(
+        origins(EXTERNAL_API_URL, API_CHECK_PHONE, settings.TELEGRAM_API_BASE)
     )
+    try:
+        # Заодно проверяет токен
+        await bot.get_me()
+    except Exception as e:
+        logger.warning("Telegram warmup failed: %r", e)
 
 
 async def main() -> None:
-
-    await dp.start_polling(bot)
+    bot = get_bot()
+    await http_client.start()
+    await warmup(bot)
+    metrics_runner = None
+    if settings.BOT_METRICS_PORT:
+        metrics_runner = await start_metrics_server(
+            settings.BOT_METRICS_HOST,
+            settings.BOT_METRICS_PORT,
+            {"/ready": ready_handler},
+        )
+    try:
+        if settings.BOT_MODE == "webhook":
+            await run_webhook(bot)
+        else:
+            # Вебхук и long polling взаимоисключающие
+            await bot.delete_webhook()
+            lifecycle.mark_ready()
+            # start_polling сам останавливается по SIGTERM/SIGINT
+            await dp.start_polling(bot, close_bot_session=False)
+    finally:
+        # Дожидаемся начатых обработчиков и отправок до SHUTDOWN_TIMEOUT
+        lifecycle.begin_drain()
+        await edit_coalescer.flush()
+        await lifecycle.wait_idle()
+        await telegram_scheduler.close(lifecycle.remaining())
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        await bot.session.close()
+        await http_client.close()
+        message_state_store.close()
+        tracer.flush()
 
 
 if __name__ == "__main__":
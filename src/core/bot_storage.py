@@ -0,0 +1,186 @@
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from src.core.settings import Settings, settings
+from src.core.sqlite import SqliteDatabase
+
+
+class BotDatabase(SqliteDatabase):
+    """SQLite-база бота: состояния FSM и результаты авторизации."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS fsm (
+            key TEXT PRIMARY KEY,
+            state TEXT,
+            data TEXT NOT NULL DEFAULT '{}'
+        );
+        CREATE TABLE IF NOT EXISTS authorized_users (
+            user_id INTEGER PRIMARY KEY,
+            phone_number TEXT NOT NULL,
+            authorized INTEGER NOT NULL,
+            checked_at REAL NOT NULL
+        );
+    """
+
+
+class SqliteStorage(BaseStorage):
+    """Хранилище FSM aiogram в SQLite: состояния переживают перезапуск бота."""
+
+    def __init__(self, database: BotDatabase):
+        self._database = database
+        self._key_builder = DefaultKeyBuilder()
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        state = state.state if isinstance(state, State) else state
+
+        def upsert(conn):
+            conn.execute(
+                "INSERT INTO fsm (key, state) VALUES (?, ?)"
+                " ON CONFLICT (key) DO UPDATE SET state = excluded.state",
+                (self._key_builder.build(key), state),
+            )
+
+        await self._database.run(upsert)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        def select(conn):
+            return conn.execute(
+                "SELECT state FROM fsm WHERE key = ?", (self._key_builder.build(key),)
+            ).fetchone()
+
+        row = await self._database.run(select)
+        return row["state"] if row else None
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        def upsert(conn):
+            conn.execute(
+                "INSERT INTO fsm (key, data) VALUES (?, ?)"
+                " ON CONFLICT (key) DO UPDATE SET data = excluded.data",
+                (self._key_builder.build(key), json.dumps(data)),
+            )
+
+        await self._database.run(upsert)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        def select(conn):
+            return conn.execute(
+                "SELECT data FROM fsm WHERE key = ?", (self._key_builder.build(key),)
+            ).fetchone()
+
+        row = await self._database.run(select)
+        return json.loads(row["data"]) if row else {}
+
+    async def close(self) -> None:
+        self._database.close()
+
+
+class AuthorizationCache:
+    """Кеш результатов проверки номера во внешнем API с временем жизни.
+
+    Положительный ответ хранится ``AUTH_CACHE_TTL`` секунд, отрицательный —
+    ``AUTH_CACHE_NEGATIVE_TTL``, чтобы только что добавленный сотрудник не
+    ждал сутки. Без базы кеш живёт в памяти процесса.
+    """
+
+    def __init__(self, config: Settings = settings, database: Optional[BotDatabase] = None):
+        self._config = config
+        self._database = database
+        self._memory: Dict[int, tuple] = {}
+
+    def _is_fresh(self, authorized: bool, checked_at: float) -> bool:
+        ttl = (
+            self._config.AUTH_CACHE_TTL
+            if authorized
+            else self._config.AUTH_CACHE_NEGATIVE_TTL
+        )
+        return time.time() - checked_at < ttl
+
+    async def get(self, user_id: int, phone_number: str) -> Optional[bool]:
+        """Возвращает сохранённый результат или None, если его нет или он устарел."""
+        if self._database is None:
+            record = self._memory.get(user_id)
+        else:
+            def select(conn):
+                return conn.execute(
+                    "SELECT phone_number, authorized, checked_at"
+                    " FROM authorized_users WHERE user_id = ?",
+                    (user_id,),
+                ).fetchone()
+
+            row = await self._database.run(select)
+            record = tuple(row) if row else None
+        if record is None:
+            return None
+        cached_phone, authorized, checked_at = record
+        authorized = bool(authorized)
+        if cached_phone != phone_number or not self._is_fresh(authorized, checked_at):
+            return None
+        return authorized
+
+    async def set(self, user_id: int, phone_number: str, authorized: bool) -> None:
+        record = (phone_number, authorized, time.time())
+        if self._database is None:
+            self._memory[user_id] = record
+            return
+
+        def upsert(conn):
+            conn.execute(
+                "INSERT OR REPLACE INTO authorized_users"
+                " (user_id, phone_number, authorized, checked_at) VALUES (?, ?, ?, ?)",
+                (user_id, phone_number, int(authorized), record[2]),
+            )
+
+        await self._database.run(upsert)
+
+    async def authorized_user_ids(self, after: int = 0, limit: int = 100) -> List[int]:
+        """Страница авторизованных пользователей с ``user_id`` больше ``after``.
+
+        Постраничный обход по возрастанию ``user_id`` не зависит от смещения,
+        поэтому новые авторизации не сдвигают уже пройденные страницы.
+        """
+        if self._database is None:
+            return sorted(
+                user_id for user_id, (_, authorized, _) in self._memory.items()
+                if authorized and user_id > after
+            )[:limit]
+
+        def select(conn):
+            return conn.execute(
+                "SELECT user_id FROM authorized_users"
+                " WHERE authorized = 1 AND user_id > ? ORDER BY user_id LIMIT ?",
+                (after, limit),
+            ).fetchall()
+
+        return [row[0] for row in await self._database.run(select)]
+
+    async def count_authorized(self) -> int:
+        if self._database is None:
+            return sum(1 for _, authorized, _ in self._memory.values() if authorized)
+
+        def select(conn):
+            return conn.execute(
+                "SELECT COUNT(*) FROM authorized_users WHERE authorized = 1"
+            ).fetchone()[0]
+
+        return await self._database.run(select)
+
+
+def build_bot_storage(config: Settings = settings):
+    """Создаёт хранилище FSM и кеш авторизации по ``BOT_STORAGE``.
+
+    ``sqlite`` — данные в ``DATA_DIR/bot.sqlite3``, ``memory`` — всё в памяти
+    процесса (для локального запуска и отладки).
+    """
+    if config.BOT_STORAGE == "memory" and config.SHARED_STATE:
+        raise ValueError("BOT_STORAGE=memory cannot be shared between processes")
+    if config.BOT_STORAGE == "memory":
+        return MemoryStorage(), AuthorizationCache(config)
+    if config.BOT_STORAGE == "sqlite":
+        database = BotDatabase.in_data_dir("bot.sqlite3")
+        return SqliteStorage(database), AuthorizationCache(config, database)
+    raise ValueError(f"Unknown BOT_STORAGE: {config.BOT_STORAGE}")
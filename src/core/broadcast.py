@@ -0,0 +1,327 @@
+import asyncio
+import time
+import uuid
+from collections import Counter
+from typing import Dict, List, Optional
+
+from src.core.bot_storage import AuthorizationCache, BotDatabase
+from src.core.metrics import BROADCAST_MESSAGES_TOTAL
+from src.core.settings import Settings, settings
+from src.core.sqlite import SqliteDatabase
+from src.core.telegram_client import TelegramClient, telegram_client
+
+RUNNING = "running"
+DONE = "done"
+
+# Итог отправки одному получателю
+SENT = "sent"
+BLOCKED = "blocked"
+FAILED = "failed"
+
+
+class BroadcastStore(SqliteDatabase):
+    """Рассылки и их контрольные точки.
+
+    ``cursor`` — наибольший ``user_id``, до которого рассылка дошла без
+    пропусков: после перезапуска она продолжается с него. Рассылку ведёт
+    процесс ``owner``, пока не истекла его аренда ``lease_until``.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS broadcasts (
+            id TEXT PRIMARY KEY,
+            text TEXT NOT NULL,
+            status TEXT NOT NULL,
+            cursor INTEGER NOT NULL DEFAULT 0,
+            total INTEGER NOT NULL,
+            sent INTEGER NOT NULL DEFAULT 0,
+            blocked INTEGER NOT NULL DEFAULT 0,
+            failed INTEGER NOT NULL DEFAULT 0,
+            owner TEXT,
+            lease_until REAL NOT NULL DEFAULT 0,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL,
+            finished_at REAL
+        );
+        CREATE INDEX IF NOT EXISTS broadcasts_status ON broadcasts (status, lease_until);
+    """
+
+    async def create(self, text: str, total: int, owner: str, lease: float) -> str:
+        broadcast_id = uuid.uuid4().hex
+        now = time.time()
+
+        def insert(conn):
+            conn.execute(
+                "INSERT INTO broadcasts (id, text, status, total, owner, lease_until,"
+                " created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (broadcast_id, text, RUNNING, total, owner, now + lease, now, now),
+            )
+
+        await self.run(insert)
+        return broadcast_id
+
+    async def claim_abandoned(self, owner: str, lease: float) -> List[dict]:
+        """Забирает незавершённые рассылки, аренда которых истекла."""
+
+        def claim(conn):
+            now = time.time()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = conn.execute(
+                    "SELECT id, text, cursor FROM broadcasts"
+                    " WHERE status = ? AND lease_until < ?",
+                    (RUNNING, now),
+                ).fetchall()
+                conn.executemany(
+                    "UPDATE broadcasts SET owner = ?, lease_until = ? WHERE id = ?",
+                    [(owner, now + lease, row["id"]) for row in rows],
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            return [dict(row) for row in rows]
+
+        return await self.run(claim)
+
+    async def checkpoint(
+        self, broadcast_id: str, owner: str, cursor: int, counts: Counter, lease: float
+    ) -> bool:
+        """Сохраняет продвижение и продлевает аренду; False, если рассылку забрали."""
+
+        def update(conn):
+            now = time.time()
+            return conn.execute(
+                "UPDATE broadcasts SET cursor = ?, sent = sent + ?, blocked = blocked + ?,"
+                " failed = failed + ?, lease_until = ?, updated_at = ?"
+                " WHERE id = ? AND owner = ? AND status = ?",
+                (
+                    cursor, counts[SENT], counts[BLOCKED], counts[FAILED],
+                    now + lease, now, broadcast_id, owner, RUNNING,
+                ),
+            ).rowcount
+
+        return await self.run(update) == 1
+
+    async def renew(self, broadcast_id: str, owner: str, lease: float) -> bool:
+        """Продлевает аренду без контрольной точки; False, если рассылку забрали."""
+
+        def update(conn):
+            return conn.execute(
+                "UPDATE broadcasts SET lease_until = ? WHERE id = ? AND owner = ? AND status = ?",
+                (time.time() + lease, broadcast_id, owner, RUNNING),
+            ).rowcount
+
+        return await self.run(update) == 1
+
+    async def finish(self, broadcast_id: str, owner: str) -> None:
+        def update(conn):
+            now = time.time()
+            conn.execute(
+                "UPDATE broadcasts SET status = ?, finished_at = ?, updated_at = ?,"
+                " lease_until = 0 WHERE id = ? AND owner = ?",
+                (DONE, now, now, broadcast_id, owner),
+            )
+
+        await self.run(update)
+
+    async def release(self, broadcast_id: str, owner: str) -> None:
+        """Отдаёт рассылку любому процессу, который запустится следующим."""
+
+        def update(conn):
+            conn.execute(
+                "UPDATE broadcasts SET lease_until = 0 WHERE id = ? AND owner = ?",
+                (broadcast_id, owner),
+            )
+
+        await self.run(update)
+
+    async def get(self, broadcast_id: str) -> Optional[dict]:
+        def select(conn):
+            return conn.execute(
+                "SELECT id, status, cursor, total, sent, blocked, failed,"
+                " created_at, updated_at, finished_at FROM broadcasts WHERE id = ?",
+                (broadcast_id,),
+            ).fetchone()
+
+        row = await self.run(select)
+        return dict(row) if row else None
+
+
+class BroadcastEngine:
+    """Рассылка сообщения всем пользователям, авторизованным в боте.
+
+    Получатели читаются страницами по ``BROADCAST_PAGE_SIZE``, страница
+    отправляется параллельно (не больше ``BROADCAST_CONCURRENCY`` запросов)
+    через планировщик с лимитами Telegram. После каждой страницы прогресс
+    сохраняется, поэтому прерванная рассылка продолжается с места остановки;
+    повторно могут уйти только сообщения недописанной страницы. Пока
+    страница отправляется, аренда продлевается каждые
+    ``BROADCAST_LEASE_SECONDS / 3``; потеряв аренду, процесс прекращает
+    отправку.
+    """
+
+    def __init__(
+        self,
+        store: BroadcastStore,
+        recipients: AuthorizationCache,
+        client: TelegramClient = telegram_client,
+        config: Settings = settings,
+    ):
+        self._store = store
+        self._recipients = recipients
+        self._client = client
+        self._config = config
+        self._owner = uuid.uuid4().hex
+        self._tasks: Dict[str, asyncio.Task] = {}
+        # Отправки текущей страницы, ещё не попавшие в контрольную точку
+        self._unsaved: Dict[str, Counter] = {}
+        self._watcher: Optional[asyncio.Task] = None
+
+    async def create(self, text: str) -> str:
+        """Сохраняет рассылку и начинает её в фоне."""
+        total = await self._recipients.count_authorized()
+        broadcast_id = await self._store.create(
+            text, total, self._owner, self._config.BROADCAST_LEASE_SECONDS
+        )
+        self._launch(broadcast_id, text, 0)
+        return broadcast_id
+
+    async def get(self, broadcast_id: str) -> Optional[dict]:
+        """Состояние рассылки с учётом отправок, ещё не сохранённых в базе."""
+        broadcast = await self._store.get(broadcast_id)
+        if broadcast is None:
+            return None
+        for result, count in self._unsaved.get(broadcast_id, {}).items():
+            broadcast[result] += count
+        broadcast["processed"] = broadcast[SENT] + broadcast[BLOCKED] + broadcast[FAILED]
+        return broadcast
+
+    async def start(self) -> None:
+        if self._watcher is None:
+            self._watcher = asyncio.create_task(self._watch())
+
+    async def stop(self) -> None:
+        """Прерывает рассылки; их продолжит следующий запущенный процесс."""
+        tasks = list(self._tasks.values())
+        if self._watcher is not None:
+            tasks.append(self._watcher)
+            self._watcher = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._store.close()
+
+    def _launch(self, broadcast_id: str, text: str, cursor: int) -> None:
+        task = asyncio.create_task(self._run(broadcast_id, text, cursor))
+        self._tasks[broadcast_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(broadcast_id, None))
+
+    async def _watch(self) -> None:
+        # Подхватываем рассылки, брошенные остановленным или упавшим процессом
+        while True:
+            try:
+                for broadcast in await self._store.claim_abandoned(
+                    self._owner, self._config.BROADCAST_LEASE_SECONDS
+                ):
+                    if broadcast["id"] not in self._tasks:
+                        self._launch(broadcast["id"], broadcast["text"], broadcast["cursor"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                pass
+            await asyncio.sleep(self._config.BROADCAST_RESUME_INTERVAL)
+
+    async def _run(self, broadcast_id: str, text: str, cursor: int) -> None:
+        page_size = self._config.BROADCAST_PAGE_SIZE
+        try:
+            while True:
+                user_ids = await self._recipients.authorized_user_ids(cursor, page_size)
+                if user_ids and not await self._send_page(broadcast_id, text, user_ids):
+                    # Аренду перехватил другой процесс
+                    return
+                if len(user_ids) < page_size:
+                    await self._store.finish(broadcast_id, self._owner)
+                    return
+                cursor = user_ids[-1]
+        except asyncio.CancelledError:
+            await self._store.release(broadcast_id, self._owner)
+            raise
+        finally:
+            self._unsaved.pop(broadcast_id, None)
+
+    async def _send_page(self, broadcast_id: str, text: str, user_ids: List[int]) -> bool:
+        semaphore = asyncio.Semaphore(self._config.BROADCAST_CONCURRENCY)
+        results: List[Optional[str]] = [None] * len(user_ids)
+        unsaved = self._unsaved[broadcast_id] = Counter()
+
+        async def send_one(index: int, user_id: int) -> None:
+            async with semaphore:
+                results[index] = await self._send(user_id, text)
+            unsaved[results[index]] += 1
+            BROADCAST_MESSAGES_TOTAL.inc(result=results[index])
+
+        sending = asyncio.gather(*(send_one(i, user_id) for i, user_id in enumerate(user_ids)))
+        # Страница с повторами и 429 может идти дольше аренды: продлеваем её по таймеру
+        keeper = asyncio.create_task(self._keep_lease(broadcast_id, sending))
+        try:
+            await sending
+        except asyncio.CancelledError:
+            if not self._lease_lost(keeper):
+                raise
+        finally:
+            keeper.cancel()
+            await asyncio.gather(keeper, return_exceptions=True)
+            # Сохраняем и начало страницы, отправленное до отмены
+            done = 0
+            while done < len(results) and results[done] is not None:
+                done += 1
+            saved = not self._lease_lost(keeper)
+            if done and saved:
+                saved = await self._store.checkpoint(
+                    broadcast_id, self._owner, user_ids[done - 1], Counter(results[:done]),
+                    self._config.BROADCAST_LEASE_SECONDS,
+                )
+            unsaved.clear()
+        return saved
+
+    async def _keep_lease(self, broadcast_id: str, sending: asyncio.Future) -> bool:
+        """Продлевает аренду, пока идёт страница; потеряв её, останавливает отправку."""
+        lease = self._config.BROADCAST_LEASE_SECONDS
+        while True:
+            await asyncio.sleep(lease / 3)
+            try:
+                renewed = await self._store.renew(broadcast_id, self._owner, lease)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # База занята: продлим на следующем шаге
+                continue
+            if not renewed:
+                sending.cancel()
+                return True
+
+    @staticmethod
+    def _lease_lost(keeper: asyncio.Task) -> bool:
+        return keeper.done() and not keeper.cancelled() and keeper.result() is True
+
+    async def _send(self, chat_id: int, text: str) -> str:
+        try:
+            response = await self._client.send_message(chat_id, text)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            return FAILED
+        if response.status == 200:
+            return SENT
+        if response.status == 403:
+            # Пользователь заблокировал бота или удалил аккаунт
+            return BLOCKED
+        return FAILED
+
+
+broadcast_engine = BroadcastEngine(
+    BroadcastStore.in_data_dir("broadcasts.sqlite3"),
+    # Получатели — пользователи, которых авторизовал бот (DATA_DIR/bot.sqlite3)
+    AuthorizationCache(settings, BotDatabase.in_data_dir("bot.sqlite3")),
+)
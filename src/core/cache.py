@@ -0,0 +1,79 @@
+import marshal
+import pickle
+from collections import OrderedDict
+from hashlib import blake2b
+from typing import Any, Callable, Hashable
+
+
+def content_key(value: Any) -> bytes:
+    """Хеш содержимого распарсенного JSON для ключа кеша.
+
+    marshal сериализует dict/list/str/числа в несколько раз быстрее
+    json.dumps; разные данные всегда дают разные байты, поэтому ложных
+    попаданий нет.
+    """
+    try:
+        dump = marshal.dumps(value)
+    except ValueError:
+        dump = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    return blake2b(dump, digest_size=16).digest()
+
+
+class LRUCache:
+    """Ограниченный по размеру LRU-кеш со счётчиками попаданий и промахов."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+
+    def get_or_set(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """Возвращает значение по ключу, вычисляя и сохраняя его при промахе."""
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            value = factory()
+            if self.maxsize > 0:
+                self._data[key] = value
+                if len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+            return value
+        self.hits += 1
+        self._data.move_to_end(key)
+        return value
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        return self._data.pop(key, default)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
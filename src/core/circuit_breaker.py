@@ -0,0 +1,154 @@
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+from src.core.metrics import REGISTRY
+from src.core.settings import Settings, settings
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Числовое значение состояния для метрики
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """Вызов отклонён без обращения к сервису: предохранитель разомкнут."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Circuit {name} is open, retry in {retry_after:.0f} s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Предохранитель для вызовов внешнего сервиса.
+
+    После ``failure_threshold`` ошибок подряд размыкается на
+    ``recovery_timeout`` секунд: вызовы сразу получают ``CircuitOpenError``.
+    Затем пропускает до ``half_open_max_calls`` пробных вызовов; успех
+    замыкает цепь, ошибка снова размыкает.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int,
+        recovery_timeout: float,
+        half_open_max_calls: int = 1,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.failures = 0
+        self.trips = 0
+        self.rejected = 0
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and self.retry_after <= 0:
+            self._state = HALF_OPEN
+            self._half_open_calls = 0
+        return self._state
+
+    @property
+    def retry_after(self) -> float:
+        """Через сколько секунд разомкнутый предохранитель пропустит пробный вызов."""
+        return self._opened_at + self.recovery_timeout - time.monotonic()
+
+    def _open(self) -> None:
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self.trips += 1
+
+    def _before_call(self) -> None:
+        state = self.state
+        if state == OPEN:
+            self.rejected += 1
+            raise CircuitOpenError(self.name, self.retry_after)
+        if state == HALF_OPEN:
+            if self._half_open_calls >= self.half_open_max_calls:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, 0.0)
+            self._half_open_calls += 1
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._state = CLOSED
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._state == OPEN:
+            # Ошибки вызовов, начатых до размыкания, не продлевают его
+            return
+        if self._state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self._open()
+
+    @contextmanager
+    def guard(self):
+        """Оборачивает вызов сервиса.
+
+        Исключение внутри блока считается ошибкой; ответ, который тоже нужно
+        считать ошибкой (например, 5xx), отмечается ``outcome["failed"] = True``.
+        """
+        self._before_call()
+        half_open = self._state == HALF_OPEN
+        outcome = {"failed": False}
+        try:
+            yield outcome
+        except Exception:
+            self.record_failure()
+            raise
+        except BaseException:
+            # Отмена — не ошибка сервиса, просто освобождаем пробный вызов
+            if half_open:
+                self._half_open_calls -= 1
+            raise
+        if outcome["failed"]:
+            self.record_failure()
+        else:
+            self.record_success()
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def circuit_breaker(name: str, config: Settings = settings) -> CircuitBreaker:
+    """Предохранитель внешнего API для эндпоинта ``name`` с порогами из настроек."""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        breaker = _breakers[name] = CircuitBreaker(
+            name,
+            config.EXTERNAL_API_BREAKER_FAILURES,
+            config.EXTERNAL_API_BREAKER_RECOVERY,
+            config.EXTERNAL_API_BREAKER_HALF_OPEN_CALLS,
+        )
+    return breaker
+
+
+def _collector(metric: str, value):
+    return lambda: [
+        (metric, {"endpoint": name}, value(breaker)) for name, breaker in _breakers.items()
+    ]
+
+
+REGISTRY.register_collector(
+    "external_api_circuit_state", "gauge",
+    "Состояние предохранителя внешнего API: 0 замкнут, 1 пробный, 2 разомкнут",
+    _collector("external_api_circuit_state", lambda breaker: STATE_VALUES[breaker.state]),
+)
+REGISTRY.register_collector(
+    "external_api_circuit_trips_total", "counter",
+    "Сколько раз предохранитель внешнего API размыкался",
+    _collector("external_api_circuit_trips_total", lambda breaker: breaker.trips),
+)
+REGISTRY.register_collector(
+    "external_api_circuit_rejected_total", "counter",
+    "Вызовы внешнего API, отклонённые разомкнутым предохранителем",
+    _collector("external_api_circuit_rejected_total", lambda breaker: breaker.rejected),
+)
@@ -0,0 +1,177 @@
+import asyncio
+import json
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from src.core.sqlite import SqliteDatabase
+
+# Статусы попытки занять ключ в общей базе
+CLAIMED = "claimed"
+BUSY = "busy"
+DONE = "done"
+
+
+class DedupDatabase(SqliteDatabase):
+    """Действия в работе и недавние результаты, общие для нескольких процессов."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS actions (
+            key TEXT PRIMARY KEY,
+            result TEXT,
+            expires_at REAL NOT NULL
+        );
+    """
+
+    # Сколько секунд ключ считается занятым, если процесс-владелец упал
+    INFLIGHT_TIMEOUT = 60.0
+
+    async def claim(self, key: str) -> Tuple[str, Any]:
+        """Занимает ключ или возвращает, что он занят либо уже выполнен."""
+
+        def claim(conn):
+            now = time.time()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT result, expires_at FROM actions WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and row["expires_at"] > now:
+                    if row["result"] is None:
+                        outcome = (BUSY, None)
+                    else:
+                        outcome = (DONE, json.loads(row["result"]))
+                else:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO actions (key, result, expires_at)"
+                        " VALUES (?, NULL, ?)",
+                        (key, now + self.INFLIGHT_TIMEOUT),
+                    )
+                    conn.execute("DELETE FROM actions WHERE expires_at < ?", (now,))
+                    outcome = (CLAIMED, None)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            return outcome
+
+        return await self.run(claim)
+
+    async def store(self, key: str, result: Any, ttl: float) -> None:
+        def update(conn):
+            conn.execute(
+                "UPDATE actions SET result = ?, expires_at = ? WHERE key = ?",
+                (json.dumps(result, default=str), time.time() + ttl, key),
+            )
+
+        await self.run(update)
+
+    async def release(self, key: str) -> None:
+        def delete(conn):
+            conn.execute("DELETE FROM actions WHERE key = ? AND result IS NULL", (key,))
+
+        await self.run(delete)
+
+
+class ActionDeduplicator:
+    """Склеивает одинаковые действия, пришедшие одновременно или подряд.
+
+    Пока действие с ключом выполняется, повторные вызовы ждут тот же
+    результат; после завершения успешный результат ещё ``ttl`` секунд
+    отдаётся повторным вызовам без выполнения действия. С ``database``
+    то же соблюдается между процессами; результат должен сериализоваться
+    в JSON.
+    """
+
+    # Как часто проверять ключ, занятый другим процессом
+    SHARED_POLL_INTERVAL = 0.05
+
+    def __init__(self, ttl: float, database: Optional[DedupDatabase] = None):
+        self.ttl = ttl
+        self.executed = 0
+        self.collapsed_inflight = 0
+        self.collapsed_recent = 0
+        self._database = database
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._recent: Dict[Hashable, Tuple[float, Any]] = {}
+
+    def _purge(self, now: float) -> None:
+        expired = [key for key, (expires, _) in self._recent.items() if expires <= now]
+        for key in expired:
+            del self._recent[key]
+
+    async def _claim_shared(self, key: str) -> Tuple[str, Any]:
+        """Ждёт, пока ключ освободится в общей базе или появится результат."""
+        waited = False
+        while True:
+            outcome, result = await self._database.claim(key)
+            if outcome == CLAIMED:
+                return outcome, result
+            if outcome == DONE:
+                # Результат, которого дождались, считаем склейкой одновременных вызовов
+                return (BUSY if waited else DONE), result
+            waited = True
+            await asyncio.sleep(self.SHARED_POLL_INTERVAL)
+
+    async def run(
+        self,
+        key: Hashable,
+        action: Callable[[], Awaitable[Any]],
+        remember: Optional[Callable[[Any], bool]] = None,
+    ) -> Tuple[Any, bool]:
+        """Выполняет действие один раз на ключ.
+
+        Returns:
+            Пару (результат, был ли вызов повтором).
+        """
+        now = time.monotonic()
+        self._purge(now)
+        if key in self._recent:
+            self.collapsed_recent += 1
+            return self._recent[key][1], True
+        if key in self._inflight:
+            self.collapsed_inflight += 1
+            return await asyncio.shield(self._inflight[key]), True
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        shared_key = json.dumps(key, default=str) if self._database is not None else None
+        claimed = False
+        try:
+            if shared_key is not None:
+                outcome, shared_result = await self._claim_shared(shared_key)
+                if outcome != CLAIMED:
+                    # Действие выполнил другой процесс
+                    if outcome == BUSY:
+                        self.collapsed_inflight += 1
+                    else:
+                        self.collapsed_recent += 1
+                    future.set_result(shared_result)
+                    return shared_result, True
+                claimed = True
+            self.executed += 1
+            result = await action()
+        except BaseException as e:
+            if claimed:
+                await self._database.release(shared_key)
+            future.set_exception(e)
+            # Исключение уже проброшено вызывающему, ожидающим оно не нужно
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            if remember is None or remember(result):
+                self._recent[key] = (time.monotonic() + self.ttl, result)
+                if claimed:
+                    await self._database.store(shared_key, result, self.ttl)
+            elif claimed:
+                await self._database.release(shared_key)
+            return result, False
+        finally:
+            del self._inflight[key]
+
+    def stats(self) -> dict:
+        return {
+            "executed": self.executed,
+            "collapsed_inflight": self.collapsed_inflight,
+            "collapsed_recent": self.collapsed_recent,
+        }
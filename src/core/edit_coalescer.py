@@ -0,0 +1,120 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+
+from src.core.metrics import ORDER_CARD_EDITS_TOTAL
+from src.core.settings import Settings, settings
+
+EditAction = Callable[[], Awaitable[Any]]
+
+
+class _PendingEdit:
+    __slots__ = ("action", "waiters", "first_at", "timer")
+
+    def __init__(self, action: EditAction, first_at: float):
+        self.action = action
+        self.waiters: List[asyncio.Future] = []
+        self.first_at = first_at
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class EditCoalescer:
+    """Склеивает частые правки одного сообщения в одну.
+
+    Правка ждёт ``window`` секунд; если за это время пришла новая правка того
+    же сообщения, выполняется только последняя, а ожидание начинается заново,
+    но не дольше ``max_delay`` секунд от первой правки. Все склеенные вызовы
+    получают результат выполненной правки. Правки одного сообщения
+    выполняются по очереди. С ``window=0`` правки выполняются сразу.
+    """
+
+    def __init__(self, window: float, max_delay: float):
+        self.window = window
+        self.max_delay = max_delay
+        self.submitted = 0
+        self.executed = 0
+        self.absorbed = 0
+        self._pending: Dict[Hashable, _PendingEdit] = {}
+        self._running: Dict[Hashable, asyncio.Task] = {}
+
+    @classmethod
+    def from_settings(cls, config: Settings = settings) -> "EditCoalescer":
+        return cls(config.EDIT_COALESCE_WINDOW, config.EDIT_COALESCE_MAX_DELAY)
+
+    async def submit(self, key: Hashable, action: EditAction) -> Any:
+        """Ставит правку сообщения ``key`` и возвращает результат той, что ушла."""
+        self.submitted += 1
+        if self.window <= 0:
+            self.executed += 1
+            ORDER_CARD_EDITS_TOTAL.inc(result="sent")
+            return await action()
+
+        loop = asyncio.get_running_loop()
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = self._pending[key] = _PendingEdit(action, loop.time())
+        else:
+            # Предыдущая правка устарела, не успев уйти
+            pending.action = action
+            pending.timer.cancel()
+            self.absorbed += 1
+            ORDER_CARD_EDITS_TOTAL.inc(result="absorbed")
+        delay = min(self.window, pending.first_at + self.max_delay - loop.time())
+        pending.timer = loop.call_later(max(0.0, delay), self._flush, key)
+        waiter = loop.create_future()
+        pending.waiters.append(waiter)
+        return await asyncio.shield(waiter)
+
+    def _flush(self, key: Hashable) -> None:
+        pending = self._pending.pop(key, None)
+        if pending is None:
+            return
+        previous = self._running.get(key)
+        task = asyncio.ensure_future(self._execute(pending, previous))
+        self._running[key] = task
+        task.add_done_callback(lambda done: self._forget(key, done))
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._running.get(key) is task:
+            del self._running[key]
+
+    async def _execute(self, pending: _PendingEdit, previous: Optional[asyncio.Task]) -> None:
+        if previous is not None:
+            # Не обгоняем правку этого сообщения, которая ещё выполняется
+            await asyncio.wait([previous])
+        self.executed += 1
+        ORDER_CARD_EDITS_TOTAL.inc(result="sent")
+        try:
+            result = await pending.action()
+        except BaseException as e:
+            for waiter in pending.waiters:
+                if not waiter.done():
+                    waiter.set_exception(e)
+                    # Исключение достаётся вызывающим, ожидающим оно не нужно
+                    waiter.exception()
+            if not isinstance(e, Exception):
+                raise
+            return
+        for waiter in pending.waiters:
+            if not waiter.done():
+                waiter.set_result(result)
+
+    async def flush(self) -> None:
+        """Отправляет все отложенные правки сразу и дожидается их (при остановке)."""
+        for key, pending in list(self._pending.items()):
+            pending.timer.cancel()
+            self._flush(key)
+        if self._running:
+            await asyncio.gather(*self._running.values(), return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "window": self.window,
+            "max_delay": self.max_delay,
+            "submitted": self.submitted,
+            "executed": self.executed,
+            "absorbed": self.absorbed,
+            "pending": len(self._pending),
+        }
+
+
+edit_coalescer = EditCoalescer.from_settings()
@@ -0,0 +1,89 @@
+import asyncio
+import logging
+from typing import Iterable, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from src.core.settings import Settings, settings
+
+logger = logging.getLogger(__name__)
+
+
+def origins(*urls: str) -> list:
+    """Адреса хостов из ``urls`` без пути, токенов и повторов."""
+    result = []
+    for url in urls:
+        parts = urlsplit(url)
+        if parts.scheme and parts.netloc:
+            origin = f"{parts.scheme}://{parts.netloc}/"
+            if origin not in result:
+                result.append(origin)
+    return result
+
+
+class HttpClient:
+    """Общий пул HTTP-соединений для всех исходящих запросов.
+
+    Сессия создаётся один раз при старте приложения (lifespan FastAPI или
+    ``main()`` бота) и переиспользуется всеми обработчиками, поэтому
+    DNS-резолв, TCP- и TLS-рукопожатие выполняются не на каждый заказ.
+    """
+
+    def __init__(self, config: Settings = settings):
+        self._config = config
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _build_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=self._config.HTTP_POOL_LIMIT,
+            limit_per_host=self._config.HTTP_POOL_LIMIT_PER_HOST,
+            keepalive_timeout=self._config.HTTP_KEEPALIVE_TIMEOUT,
+            ttl_dns_cache=self._config.HTTP_DNS_CACHE_TTL,
+            use_dns_cache=True,
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=self._config.HTTP_TIMEOUT_TOTAL,
+            connect=self._config.HTTP_TIMEOUT_CONNECT,
+        )
+        return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+    async def start(self) -> None:
+        """Открывает сессию, если она ещё не создана."""
+        if self._session is None or self._session.closed:
+            self._session = self._build_session()
+
+    async def warmup(self, urls: Iterable[str]) -> dict:
+        """Резолвит DNS и открывает соединения с хостами до первого заказа.
+
+        Ответ хоста не важен: соединение остаётся в пуле keep-alive, адрес —
+        в DNS-кеше коннектора. Ошибки только пишутся в лог.
+        """
+        session = self.session
+        timeout = aiohttp.ClientTimeout(total=self._config.HTTP_WARMUP_TIMEOUT)
+
+        async def touch(url):
+            try:
+                async with session.head(url, allow_redirects=False, timeout=timeout) as response:
+                    return url, response.status
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.warning("Warmup of %s failed: %r", url, e)
+                return url, None
+
+        return dict(await asyncio.gather(*(touch(url) for url in urls)))
+
+    async def close(self) -> None:
+        """Закрывает сессию и все соединения пула."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """Возвращает активную сессию, создавая её лениво при необходимости."""
+        if self._session is None or self._session.closed:
+            self._session = self._build_session()
+        return self._session
+
+
+http_client = HttpClient()
@@ -0,0 +1,291 @@
+import asyncio
+import json
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from src.core.settings import Settings, settings
+from src.core.sqlite import SqliteDatabase
+from src.core.tracing import tracer
+
+JobHandler = Callable[[dict], Awaitable[dict]]
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class JobStore(SqliteDatabase):
+    """Хранилище заданий фоновой отправки в SQLite."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            status TEXT NOT NULL,
+            result TEXT,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS jobs_status_created
+            ON jobs (status, created_at);
+    """
+
+    async def add(self, kind: str, payload: dict) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+
+        def insert(conn):
+            conn.execute(
+                "INSERT INTO jobs (id, kind, payload, status, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload), QUEUED, now, now),
+            )
+
+        await self.run(insert)
+        return job_id
+
+    async def claim(self) -> Optional[dict]:
+        """Атомарно забирает самое старое задание из очереди."""
+
+        def claim(conn):
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT id, kind, payload FROM jobs WHERE status = ?"
+                    " ORDER BY created_at LIMIT 1",
+                    (QUEUED,),
+                ).fetchone()
+                if row is not None:
+                    conn.execute(
+                        "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ?",
+                        (RUNNING, time.time(), row["id"]),
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            if row is None:
+                return None
+            return {
+                "id": row["id"],
+                "kind": row["kind"],
+                "payload": json.loads(row["payload"]),
+            }
+
+        return await self.run(claim)
+
+    async def finish(self, job_id: str, status: str, result: dict) -> None:
+        def update(conn):
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, updated_at = ? WHERE id = ?",
+                (status, json.dumps(result, default=str), time.time(), job_id),
+            )
+
+        await self.run(update)
+
+    async def touch(self, job_id: str) -> bool:
+        """Продлевает задание в работе; False, если его уже вернули в очередь."""
+
+        def update(conn):
+            return conn.execute(
+                "UPDATE jobs SET updated_at = ? WHERE id = ? AND status = ?",
+                (time.time(), job_id, RUNNING),
+            ).rowcount
+
+        return bool(await self.run(update))
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        def select(conn):
+            return conn.execute(
+                "SELECT id, kind, status, result, created_at, updated_at"
+                " FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+
+        row = await self.run(select)
+        if row is None:
+            return None
+        return {
+            "id": row["id"],
+            "kind": row["kind"],
+            "status": row["status"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+        }
+
+    async def requeue_running(self, started_before: Optional[float] = None) -> int:
+        """Возвращает в очередь задания, прерванные остановкой процесса.
+
+        ``started_before`` ограничивает заданиями, взятыми в работу раньше
+        этого времени: задания живых соседних процессов не трогаются.
+        """
+
+        def update(conn):
+            if started_before is None:
+                return conn.execute(
+                    "UPDATE jobs SET status = ? WHERE status = ?", (QUEUED, RUNNING)
+                ).rowcount
+            return conn.execute(
+                "UPDATE jobs SET status = ? WHERE status = ? AND updated_at < ?",
+                (QUEUED, RUNNING, started_before),
+            ).rowcount
+
+        return await self.run(update)
+
+    async def purge(self, older_than: float) -> int:
+        def delete(conn):
+            return conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (DONE, FAILED, older_than),
+            ).rowcount
+
+        return await self.run(delete)
+
+
+class JobQueue:
+    """Долговечная очередь фоновой отправки с пулом воркеров.
+
+    Эндпоинты кладут задание в SQLite и сразу отвечают 202 с идентификатором;
+    воркеры, запущенные в lifespan приложения, выполняют зарегистрированный
+    обработчик и сохраняют его результат для ``GET /jobs/{id}``.
+
+    При ``SHARED_STATE`` воркер продлевает задание, пока оно выполняется,
+    поэтому соседний процесс вернёт в очередь только задание процесса,
+    который не подавал признаков жизни дольше ``JOB_STALE_SECONDS``.
+    """
+
+    def __init__(self, store: JobStore, config: Settings = settings):
+        self._store = store
+        self._config = config
+        self._handlers: Dict[str, JobHandler] = {}
+        self._non_idempotent: Set[str] = set()
+        self._workers: List[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+
+    def register(self, kind: str, handler: JobHandler, idempotent: bool = True) -> None:
+        """Регистрирует обработчик заданий ``kind``.
+
+        Неидемпотентное задание (отправка сообщения), прерванное остановкой,
+        завершается с ошибкой, а не возвращается в очередь: сообщение могло
+        уже уйти, и повтор продублировал бы его.
+        """
+        self._handlers[kind] = handler
+        if idempotent:
+            self._non_idempotent.discard(kind)
+        else:
+            self._non_idempotent.add(kind)
+
+    async def enqueue(self, kind: str, payload: dict) -> str:
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job_id = await self._store.add(kind, payload)
+        self._wakeup.set()
+        return job_id
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        return await self._store.get(job_id)
+
+    async def _requeue_abandoned(self) -> None:
+        if self._config.SHARED_STATE:
+            # Очередь общая с другими процессами: забираем только брошенные задания
+            await self._store.requeue_running(time.time() - self._config.JOB_STALE_SECONDS)
+        else:
+            await self._store.requeue_running()
+
+    async def start(self) -> None:
+        await self._requeue_abandoned()
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._workers = [
+            asyncio.create_task(self._worker())
+            for _ in range(self._config.JOB_WORKERS)
+        ]
+        self._wakeup.set()
+
+    async def stop(self, timeout: Optional[float] = 0) -> None:
+        """Останавливает воркеры.
+
+        Новые задания больше не берутся; выполняемые дорабатывают ``timeout``
+        секунд (None — до конца), после чего отменяются. Отменённые
+        идемпотентные задания выполнятся при следующем запуске,
+        неидемпотентные помечаются ``failed``.
+        """
+        self._stopping = True
+        self._wakeup.set()
+        if self._workers and timeout != 0:
+            await asyncio.wait(self._workers, timeout=timeout)
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        # Невзятые и прерванные идемпотентные задания выполнятся при следующем запуске
+        self._store.close()
+
+    async def _worker(self) -> None:
+        while not self._stopping:
+            job = await self._store.claim()
+            if job is None:
+                await self._idle()
+                continue
+            handler = self._handlers.get(job["kind"])
+            try:
+                if handler is None:
+                    raise ValueError(f"Unknown job kind: {job['kind']}")
+                with tracer.span(f"job.{job['kind']}", root=True, job_id=job["id"]):
+                    result = await self._run_alive(job["id"], handler(job["payload"]))
+            except asyncio.CancelledError:
+                if job["kind"] in self._non_idempotent:
+                    await self._store.finish(job["id"], FAILED, {
+                        "status": 500,
+                        "message": "Interrupted by shutdown; the message may have been sent.",
+                    })
+                raise
+            except Exception as e:
+                await self._store.finish(
+                    job["id"], FAILED, {"status": 500, "message": f"An error occurred: {e}"}
+                )
+                continue
+            status = DONE if result.get("status") == 200 else FAILED
+            await self._store.finish(job["id"], status, result)
+
+    async def _run_alive(self, job_id: str, work: Awaitable[dict]) -> dict:
+        """Выполняет задание, продлевая его в базе, пока оно не закончится."""
+        if not self._config.SHARED_STATE:
+            # Брошенные задания возвращаются в очередь только при запуске
+            return await work
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+        try:
+            return await work
+        finally:
+            heartbeat.cancel()
+            await asyncio.gather(heartbeat, return_exceptions=True)
+
+    async def _heartbeat(self, job_id: str) -> None:
+        # Три продления за JOB_STALE_SECONDS: одна задержка записи не делает задание брошенным
+        interval = self._config.JOB_STALE_SECONDS / 3
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self._store.touch(job_id)
+            except Exception:
+                # База занята: продлим на следующем шаге
+                pass
+
+    async def _idle(self) -> None:
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(
+                self._wakeup.wait(), timeout=self._config.JOB_POLL_INTERVAL
+            )
+        except asyncio.TimeoutError:
+            await self._store.purge(time.time() - self._config.JOB_RETENTION_SECONDS)
+            if self._config.SHARED_STATE:
+                await self._requeue_abandoned()
+
+
+job_queue = JobQueue(JobStore.in_data_dir("jobs.sqlite3"))
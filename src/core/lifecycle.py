@@ -0,0 +1,89 @@
+import asyncio
+from contextlib import contextmanager
+from typing import Optional
+
+from aiohttp import web
+
+from src.core.metrics import REGISTRY
+from src.core.settings import settings
+
+STARTING = "starting"
+READY = "ready"
+DRAINING = "draining"
+
+
+class Lifecycle:
+    """Состояние процесса для проверки готовности и корректной остановки.
+
+    Процесс готов принимать работу только между ``mark_ready`` и
+    ``begin_drain``; работа, начатая внутри ``track``, учитывается, чтобы
+    при остановке дождаться её завершения.
+    """
+
+    def __init__(self):
+        self.state = STARTING
+        self.in_flight = 0
+        self._idle: Optional[asyncio.Event] = None
+        self._deadline: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state == READY
+
+    @property
+    def draining(self) -> bool:
+        return self.state == DRAINING
+
+    def mark_ready(self) -> None:
+        self.state = READY
+        self._deadline = None
+
+    def begin_drain(self, timeout: float = settings.SHUTDOWN_TIMEOUT) -> None:
+        """Перестаёт принимать работу; на завершение остаётся ``timeout`` секунд."""
+        self.state = DRAINING
+        self._deadline = asyncio.get_running_loop().time() + timeout
+
+    def remaining(self) -> Optional[float]:
+        """Сколько секунд осталось до конца остановки (None — без ограничения)."""
+        if self._deadline is None:
+            return None
+        return max(0.0, self._deadline - asyncio.get_running_loop().time())
+
+    @contextmanager
+    def track(self):
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            if self.in_flight == 0 and self._idle is not None:
+                self._idle.set()
+
+    async def wait_idle(self) -> bool:
+        """Ждёт завершения учтённой работы; False, если время остановки вышло."""
+        if self.in_flight == 0:
+            return True
+        self._idle = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout=self.remaining())
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self._idle = None
+        return True
+
+
+async def ready_handler(request: web.Request) -> web.Response:
+    """``/ready`` для процесса бота: 200, пока он принимает обновления."""
+    status = 200 if lifecycle.ready else 503
+    return web.json_response({"status": status, "state": lifecycle.state}, status=status)
+
+
+lifecycle = Lifecycle()
+
+
+REGISTRY.register_collector(
+    "process_ready", "gauge",
+    "1, если процесс готов принимать работу",
+    lambda: [("process_ready", {}, int(lifecycle.ready))],
+)
@@ -0,0 +1,163 @@
+import time
+from hashlib import blake2b
+from typing import NamedTuple, Optional
+
+from src.core.cache import LRUCache
+from src.core.metrics import REGISTRY
+from src.core.settings import Settings, settings
+from src.core.sqlite import SqliteDatabase
+from src.core.telegram_scheduler import chat_key
+
+
+class MessageState(NamedTuple):
+    """Дайджесты последнего отправленного текста и клавиатуры сообщения."""
+
+    text_digest: str
+    markup_digest: str
+
+
+def digest(value: Optional[str]) -> str:
+    return blake2b((value or "").encode(), digest_size=16).hexdigest()
+
+
+class MessageStateDatabase(SqliteDatabase):
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS message_state (
+            chat_id INTEGER NOT NULL,
+            message_id INTEGER NOT NULL,
+            text_digest TEXT NOT NULL,
+            markup_digest TEXT NOT NULL,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (chat_id, message_id)
+        );
+    """
+
+    async def load(self, chat_id: int, message_id: int) -> Optional[MessageState]:
+        def select(conn):
+            return conn.execute(
+                "SELECT text_digest, markup_digest FROM message_state"
+                " WHERE chat_id = ? AND message_id = ?",
+                (chat_id, message_id),
+            ).fetchone()
+
+        row = await self.run(select)
+        return MessageState(*row) if row else None
+
+    async def save(self, chat_id: int, message_id: int, state: MessageState) -> None:
+        def upsert(conn):
+            conn.execute(
+                "INSERT OR REPLACE INTO message_state"
+                " (chat_id, message_id, text_digest, markup_digest, updated_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (chat_id, message_id, *state, time.time()),
+            )
+
+        await self.run(upsert)
+
+    async def remove(self, chat_id: int, message_id: int) -> None:
+        def delete(conn):
+            conn.execute(
+                "DELETE FROM message_state WHERE chat_id = ? AND message_id = ?",
+                (chat_id, message_id),
+            )
+
+        await self.run(delete)
+
+
+def shared_message_state(config: Settings = settings) -> bool:
+    """Правят ли карточки заказов несколько процессов.
+
+    Задаётся явно: ``MESSAGE_STATE_SHARED`` (бот работает отдельно от API)
+    или ``SHARED_STATE`` (несколько процессов API).
+    """
+    return config.MESSAGE_STATE_SHARED or config.SHARED_STATE
+
+
+class MessageStateStore:
+    """Что сейчас показано в каждом сообщении с заказом.
+
+    Позволяет не отправлять в Telegram редактирование, которое ничего не
+    меняет, и менять только клавиатуру, если текст остался прежним.
+    Состояние держится в LRU-кеше процесса и, по желанию, в SQLite, чтобы
+    переживать перезапуски. При ``shared`` сообщение могут править другие
+    процессы: кешу процесса верим, только если он говорит, что текст
+    изменился (правка всё равно уйдёт), а совпадение проверяется по базе.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        database: Optional[MessageStateDatabase] = None,
+        shared: bool = False,
+    ):
+        self._cache = LRUCache(maxsize)
+        self._database = database
+        self._shared = shared and database is not None
+        self.skipped_edits = 0
+        self.markup_only_edits = 0
+
+    async def get(
+        self, chat_id, message_id, text_digest: Optional[str] = None
+    ) -> Optional[MessageState]:
+        """Что показано в сообщении, если правку с ``text_digest`` можно сократить.
+
+        Пропуск правки и правка одной клавиатуры решаются по совпадению
+        текста, поэтому при ``shared`` такое совпадение в кеше перепроверяется
+        по базе: другой процесс мог сменить текст после нас.
+        """
+        key = (chat_key(chat_id), int(message_id))
+        state = self._cache.get(key)
+        if self._database is None:
+            return state
+        if state is None or (self._shared and state.text_digest == text_digest):
+            state = await self._database.load(*key)
+            if state is None:
+                self._cache.pop(key)
+            else:
+                self._cache.set(key, state)
+        return state
+
+    async def remember(self, chat_id, message_id, text: str, reply_markup: Optional[str]) -> None:
+        key = (chat_key(chat_id), int(message_id))
+        state = MessageState(digest(text), digest(reply_markup))
+        self._cache.set(key, state)
+        if self._database is not None:
+            await self._database.save(*key, state)
+
+    async def forget(self, chat_id, message_id) -> None:
+        key = (chat_key(chat_id), int(message_id))
+        self._cache.pop(key)
+        if self._database is not None:
+            await self._database.remove(*key)
+
+    def close(self) -> None:
+        if self._database is not None:
+            self._database.close()
+
+    def stats(self) -> dict:
+        return {
+            **self._cache.stats(),
+            "skipped_edits": self.skipped_edits,
+            "markup_only_edits": self.markup_only_edits,
+        }
+
+
+message_state_store = MessageStateStore(
+    settings.MESSAGE_STATE_CACHE_SIZE,
+    MessageStateDatabase.in_data_dir("message_state.sqlite3")
+    if settings.MESSAGE_STATE_PERSIST or shared_message_state()
+    else None,
+    shared=shared_message_state(),
+)
+
+
+REGISTRY.register_collector(
+    "telegram_edits_avoided_total", "counter",
+    "Правки сообщений, не отправленные в Telegram или сокращённые до клавиатуры",
+    lambda: [
+        ("telegram_edits_avoided_total", {"reason": "not_modified"},
+         message_state_store.skipped_edits),
+        ("telegram_edits_avoided_total", {"reason": "markup_only"},
+         message_state_store.markup_only_edits),
+    ],
+)
@@ -0,0 +1,267 @@
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from aiohttp import web
+
+# Границы корзин гистограмм по умолчанию, секунды
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        '{}="{}"'.format(
+            key, str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        )
+        for key, value in labels.items()
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Registry:
+    """Набор метрик процесса, отдаваемых в текстовом формате Prometheus."""
+
+    def __init__(self):
+        self._metrics: List["Metric"] = []
+        self._collectors: List[Tuple[str, str, str, Callable[[], Iterable[Sample]]]] = []
+
+    def register(self, metric: "Metric") -> None:
+        self._metrics.append(metric)
+
+    def register_collector(
+        self, name: str, kind: str, documentation: str,
+        collect: Callable[[], Iterable[Sample]],
+    ) -> None:
+        """Добавляет метрику, значения которой вычисляются в момент выгрузки."""
+        self._collectors.append((name, kind, documentation, collect))
+
+    def expose(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for name, kind, documentation, collect in self._collectors:
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            for sample_name, labels, value in collect():
+                lines.append(
+                    f"{sample_name}{_format_labels(labels)} {_format_value(value)}"
+                )
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        registry: Optional[Registry] = REGISTRY,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        if registry is not None:
+            registry.register(self)
+
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels_dict(self, key: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    def samples(self) -> Iterable[Sample]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> Iterable[Sample]:
+        for key, value in self._values.items():
+            yield self.name, self._labels_dict(key), value
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track_inprogress(self, **labels):
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def samples(self) -> Iterable[Sample]:
+        for key, value in self._values.items():
+            yield self.name, self._labels_dict(key), value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        state = self._values.get(key)
+        if state is None:
+            # Счётчики по корзинам, сумма и количество наблюдений
+            state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+        counts = state[0]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[index] += 1
+                break
+        state[1] += value
+        state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Замеряет длительность блока; метки можно дополнить внутри блока."""
+        labels = dict(labels)
+        started = time.perf_counter()
+        try:
+            yield labels
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> Iterable[Sample]:
+        for key, (counts, total, count) in self._values.items():
+            labels = self._labels_dict(key)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield (
+                    f"{self.name}_bucket",
+                    {**labels, "le": _format_value(bound)},
+                    cumulative,
+                )
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, count
+
+
+async def metrics_handler(request: web.Request) -> web.Response:
+    return web.Response(
+        body=REGISTRY.expose().encode(),
+        headers={"Content-Type": CONTENT_TYPE},
+    )
+
+
+async def start_metrics_server(host: str, port: int, routes: dict = None) -> web.AppRunner:
+    """Поднимает отдельный HTTP-сервер с ``/metrics`` (для процесса бота).
+
+    ``routes`` — дополнительные GET-обработчики, например ``/ready``.
+    """
+    app = web.Application()
+    app.router.add_get("/metrics", metrics_handler)
+    for path, handler in (routes or {}).items():
+        app.router.add_get(path, handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+# Общие метрики API и бота
+ORDER_RENDER_SECONDS = Histogram(
+    "order_render_seconds", "Время формирования текста заказа parse_order_message"
+)
+TELEGRAM_REQUEST_SECONDS = Histogram(
+    "telegram_request_seconds",
+    "Длительность запросов к Telegram Bot API по методу и HTTP-статусу",
+    ("method", "status"),
+)
+EXTERNAL_API_SECONDS = Histogram(
+    "external_api_request_seconds",
+    "Длительность запросов к внешнему API заказов",
+    ("endpoint", "outcome"),
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "Запросы к API, обрабатываемые в данный момент"
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_seconds",
+    "Длительность обработки запросов к API",
+    ("method", "path", "status"),
+)
+BOT_CALLBACKS_TOTAL = Counter(
+    "bot_order_callbacks_total",
+    "Нажатия кнопок заказа по действию и результату",
+    ("action", "outcome"),
+)
+BOT_UPDATES_IN_FLIGHT = Gauge(
+    "bot_updates_in_flight", "Обновления Telegram, обрабатываемые ботом"
+)
+ORDER_STATUS_OUTBOX_TOTAL = Counter(
+    "order_status_outbox_total",
+    "Смены статуса в очереди повторов: поставлены, доставлены, брошены",
+    ("event",),
+)
+ORDER_STATUS_OUTBOX_PENDING = Gauge(
+    "order_status_outbox_pending", "Смены статуса, ожидающие повторной отправки"
+)
+ORDER_CARD_EDITS_TOTAL = Counter(
+    "order_card_edits_total",
+    "Правки карточек заказа: отправлены или поглощены более поздней правкой",
+    ("result",),
+)
+INGEST_EVENTS_TOTAL = Counter(
+    "ingest_events_total",
+    "События заказов, принятые потоком /ingest, по итоговому статусу",
+    ("transport", "status"),
+)
+BROADCAST_MESSAGES_TOTAL = Counter(
+    "broadcast_messages_total",
+    "Сообщения рассылок: отправлены, бот заблокирован, ошибка",
+    ("result",),
+)
+ORDER_ACK_SECONDS = Histogram(
+    "order_acknowledgement_seconds",
+    "Время от отправки заказа в чат до нажатия кнопки сотрудником, по places.id",
+    ("restaurant", "action"),
+    buckets=(5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600, 7200),
+)
@@ -0,0 +1,250 @@
+import json
+import time
+from typing import List, NamedTuple, Optional, Union
+
+from src.core.settings import settings
+from src.core.sqlite import SqliteDatabase
+from src.core.telegram_scheduler import chat_key
+
+
+class OrderMessageRef(NamedTuple):
+    """Сообщение с карточкой заказа и статус, который в нём показан."""
+
+    chat_id: Union[int, str]
+    message_id: int
+    status: str
+
+
+class OrderTrace(NamedTuple):
+    """Когда и откуда заказ впервые отправлен в чат: для замера реакции сотрудников."""
+
+    restaurant: str
+    sent_at: float
+    trace_id: Optional[str] = None
+    span_id: Optional[str] = None
+
+
+class OrderIndex(SqliteDatabase):
+    """Какие сообщения в Telegram показывают заказ.
+
+    Заполняется при отправке заказа, поэтому изменить или удалить все
+    карточки можно по ``order_id``, не зная ``chat_id`` и ``message_id``.
+    Вместе со ссылками хранится последний JSON заказа: по нему карточку
+    перерисовывают с новым статусом. Если заказ не поместился в одно
+    сообщение, продолжения хранятся как части карточки. Время первой
+    отправки и контекст трассы связывают нажатие кнопки с отправкой заказа.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS orders (
+            order_id TEXT PRIMARY KEY,
+            payload TEXT NOT NULL,
+            updated_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS order_messages (
+            chat_id INTEGER NOT NULL,
+            message_id INTEGER NOT NULL,
+            order_id TEXT NOT NULL,
+            status TEXT NOT NULL,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (chat_id, message_id)
+        );
+        CREATE INDEX IF NOT EXISTS order_messages_order_id
+            ON order_messages (order_id);
+        CREATE TABLE IF NOT EXISTS order_message_parts (
+            chat_id INTEGER NOT NULL,
+            message_id INTEGER NOT NULL,
+            part INTEGER NOT NULL,
+            part_message_id INTEGER NOT NULL,
+            PRIMARY KEY (chat_id, message_id, part)
+        );
+        CREATE TABLE IF NOT EXISTS order_traces (
+            order_id TEXT PRIMARY KEY,
+            restaurant TEXT NOT NULL,
+            sent_at REAL NOT NULL,
+            trace_id TEXT,
+            span_id TEXT
+        );
+    """
+
+    # Раз в сколько записей удалять заказы старше ORDER_INDEX_RETENTION_SECONDS
+    PURGE_EVERY = 1000
+
+    def __init__(self, path: str, retention: float = settings.ORDER_INDEX_RETENTION_SECONDS):
+        super().__init__(path)
+        self.retention = retention
+        self._saves = 0
+
+    async def save_message(
+        self,
+        order_id: str,
+        payload: dict,
+        chat_id: int,
+        message_id: int,
+        status: str,
+        trace: Optional[OrderTrace] = None,
+    ) -> None:
+        """Запоминает сообщение заказа и последний JSON заказа.
+
+        ``trace`` сохраняется только при первой отправке заказа.
+        """
+
+        def upsert(conn):
+            now = time.time()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO orders (order_id, payload, updated_at)"
+                    " VALUES (?, ?, ?)",
+                    (order_id, json.dumps(payload, default=str), now),
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO order_messages"
+                    " (chat_id, message_id, order_id, status, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (chat_key(chat_id), int(message_id), order_id, status, now),
+                )
+                if trace is not None:
+                    conn.execute(
+                        "INSERT OR IGNORE INTO order_traces"
+                        " (order_id, restaurant, sent_at, trace_id, span_id)"
+                        " VALUES (?, ?, ?, ?, ?)",
+                        (order_id, *trace),
+                    )
+                self._saves += 1
+                if self._saves % self.PURGE_EVERY == 0:
+                    self._purge(conn, now - self.retention)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        await self.run(upsert)
+
+    async def get_order(self, order_id: str) -> Optional[dict]:
+        """Последний JSON заказа или None, если заказ не отправлялся."""
+
+        def select(conn):
+            return conn.execute(
+                "SELECT payload FROM orders WHERE order_id = ?", (order_id,)
+            ).fetchone()
+
+        row = await self.run(select)
+        return json.loads(row["payload"]) if row else None
+
+    async def get_trace(self, order_id: str) -> Optional[OrderTrace]:
+        """Первая отправка заказа или None, если заказ не отправлялся."""
+
+        def select(conn):
+            return conn.execute(
+                "SELECT restaurant, sent_at, trace_id, span_id FROM order_traces"
+                " WHERE order_id = ?",
+                (order_id,),
+            ).fetchone()
+
+        row = await self.run(select)
+        return OrderTrace(*row) if row else None
+
+    async def messages(self, order_id: str) -> List[OrderMessageRef]:
+        def select(conn):
+            return conn.execute(
+                "SELECT chat_id, message_id, status FROM order_messages"
+                " WHERE order_id = ? ORDER BY updated_at",
+                (order_id,),
+            ).fetchall()
+
+        return [OrderMessageRef(*row) for row in await self.run(select)]
+
+    async def parts(self, chat_id: int, message_id: int) -> List[int]:
+        """Сообщения с продолжением карточки по порядку."""
+
+        def select(conn):
+            return conn.execute(
+                "SELECT part_message_id FROM order_message_parts"
+                " WHERE chat_id = ? AND message_id = ? ORDER BY part",
+                (chat_key(chat_id), int(message_id)),
+            ).fetchall()
+
+        return [row[0] for row in await self.run(select)]
+
+    async def save_parts(self, chat_id: int, message_id: int, part_ids: List[int]) -> None:
+        """Заменяет список продолжений карточки."""
+
+        def replace(conn):
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "DELETE FROM order_message_parts WHERE chat_id = ? AND message_id = ?",
+                    (chat_key(chat_id), int(message_id)),
+                )
+                conn.executemany(
+                    "INSERT INTO order_message_parts"
+                    " (chat_id, message_id, part, part_message_id) VALUES (?, ?, ?, ?)",
+                    [
+                        (chat_key(chat_id), int(message_id), part, int(part_id))
+                        for part, part_id in enumerate(part_ids, start=1)
+                    ],
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        await self.run(replace)
+
+    async def remove_message(self, chat_id: int, message_id: int) -> None:
+        """Забывает удалённое сообщение; заказ без сообщений удаляется целиком."""
+
+        def delete(conn):
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT order_id FROM order_messages"
+                    " WHERE chat_id = ? AND message_id = ?",
+                    (chat_key(chat_id), int(message_id)),
+                ).fetchone()
+                conn.execute(
+                    "DELETE FROM order_message_parts WHERE chat_id = ? AND message_id = ?",
+                    (chat_key(chat_id), int(message_id)),
+                )
+                if row is not None:
+                    conn.execute(
+                        "DELETE FROM order_messages WHERE chat_id = ? AND message_id = ?",
+                        (chat_key(chat_id), int(message_id)),
+                    )
+                    conn.execute(
+                        "DELETE FROM orders WHERE order_id = ? AND NOT EXISTS"
+                        " (SELECT 1 FROM order_messages WHERE order_id = ?)",
+                        (row["order_id"], row["order_id"]),
+                    )
+                    conn.execute(
+                        "DELETE FROM order_traces WHERE order_id = ? AND NOT EXISTS"
+                        " (SELECT 1 FROM orders WHERE order_id = ?)",
+                        (row["order_id"], row["order_id"]),
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        await self.run(delete)
+
+    @staticmethod
+    def _purge(conn, older_than: float) -> None:
+        conn.execute(
+            "DELETE FROM order_messages WHERE order_id IN"
+            " (SELECT order_id FROM orders WHERE updated_at < ?)",
+            (older_than,),
+        )
+        conn.execute("DELETE FROM orders WHERE updated_at < ?", (older_than,))
+        conn.execute(
+            "DELETE FROM order_traces WHERE order_id NOT IN (SELECT order_id FROM orders)"
+        )
+        conn.execute(
+            "DELETE FROM order_message_parts WHERE NOT EXISTS"
+            " (SELECT 1 FROM order_messages m WHERE m.chat_id = order_message_parts.chat_id"
+            " AND m.message_id = order_message_parts.message_id)"
+        )
+
+
+order_index = OrderIndex.in_data_dir("order_index.sqlite3")
@@ -0,0 +1,259 @@
+import asyncio
+import random
+import time
+import weakref
+from typing import Awaitable, Callable, List, NamedTuple, Optional
+
+from src.core.metrics import ORDER_STATUS_OUTBOX_PENDING, ORDER_STATUS_OUTBOX_TOTAL
+from src.core.settings import Settings, settings
+from src.core.sqlite import SqliteDatabase
+
+
+class OutboxEntry(NamedTuple):
+    id: int
+    order_id: str
+    status: str
+    chat_id: Optional[int]
+    attempts: int
+
+
+# send(order_id, status) -> {"success": bool, "retryable": bool, "message": str}
+StatusSender = Callable[[str, str], Awaitable[dict]]
+# notify(entry, result, delivered) — вызывается после доставки или отказа
+OutboxNotifier = Callable[[OutboxEntry, dict, bool], Awaitable[None]]
+
+
+class OutboxStore(SqliteDatabase):
+    """Смены статуса заказа, которые не удалось отправить во внешний API."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS status_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            order_id TEXT NOT NULL,
+            status TEXT NOT NULL,
+            chat_id INTEGER,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL,
+            dead INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            created_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS status_outbox_order
+            ON status_outbox (dead, order_id, id);
+    """
+
+    async def add(
+        self, order_id: str, status: str, chat_id: Optional[int], next_attempt_at: float,
+        error: str,
+    ) -> None:
+        def insert(conn):
+            conn.execute(
+                "INSERT INTO status_outbox"
+                " (order_id, status, chat_id, attempts, next_attempt_at, last_error, created_at)"
+                " VALUES (?, ?, ?, 1, ?, ?, ?)",
+                (order_id, status, chat_id, next_attempt_at, error, time.time()),
+            )
+
+        await self.run(insert)
+
+    async def has_pending(self, order_id: str) -> bool:
+        def select(conn):
+            return conn.execute(
+                "SELECT 1 FROM status_outbox WHERE dead = 0 AND order_id = ? LIMIT 1",
+                (order_id,),
+            ).fetchone()
+
+        return await self.run(select) is not None
+
+    async def claim_due(self, limit: int, lease: float) -> List[OutboxEntry]:
+        """Забирает первые по порядку смены статуса заказов, которым пора повториться.
+
+        Для каждого заказа берётся только самая старая запись, поэтому
+        «выполнен» не обгонит «взят в работу». Взятые записи откладываются на
+        ``lease`` секунд, чтобы их не повторил соседний процесс.
+        """
+
+        def claim(conn):
+            now = time.time()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = conn.execute(
+                    "SELECT o.id, o.order_id, o.status, o.chat_id, o.attempts"
+                    " FROM status_outbox o JOIN ("
+                    "   SELECT MIN(id) AS head FROM status_outbox"
+                    "   WHERE dead = 0 GROUP BY order_id"
+                    " ) h ON o.id = h.head"
+                    " WHERE o.next_attempt_at <= ?"
+                    " ORDER BY o.next_attempt_at LIMIT ?",
+                    (now, limit),
+                ).fetchall()
+                conn.executemany(
+                    "UPDATE status_outbox SET next_attempt_at = ? WHERE id = ?",
+                    [(now + lease, row["id"]) for row in rows],
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            return [OutboxEntry(*row) for row in rows]
+
+        return await self.run(claim)
+
+    async def delete(self, entry_id: int) -> None:
+        def delete(conn):
+            conn.execute("DELETE FROM status_outbox WHERE id = ?", (entry_id,))
+
+        await self.run(delete)
+
+    async def reschedule(self, entry_id: int, next_attempt_at: float, error: str) -> None:
+        def update(conn):
+            conn.execute(
+                "UPDATE status_outbox SET attempts = attempts + 1,"
+                " next_attempt_at = ?, last_error = ? WHERE id = ?",
+                (next_attempt_at, error, entry_id),
+            )
+
+        await self.run(update)
+
+    async def bury(self, entry_id: int, error: str) -> None:
+        """Оставляет запись для разбора, но больше не повторяет её."""
+
+        def update(conn):
+            conn.execute(
+                "UPDATE status_outbox SET dead = 1, last_error = ? WHERE id = ?",
+                (error, entry_id),
+            )
+
+        await self.run(update)
+
+    async def count_pending(self) -> int:
+        def select(conn):
+            return conn.execute(
+                "SELECT COUNT(*) FROM status_outbox WHERE dead = 0"
+            ).fetchone()[0]
+
+        return await self.run(select)
+
+
+class StatusOutbox:
+    """Долговечная очередь повторов смены статуса заказа.
+
+    Если внешний API не ответил или вернул 5xx, смена статуса сохраняется в
+    SQLite и повторяется фоновой задачей с экспоненциальной задержкой и
+    разбросом, небольшими пачками, чтобы не завалить восстановившийся API.
+    Пока у заказа есть неотправленные смены, новые встают за ними в очередь.
+    """
+
+    def __init__(
+        self,
+        store: OutboxStore,
+        send: StatusSender,
+        notify: Optional[OutboxNotifier] = None,
+        config: Settings = settings,
+    ):
+        self._store = store
+        self._send = send
+        self._notify = notify
+        self._config = config
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._order_locks = weakref.WeakValueDictionary()
+
+    def _order_lock(self, order_id: str) -> asyncio.Lock:
+        lock = self._order_locks.get(order_id)
+        if lock is None:
+            lock = self._order_locks[order_id] = asyncio.Lock()
+        return lock
+
+    def _backoff(self, attempts: int) -> float:
+        delay = self._config.OUTBOX_BACKOFF_BASE * (2 ** (attempts - 1))
+        delay = min(delay, self._config.OUTBOX_BACKOFF_MAX)
+        return delay * random.uniform(0.8, 1.2)
+
+    async def deliver(self, order_id: str, status: str, chat_id: Optional[int] = None) -> dict:
+        """Отправляет смену статуса сейчас или ставит её в очередь повторов.
+
+        Returns:
+            Результат отправки; ``queued`` — смена статуса сохранена и будет
+            отправлена позже.
+        """
+        async with self._order_lock(order_id):
+            if await self._store.has_pending(order_id):
+                result = {"success": False, "message": "Queued behind earlier updates"}
+            else:
+                result = await self._send(order_id, status)
+                if result["success"] or not result.get("retryable"):
+                    return result
+            await self._store.add(
+                order_id, status, chat_id, time.time() + self._backoff(1), result["message"]
+            )
+        ORDER_STATUS_OUTBOX_TOTAL.inc(event="queued")
+        self._wakeup.set()
+        return {**result, "queued": True}
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Останавливает повторы; недоставленное остаётся в базе."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self._store.close()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                replayed = await self.replay_due()
+                ORDER_STATUS_OUTBOX_PENDING.set(await self._store.count_pending())
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                replayed = 0
+            if replayed:
+                continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(), timeout=self._config.OUTBOX_POLL_INTERVAL
+                )
+            except asyncio.TimeoutError:
+                pass
+
+    async def replay_due(self) -> int:
+        """Повторяет одну пачку записей, которым пора; возвращает их число."""
+        entries = await self._store.claim_due(
+            self._config.OUTBOX_BATCH_SIZE, self._config.OUTBOX_LEASE_SECONDS
+        )
+        await asyncio.gather(*(self._replay(entry) for entry in entries))
+        return len(entries)
+
+    async def _replay(self, entry: OutboxEntry) -> None:
+        async with self._order_lock(entry.order_id):
+            try:
+                result = await self._send(entry.order_id, entry.status)
+            except Exception as e:
+                result = {"success": False, "retryable": True, "message": str(e)}
+
+            if result["success"]:
+                await self._store.delete(entry.id)
+                ORDER_STATUS_OUTBOX_TOTAL.inc(event="delivered")
+                delivered = True
+            elif result.get("retryable") and entry.attempts < self._config.OUTBOX_MAX_ATTEMPTS:
+                await self._store.reschedule(
+                    entry.id, time.time() + self._backoff(entry.attempts + 1), result["message"]
+                )
+                return
+            else:
+                await self._store.bury(entry.id, result["message"])
+                ORDER_STATUS_OUTBOX_TOTAL.inc(event="dead")
+                delivered = False
+
+        if self._notify is not None:
+            try:
+                await self._notify(entry, result, delivered)
+            except Exception:
+                pass
@@ -0,0 +1,261 @@
+import asyncio
+import csv
+import io
+import json
+import logging
+import os
+import re
+import time
+from hashlib import blake2b
+from typing import FrozenSet, List, Optional, Tuple
+
+from src.core.settings import Settings, settings
+from src.core.sqlite import SqliteDatabase
+
+logger = logging.getLogger(__name__)
+
+# Разделители, которые люди и Telegram оставляют в номерах
+_SEPARATORS_RE = re.compile(r"[\s\-().]")
+
+# Колонки и ключи, в которых при импорте ищется номер
+PHONE_FIELDS = ("phone", "phone_number", "phoneNumber", "телефон")
+
+
+def normalize_phone(raw, country_code: Optional[str] = None) -> Optional[str]:
+    """Приводит номер к E.164 (``+79991234567``); None, если это не номер.
+
+    Понимает пробелы, дефисы и скобки, международный префикс ``00``,
+    российский ``8`` вместо ``+7`` и десятизначный номер без кода страны
+    (подставляется ``PHONE_DEFAULT_COUNTRY_CODE``).
+    """
+    if raw is None:
+        return None
+    country = country_code or settings.PHONE_DEFAULT_COUNTRY_CODE
+    text = _SEPARATORS_RE.sub("", str(raw).strip())
+    if text.startswith("+"):
+        digits = text[1:]
+    elif text.startswith("00"):
+        digits = text[2:]
+    else:
+        digits = text
+        if country == "7" and len(digits) == 11 and digits.startswith("8"):
+            digits = "7" + digits[1:]
+        elif len(digits) == 10:
+            digits = country + digits
+    if not (digits.isascii() and digits.isdigit()) or digits.startswith("0"):
+        return None
+    if not 8 <= len(digits) <= 15:
+        return None
+    return "+" + digits
+
+
+def parse_phones(content: bytes, fmt: str) -> List[str]:
+    """Достаёт номера из CSV или JSON.
+
+    CSV — номер в колонке ``phone``/``phone_number`` или, без заголовка, в
+    первой колонке. JSON — список строк, список объектов с ``phone`` или
+    объект ``{"phones": [...]}``.
+    """
+    text = content.decode("utf-8-sig")
+    if fmt == "json":
+        data = json.loads(text)
+        if isinstance(data, dict):
+            data = data.get("phones", [])
+        if not isinstance(data, list):
+            raise ValueError("JSON must be a list of phones or {\"phones\": [...]}")
+        phones = []
+        for item in data:
+            if isinstance(item, dict):
+                item = next((item[key] for key in PHONE_FIELDS if key in item), None)
+            if item is not None:
+                phones.append(str(item))
+        return phones
+    if fmt == "csv":
+        rows = list(csv.reader(io.StringIO(text)))
+        if not rows:
+            return []
+        header = [cell.strip() for cell in rows[0]]
+        column = next((header.index(key) for key in PHONE_FIELDS if key in header), None)
+        if column is None:
+            column = 0
+        else:
+            rows = rows[1:]
+        return [row[column] for row in rows if len(row) > column and row[column].strip()]
+    raise ValueError(f"Unknown format: {fmt}")
+
+
+class PhoneRegistry(SqliteDatabase):
+    """Реестр телефонов сотрудников для проверки доступа.
+
+    Номера хранятся в SQLite в виде E.164, а проверка идёт по множеству в
+    памяти процесса за O(1). Каждый импорт увеличивает версию реестра;
+    процессы сверяют её раз в ``PHONE_REGISTRY_RELOAD_INTERVAL`` секунд и
+    перечитывают номера без перезапуска. С ``PHONE_REGISTRY_FILE`` реестр
+    заменяется содержимым файла при каждом его изменении.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS phones (
+            phone TEXT PRIMARY KEY,
+            updated_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS registry_meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, path: str, config: Settings = settings):
+        super().__init__(path)
+        self._config = config
+        self._phones: FrozenSet[str] = frozenset()
+        self.version = -1
+        self.loaded_at: Optional[float] = None
+        self._file_mtime: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._phones)
+
+    def contains(self, raw) -> bool:
+        """Есть ли номер в реестре (в любом написании)."""
+        phone = normalize_phone(raw, self._config.PHONE_DEFAULT_COUNTRY_CODE)
+        return phone is not None and phone in self._phones
+
+    @staticmethod
+    def _version(conn) -> int:
+        row = conn.execute("SELECT value FROM registry_meta WHERE key = 'version'").fetchone()
+        return int(row[0]) if row else 0
+
+    async def load(self) -> None:
+        """Перечитывает номера из базы и подменяет множество целиком."""
+
+        def select(conn):
+            conn.execute("BEGIN")
+            try:
+                version = self._version(conn)
+                phones = frozenset(row[0] for row in conn.execute("SELECT phone FROM phones"))
+            finally:
+                conn.execute("COMMIT")
+            return version, phones
+
+        self.version, self._phones = await self.run(select)
+        self.loaded_at = time.time()
+
+    async def refresh(self) -> bool:
+        """Перечитывает номера, если реестр изменил другой процесс."""
+        version = await self.run(self._version)
+        if version == self.version:
+            return False
+        await self.load()
+        return True
+
+    async def import_phones(
+        self, content: bytes, fmt: str, replace: bool = False, source: Optional[str] = None
+    ) -> dict:
+        """Импортирует номера из CSV или JSON.
+
+        С ``replace`` реестр заменяется целиком, иначе номера добавляются.
+        Разбор, нормализация и запись идут в потоке базы, не блокируя
+        event loop. ``source`` — отпечаток файла: тот же файл повторно не
+        импортируется.
+        """
+        country = self._config.PHONE_DEFAULT_COUNTRY_CODE
+
+        def store(conn) -> Tuple[int, int]:
+            normalized = [normalize_phone(raw, country) for raw in parse_phones(content, fmt)]
+            phones = {phone for phone in normalized if phone is not None}
+            invalid = sum(1 for phone in normalized if phone is None)
+            now = time.time()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if source is not None:
+                    row = conn.execute(
+                        "SELECT value FROM registry_meta WHERE key = 'source'"
+                    ).fetchone()
+                    if row is not None and row[0] == source:
+                        conn.execute("COMMIT")
+                        return 0, invalid
+                if replace:
+                    conn.execute("DELETE FROM phones")
+                conn.executemany(
+                    "INSERT OR REPLACE INTO phones (phone, updated_at) VALUES (?, ?)",
+                    [(phone, now) for phone in phones],
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO registry_meta (key, value) VALUES ('version', ?)",
+                    (str(self._version(conn) + 1),),
+                )
+                if source is not None:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO registry_meta (key, value) VALUES ('source', ?)",
+                        (source,),
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            return len(phones), invalid
+
+        imported, invalid = await self.run(store)
+        await self.load()
+        return {"imported": imported, "invalid": invalid, "total": len(self._phones)}
+
+    async def reload_file(self) -> Optional[dict]:
+        """Импортирует ``PHONE_REGISTRY_FILE``, если файл изменился."""
+        path = self._config.PHONE_REGISTRY_FILE
+        if not path:
+            return None
+        try:
+            mtime = os.stat(path).st_mtime
+        except FileNotFoundError:
+            return None
+        if mtime == self._file_mtime:
+            return None
+        with open(path, "rb") as file:
+            content = file.read()
+        fmt = "json" if path.lower().endswith(".json") else "csv"
+        result = await self.import_phones(
+            content, fmt, replace=True, source=blake2b(content, digest_size=16).hexdigest()
+        )
+        self._file_mtime = mtime
+        logger.info(
+            "Imported %d phones (%d invalid) from file %s",
+            result["imported"], result["invalid"], path,
+        )
+        return result
+
+    async def start(self) -> None:
+        await self.load()
+        await self.reload_file()
+        if not self._phones:
+            logger.warning(
+                "Phone registry is empty: /check_access denies everyone until phones "
+                "are imported via /phones/import or PHONE_REGISTRY_FILE"
+            )
+        if self._task is None:
+            self._task = asyncio.create_task(self._watch())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self.close()
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self._config.PHONE_REGISTRY_RELOAD_INTERVAL)
+            try:
+                await self.reload_file()
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                pass
+
+    def stats(self) -> dict:
+        return {"phones": len(self._phones), "version": self.version, "loaded_at": self.loaded_at}
+
+
+phone_registry = PhoneRegistry.in_data_dir("phones.sqlite3")
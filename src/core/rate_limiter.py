@@ -0,0 +1,120 @@
+import asyncio
+import time
+
+from src.core.sqlite import SqliteDatabase
+
+
+class TokenBucket:
+    """Асинхронный token bucket: ``rate`` токенов в секунду, запас до ``capacity``."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    @property
+    def is_full(self) -> bool:
+        """True, если бакет полностью восстановился и его можно забыть."""
+        self._refill()
+        return self._tokens >= self.capacity
+
+    async def acquire(self) -> None:
+        """Ждёт, пока в бакете появится токен, и забирает его."""
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class RateLimitDatabase(SqliteDatabase):
+    """Состояние бакетов в SQLite, общее для нескольких процессов."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS token_buckets (
+            key TEXT PRIMARY KEY,
+            tokens REAL NOT NULL,
+            updated_at REAL NOT NULL,
+            full_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS token_buckets_full_at ON token_buckets (full_at);
+    """
+
+    # Раз в сколько списаний удалять полностью восстановившиеся бакеты
+    PURGE_EVERY = 1000
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._takes = 0
+
+    async def take(self, key: str, rate: float, capacity: float) -> float:
+        """Списывает токен; возвращает 0 или сколько секунд ждать до токена."""
+
+        def take(conn):
+            now = time.time()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT tokens, updated_at FROM token_buckets WHERE key = ?", (key,)
+                ).fetchone()
+                tokens = capacity
+                if row is not None:
+                    tokens = min(capacity, row["tokens"] + (now - row["updated_at"]) * rate)
+                wait = 0.0
+                if tokens >= 1:
+                    tokens -= 1
+                else:
+                    wait = (1 - tokens) / rate
+                conn.execute(
+                    "INSERT OR REPLACE INTO token_buckets (key, tokens, updated_at, full_at)"
+                    " VALUES (?, ?, ?, ?)",
+                    (key, tokens, now, now + (capacity - tokens) / rate),
+                )
+                self._takes += 1
+                if self._takes % self.PURGE_EVERY == 0:
+                    conn.execute("DELETE FROM token_buckets WHERE full_at < ?", (now,))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            return wait
+
+        return await self.run(take)
+
+
+class SharedTokenBucket:
+    """Token bucket, общий для процессов через ``RateLimitDatabase``.
+
+    Интерфейс тот же, что у ``TokenBucket``; состояние хранится в базе,
+    поэтому объект можно создавать и выбрасывать в любой момент.
+    """
+
+    def __init__(self, database: RateLimitDatabase, key: str, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._database = database
+        self._key = key
+        self._lock = asyncio.Lock()
+
+    @property
+    def is_full(self) -> bool:
+        return True
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                wait = await self._database.take(self._key, self.rate, self.capacity)
+                if not wait:
+                    return
+                await asyncio.sleep(wait)
@@ -11,6 +11,143 @@ class Settings(BaseSettings):
         "http://web_app:8000/v1/check_access", env="EXTERNAL_API_CHECK_ACCESS"
     )
 
+    # Адрес Telegram Bot API (можно указать локальный сервер)
+    TELEGRAM_API_BASE: str = Field("https://api.telegram.org", env="TELEGRAM_API_BASE")
+
+    # Пул HTTP-соединений для исходящих запросов (Telegram и внешний API)
+    HTTP_POOL_LIMIT: int = Field(100, env="HTTP_POOL_LIMIT")
+    HTTP_POOL_LIMIT_PER_HOST: int = Field(30, env="HTTP_POOL_LIMIT_PER_HOST")
+    HTTP_KEEPALIVE_TIMEOUT: float = Field(30.0, env="HTTP_KEEPALIVE_TIMEOUT")
+    HTTP_DNS_CACHE_TTL: int = Field(300, env="HTTP_DNS_CACHE_TTL")
+    HTTP_TIMEOUT_TOTAL: float = Field(30.0, env="HTTP_TIMEOUT_TOTAL")
+    HTTP_TIMEOUT_CONNECT: float = Field(5.0, env="HTTP_TIMEOUT_CONNECT")
+    HTTP_WARMUP_TIMEOUT: float = Field(5.0, env="HTTP_WARMUP_TIMEOUT")
+
+    # Максимум одновременных отправок в Telegram для пакетного эндпоинта
+    BATCH_SEND_CONCURRENCY: int = Field(10, env="BATCH_SEND_CONCURRENCY")
+
+    # Лимиты Telegram Bot API и повторы исходящих запросов
+    TELEGRAM_GLOBAL_RATE: float = Field(30.0, env="TELEGRAM_GLOBAL_RATE")
+    TELEGRAM_GLOBAL_BURST: float = Field(30.0, env="TELEGRAM_GLOBAL_BURST")
+    TELEGRAM_CHAT_RATE: float = Field(1.0, env="TELEGRAM_CHAT_RATE")
+    TELEGRAM_CHAT_BURST: float = Field(3.0, env="TELEGRAM_CHAT_BURST")
+    TELEGRAM_MAX_RETRIES: int = Field(3, env="TELEGRAM_MAX_RETRIES")
+    TELEGRAM_RETRY_BACKOFF: float = Field(0.5, env="TELEGRAM_RETRY_BACKOFF")
+    TELEGRAM_RETRY_MAX_DELAY: float = Field(30.0, env="TELEGRAM_RETRY_MAX_DELAY")
+
+    # Размер LRU-кеша каждой секции текста заказа (шапка, доставка, состав)
+    RENDER_CACHE_SIZE: int = Field(1024, env="RENDER_CACHE_SIZE")
+
+    # Лимит длины сообщения Telegram: длинный заказ делится на несколько сообщений
+    TELEGRAM_MESSAGE_LIMIT: int = Field(4096, env="TELEGRAM_MESSAGE_LIMIT")
+    # Компактный состав заказа: одинаковые добавки позиции сводятся в одну строку
+    ORDER_COMPACT_ADDITIONS: bool = Field(False, env="ORDER_COMPACT_ADDITIONS")
+
+    # Каталог локальных SQLite-баз (очереди, кеши, индексы)
+    DATA_DIR: str = Field("data", env="DATA_DIR")
+
+    # Фоновая отправка: /send_chat и /edit_chat с ?async_mode=true
+    JOB_WORKERS: int = Field(4, env="JOB_WORKERS")
+    JOB_POLL_INTERVAL: float = Field(1.0, env="JOB_POLL_INTERVAL")
+    JOB_RETENTION_SECONDS: int = Field(86400, env="JOB_RETENTION_SECONDS")
+    # Через сколько секунд без продления задание в работе считается брошенным
+    # (при SHARED_STATE). Воркер продлевает задание каждые JOB_STALE_SECONDS / 3,
+    # повторное выполнение возможно, только если процесс завис дольше этого срока
+    JOB_STALE_SECONDS: int = Field(300, env="JOB_STALE_SECONDS")
+
+    # Последнее состояние сообщений с заказами: пропуск неизменяющих правок
+    MESSAGE_STATE_CACHE_SIZE: int = Field(10000, env="MESSAGE_STATE_CACHE_SIZE")
+    MESSAGE_STATE_PERSIST: bool = Field(False, env="MESSAGE_STATE_PERSIST")
+    # Карточки правит и другой процесс (бот отдельно от API): совпадение
+    # текста перепроверяется по DATA_DIR/message_state.sqlite3
+    MESSAGE_STATE_SHARED: bool = Field(False, env="MESSAGE_STATE_SHARED")
+
+    # Хранилище бота: sqlite (DATA_DIR/bot.sqlite3) или memory
+    BOT_STORAGE: str = Field("sqlite", env="BOT_STORAGE")
+    AUTH_CACHE_TTL: int = Field(86400, env="AUTH_CACHE_TTL")
+    AUTH_CACHE_NEGATIVE_TTL: int = Field(300, env="AUTH_CACHE_NEGATIVE_TTL")
+
+    # Режим получения обновлений ботом: polling или webhook
+    BOT_MODE: str = Field("polling", env="BOT_MODE")
+    WEBHOOK_URL: str = Field("", env="WEBHOOK_URL")
+    WEBHOOK_PATH: str = Field("/telegram/webhook", env="WEBHOOK_PATH")
+    WEBHOOK_SECRET: str = Field("", env="WEBHOOK_SECRET")
+    WEBHOOK_HOST: str = Field("0.0.0.0", env="WEBHOOK_HOST")
+    WEBHOOK_PORT: int = Field(8080, env="WEBHOOK_PORT")
+    WEBHOOK_MAX_CONNECTIONS: int = Field(40, env="WEBHOOK_MAX_CONNECTIONS")
+    # Принимать вебхук в процессе FastAPI (app.py) вместо отдельного сервера
+    WEBHOOK_IN_API: bool = Field(False, env="WEBHOOK_IN_API")
+
+    # Сколько секунд повторное нажатие той же кнопки заказа считается дублем
+    CALLBACK_DEDUP_TTL: float = Field(10.0, env="CALLBACK_DEDUP_TTL")
+
+    # Таймауты запросов бота к внешнему API заказов, секунды
+    EXTERNAL_API_TIMEOUT_ORDER_STATUS: float = Field(5.0, env="EXTERNAL_API_TIMEOUT_ORDER_STATUS")
+    EXTERNAL_API_TIMEOUT_CHECK_ACCESS: float = Field(5.0, env="EXTERNAL_API_TIMEOUT_CHECK_ACCESS")
+    # Предохранитель: ошибок подряд до размыкания, секунд до пробного вызова,
+    # сколько пробных вызовов пропускать одновременно
+    EXTERNAL_API_BREAKER_FAILURES: int = Field(5, env="EXTERNAL_API_BREAKER_FAILURES")
+    EXTERNAL_API_BREAKER_RECOVERY: float = Field(30.0, env="EXTERNAL_API_BREAKER_RECOVERY")
+    EXTERNAL_API_BREAKER_HALF_OPEN_CALLS: int = Field(1, env="EXTERNAL_API_BREAKER_HALF_OPEN_CALLS")
+
+    # Очередь повторов смены статуса заказа (DATA_DIR/outbox.sqlite3)
+    OUTBOX_POLL_INTERVAL: float = Field(1.0, env="OUTBOX_POLL_INTERVAL")
+    OUTBOX_BATCH_SIZE: int = Field(10, env="OUTBOX_BATCH_SIZE")
+    OUTBOX_BACKOFF_BASE: float = Field(2.0, env="OUTBOX_BACKOFF_BASE")
+    OUTBOX_BACKOFF_MAX: float = Field(300.0, env="OUTBOX_BACKOFF_MAX")
+    OUTBOX_MAX_ATTEMPTS: int = Field(20, env="OUTBOX_MAX_ATTEMPTS")
+    OUTBOX_LEASE_SECONDS: float = Field(60.0, env="OUTBOX_LEASE_SECONDS")
+
+    # Реестр телефонов сотрудников для /check_access (DATA_DIR/phones.sqlite3):
+    # код страны для номеров без него, файл CSV/JSON, который перечитывается
+    # при изменении, и как часто сверять реестр с базой
+    PHONE_DEFAULT_COUNTRY_CODE: str = Field("7", env="PHONE_DEFAULT_COUNTRY_CODE")
+    PHONE_REGISTRY_FILE: str = Field("", env="PHONE_REGISTRY_FILE")
+    PHONE_REGISTRY_RELOAD_INTERVAL: float = Field(5.0, env="PHONE_REGISTRY_RELOAD_INTERVAL")
+    # Токен администратора для /phones/import (пусто — импорт через API выключен)
+    # и максимальный размер загружаемого файла, байт
+    PHONE_IMPORT_TOKEN: str = Field("", env="PHONE_IMPORT_TOKEN")
+    PHONE_IMPORT_MAX_BYTES: int = Field(10_000_000, env="PHONE_IMPORT_MAX_BYTES")
+
+    # Склейка частых правок одной карточки: окно ожидания (0 — выключено)
+    # и максимальная задержка правки от первой отложенной, секунды
+    EDIT_COALESCE_WINDOW: float = Field(0.0, env="EDIT_COALESCE_WINDOW")
+    EDIT_COALESCE_MAX_DELAY: float = Field(2.0, env="EDIT_COALESCE_MAX_DELAY")
+
+    # Сколько событий одного потока /ingest обрабатывается одновременно
+    INGEST_MAX_IN_FLIGHT: int = Field(100, env="INGEST_MAX_IN_FLIGHT")
+
+    # Рассылки всем авторизованным пользователям (DATA_DIR/broadcasts.sqlite3)
+    BROADCAST_PAGE_SIZE: int = Field(100, env="BROADCAST_PAGE_SIZE")
+    BROADCAST_CONCURRENCY: int = Field(10, env="BROADCAST_CONCURRENCY")
+    BROADCAST_LEASE_SECONDS: float = Field(60.0, env="BROADCAST_LEASE_SECONDS")
+    BROADCAST_RESUME_INTERVAL: float = Field(30.0, env="BROADCAST_RESUME_INTERVAL")
+
+    # Трассировка заказа: куда писать спаны (пусто — выключено, console или
+    # file) и файл для file, по умолчанию DATA_DIR/traces.jsonl
+    TRACING_EXPORTER: str = Field("", env="TRACING_EXPORTER")
+    TRACING_FILE: str = Field("", env="TRACING_FILE")
+
+    # Отдельный порт с /metrics для процесса бота (0 — выключено)
+    BOT_METRICS_HOST: str = Field("0.0.0.0", env="BOT_METRICS_HOST")
+    BOT_METRICS_PORT: int = Field(9101, env="BOT_METRICS_PORT")
+
+    # Сколько секунд помнить, в каких сообщениях показан заказ
+    ORDER_INDEX_RETENTION_SECONDS: int = Field(7 * 86400, env="ORDER_INDEX_RETENTION_SECONDS")
+
+    # Запуск API: число процессов uvicorn и автоперезагрузка для разработки
+    API_HOST: str = Field("0.0.0.0", env="API_HOST")
+    API_PORT: int = Field(8000, env="API_PORT")
+    API_WORKERS: int = Field(1, env="API_WORKERS")
+    API_RELOAD: bool = Field(True, env="API_RELOAD")
+
+    # Сколько секунд после SIGTERM дожидаться отправок в работе
+    SHUTDOWN_TIMEOUT: float = Field(8.0, env="SHUTDOWN_TIMEOUT")
+
+    # Лимиты Telegram, состояние сообщений и дубли нажатий общие для всех
+    # процессов (SQLite в DATA_DIR); включается автоматически при API_WORKERS > 1
+    SHARED_STATE: bool = Field(False, env="SHARED_STATE")
+
     class Config:
         env_file = ".env"
 
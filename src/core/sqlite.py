@@ -0,0 +1,63 @@
+import asyncio
+import os
+import sqlite3
+import threading
+from typing import Callable, Optional, TypeVar
+
+from src.core.settings import settings
+
+T = TypeVar("T")
+
+
+class SqliteDatabase:
+    """Локальная SQLite-база для служебных данных API и бота.
+
+    Соединение открывается лениво в режиме WAL; все запросы выполняются в
+    отдельном потоке под блокировкой, чтобы не блокировать event loop.
+    Наследники описывают схему в ``SCHEMA``.
+    """
+
+    SCHEMA: str = ""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def in_data_dir(cls, filename: str, *args, **kwargs):
+        """Создаёт базу с файлом в каталоге ``settings.DATA_DIR``."""
+        return cls(os.path.join(settings.DATA_DIR, filename), *args, **kwargs)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self.path != ":memory:":
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(
+                self.path, check_same_thread=False, isolation_level=None
+            )
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            if self.SCHEMA:
+                conn.executescript(self.SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def run_sync(self, func: Callable[..., T], *args) -> T:
+        """Выполняет ``func(conn, *args)`` в текущем потоке под блокировкой."""
+        with self._lock:
+            return func(self._connect(), *args)
+
+    async def run(self, func: Callable[..., T], *args) -> T:
+        """Выполняет ``func(conn, *args)`` в пуле потоков."""
+        return await asyncio.to_thread(self.run_sync, func, *args)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
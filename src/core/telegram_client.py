@@ -0,0 +1,103 @@
+import json
+from typing import Optional
+
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+
+from src.core.settings import Settings, settings
+from src.core.telegram_scheduler import (
+    TelegramResponse,
+    TelegramScheduler,
+    telegram_scheduler,
+)
+from src.core.tracing import tracer
+
+
+async def trace_bot_request(make_request, bot, method):
+    """Спан на каждый вызов Bot API из aiogram, кроме долгого опроса getUpdates."""
+    api_method = method.__api_method__
+    if api_method == "getUpdates":
+        return await make_request(bot, method)
+    with tracer.span(f"telegram.{api_method}"):
+        return await make_request(bot, method)
+
+
+def build_bot_session(config: Settings = settings) -> AiohttpSession:
+    """Сессия aiogram, направленная на ``TELEGRAM_API_BASE``."""
+    api = TelegramAPIServer.from_base(config.TELEGRAM_API_BASE.rstrip("/"))
+    session = AiohttpSession(api=api)
+    if tracer.enabled:
+        session.middleware(trace_bot_request)
+    return session
+
+
+class TelegramClient:
+    """Вызовы Telegram Bot API, которыми пользуется API заказов.
+
+    Адрес берётся из ``TELEGRAM_API_BASE``, поэтому вместо api.telegram.org
+    можно использовать собственный сервер telegram-bot-api. Все запросы
+    идут через планировщик с лимитами и повторами.
+    """
+
+    def __init__(
+        self,
+        token: str,
+        base_url: str = "https://api.telegram.org",
+        scheduler: TelegramScheduler = telegram_scheduler,
+    ):
+        self._base = f"{base_url.rstrip('/')}/bot{token}"
+        self._scheduler = scheduler
+
+    def method_url(self, method: str) -> str:
+        return f"{self._base}/{method}"
+
+    async def call(self, chat_id, method: str, payload: dict) -> TelegramResponse:
+        """Вызывает метод Bot API в очереди чата ``chat_id``."""
+        return await self._scheduler.request(
+            chat_id, self.method_url(method), json=payload
+        )
+
+    async def send_message(
+        self, chat_id, text: str, reply_markup: Optional[str] = None
+    ) -> TelegramResponse:
+        payload = {
+            "chat_id": chat_id,
+            "text": text,
+            "parse_mode": "Markdown",
+            "disable_web_page_preview": True,
+        }
+        if reply_markup:
+            payload["reply_markup"] = reply_markup
+        return await self.call(chat_id, "sendMessage", payload)
+
+    async def edit_message_text(
+        self, chat_id, message_id: int, text: str, reply_markup: Optional[str] = None
+    ) -> TelegramResponse:
+        payload = {
+            "chat_id": chat_id,
+            "message_id": message_id,
+            "text": text,
+            "parse_mode": "Markdown",
+            "disable_web_page_preview": True,
+        }
+        if reply_markup:
+            payload["reply_markup"] = reply_markup
+        return await self.call(chat_id, "editMessageText", payload)
+
+    async def edit_message_reply_markup(
+        self, chat_id, message_id: int, reply_markup: Optional[str] = None
+    ) -> TelegramResponse:
+        """Меняет только клавиатуру; без ``reply_markup`` клавиатура убирается."""
+        payload = {
+            "chat_id": chat_id,
+            "message_id": message_id,
+            "reply_markup": reply_markup or json.dumps({"inline_keyboard": []}),
+        }
+        return await self.call(chat_id, "editMessageReplyMarkup", payload)
+
+    async def delete_message(self, chat_id, message_id: int) -> TelegramResponse:
+        payload = {"chat_id": chat_id, "message_id": message_id}
+        return await self.call(chat_id, "deleteMessage", payload)
+
+
+telegram_client = TelegramClient(settings.BOT, settings.TELEGRAM_API_BASE)
@@ -0,0 +1,219 @@
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import aiohttp
+
+from src.core.http_client import http_client
+from src.core.metrics import TELEGRAM_REQUEST_SECONDS
+from src.core.rate_limiter import RateLimitDatabase, SharedTokenBucket, TokenBucket
+from src.core.settings import Settings, settings
+from src.core.tracing import current_context, tracer
+
+# После скольких известных чатов начинаем чистить восстановившиеся бакеты
+CHAT_BUCKETS_SOFT_LIMIT = 1024
+
+# Методы, публикующие новое сообщение: после таймаута, обрыва или 5xx
+# Telegram мог уже принять запрос, и повтор отправил бы карточку дважды
+NON_IDEMPOTENT_PREFIXES = ("send", "forward", "copy")
+
+
+def is_idempotent(method: str) -> bool:
+    return not method.startswith(NON_IDEMPOTENT_PREFIXES)
+
+
+def chat_key(chat_id) -> str:
+    """Ключ чата для очередей и кешей: 123 и "123" совпадают, "@channel" допустим."""
+    return str(chat_id)
+
+
+@dataclass
+class TelegramResponse:
+    """Ответ Telegram Bot API, прочитанный целиком."""
+
+    status: int
+    text: str
+
+    def json(self) -> dict:
+        return json.loads(self.text)
+
+    @property
+    def retry_after(self) -> Optional[float]:
+        """Значение ``parameters.retry_after`` из ответа 429, если оно есть."""
+        try:
+            return float(self.json()["parameters"]["retry_after"])
+        except (ValueError, KeyError, TypeError):
+            return None
+
+
+class TelegramScheduler:
+    """Очередь исходящих запросов к Telegram с учётом лимитов.
+
+    Запросы одного чата выполняются строго по очереди отдельным воркером,
+    поэтому редактирование никогда не обгонит отправку. Перед каждым
+    запросом берётся токен из бакета чата и из глобального бакета бота.
+    Ответы 429 повторяются через ``retry_after``, ответы 5xx и сетевые
+    ошибки — с экспоненциальной задержкой. Отправка нового сообщения
+    повторяется только после 429 и ошибки соединения, когда запрос точно
+    не ушёл; правки и удаления повторяются всегда.
+
+    С ``database`` бакеты хранятся в SQLite и лимиты соблюдаются суммарно
+    всеми процессами; порядок запросов гарантируется внутри процесса.
+    Запрос попадает в трассу того, кто его поставил, вместе со временем
+    ожидания в очереди.
+    """
+
+    def __init__(self, config: Settings = settings, database: Optional[RateLimitDatabase] = None):
+        self._config = config
+        self._database = database
+        self._global_bucket = self._make_bucket(
+            "global", config.TELEGRAM_GLOBAL_RATE, config.TELEGRAM_GLOBAL_BURST
+        )
+        self._chat_buckets: Dict[str, TokenBucket] = {}
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._workers: Dict[str, asyncio.Task] = {}
+
+    async def request(
+        self, chat_id, url: str, *, json: dict = None, data: dict = None
+    ) -> TelegramResponse:
+        """Ставит запрос в очередь чата и ждёт его выполнения."""
+        key = chat_key(chat_id)
+        future = asyncio.get_running_loop().create_future()
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = asyncio.Queue()
+        queue.put_nowait((url, json, data, current_context(), time.perf_counter(), future))
+        if key not in self._workers:
+            self._workers[key] = asyncio.create_task(self._drain(key))
+        return await future
+
+    async def close(self, timeout: Optional[float] = 0) -> None:
+        """Останавливает воркеры.
+
+        Очереди чатов дорабатываются ``timeout`` секунд (None — до конца),
+        затем невыполненные запросы отменяются.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while self._workers:
+            remaining = None if deadline is None else deadline - loop.time()
+            if remaining is not None and remaining <= 0:
+                break
+            await asyncio.wait(list(self._workers.values()), timeout=remaining)
+        workers = list(self._workers.values())
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        for queue in self._queues.values():
+            while not queue.empty():
+                *_, future = queue.get_nowait()
+                future.cancel()
+        self._queues.clear()
+        self._workers.clear()
+        if self._database is not None:
+            self._database.close()
+
+    def _chat_bucket(self, key: str) -> TokenBucket:
+        bucket = self._chat_buckets.get(key)
+        if bucket is None:
+            if len(self._chat_buckets) >= CHAT_BUCKETS_SOFT_LIMIT:
+                self._prune_chat_buckets()
+            bucket = self._chat_buckets[key] = self._make_bucket(
+                f"chat:{key}",
+                self._config.TELEGRAM_CHAT_RATE,
+                self._config.TELEGRAM_CHAT_BURST,
+            )
+        return bucket
+
+    def _make_bucket(self, key: str, rate: float, capacity: float):
+        if self._database is None:
+            return TokenBucket(rate, capacity)
+        return SharedTokenBucket(self._database, key, rate, capacity)
+
+    def _prune_chat_buckets(self) -> None:
+        for key, bucket in list(self._chat_buckets.items()):
+            if key not in self._workers and bucket.is_full:
+                del self._chat_buckets[key]
+
+    async def _drain(self, key: str) -> None:
+        queue = self._queues[key]
+        try:
+            while not queue.empty():
+                url, json_payload, data, context, queued_at, future = queue.get_nowait()
+                if future.done():
+                    continue
+                try:
+                    # Воркер чата общий, родитель спана — тот, кто поставил запрос
+                    with tracer.span(
+                        f"telegram.{url.rsplit('/', 1)[-1]}",
+                        parent=context,
+                        root=context is None,
+                        chat_id=key,
+                        queue_wait=round(time.perf_counter() - queued_at, 6),
+                    ) as span:
+                        result = await self._execute(key, url, json_payload, data)
+                        span.set(http_status=result.status)
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    if not future.done():
+                        future.set_result(result)
+        finally:
+            self._workers.pop(key, None)
+            if queue.empty():
+                self._queues.pop(key, None)
+
+    def _backoff(self, attempt: int) -> float:
+        delay = self._config.TELEGRAM_RETRY_BACKOFF * (2 ** attempt)
+        delay = min(delay, self._config.TELEGRAM_RETRY_MAX_DELAY)
+        return delay * random.uniform(0.8, 1.2)
+
+    async def _execute(
+        self, key: str, url: str, json_payload: dict, data: dict
+    ) -> TelegramResponse:
+        bucket = self._chat_bucket(key)
+        method = url.rsplit("/", 1)[-1]
+        idempotent = is_idempotent(method)
+        max_retries = self._config.TELEGRAM_MAX_RETRIES
+        for attempt in range(max_retries + 1):
+            # Сначала ждём лимит чата, чтобы не занимать глобальный токен впустую
+            await bucket.acquire()
+            await self._global_bucket.acquire()
+            try:
+                with TELEGRAM_REQUEST_SECONDS.time(method=method, status="error") as labels:
+                    session = http_client.session
+                    async with session.post(url, json=json_payload, data=data) as response:
+                        result = TelegramResponse(response.status, await response.text())
+                    labels["status"] = result.status
+            except aiohttp.ClientConnectorError:
+                # Соединение не установлено, запрос не отправлен: повтор безопасен
+                if attempt == max_retries:
+                    raise
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if attempt == max_retries or not idempotent:
+                    raise
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+
+            if attempt == max_retries:
+                return result
+            if result.status == 429:
+                await asyncio.sleep(result.retry_after or self._backoff(attempt))
+                continue
+            if result.status >= 500 and idempotent:
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+            return result
+        return result
+
+
+telegram_scheduler = TelegramScheduler(
+    settings,
+    RateLimitDatabase.in_data_dir("rate_limits.sqlite3") if settings.SHARED_STATE else None,
+)
@@ -0,0 +1,231 @@
+import json
+import os
+import random
+import sys
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import IO, Callable, Dict, List, NamedTuple, Optional
+
+from src.core.settings import Settings, settings
+
+# Сколько спанов копить перед записью и как долго их держать, секунды
+EXPORT_BATCH = 100
+EXPORT_INTERVAL = 1.0
+
+
+class TraceContext(NamedTuple):
+    """Трасса и спан, к которым привязывается продолжение работы."""
+
+    trace_id: str
+    span_id: str
+
+    @property
+    def traceparent(self) -> str:
+        """Значение заголовка W3C ``traceparent``."""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    @classmethod
+    def parse(cls, header: Optional[str]) -> Optional["TraceContext"]:
+        """Разбирает ``traceparent``; None, если заголовка нет или он некорректен."""
+        if not header:
+            return None
+        parts = header.strip().lower().split("-")
+        if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+            return None
+        trace_id, span_id = parts[1], parts[2]
+        try:
+            if int(trace_id, 16) == 0 or int(span_id, 16) == 0:
+                return None
+        except ValueError:
+            return None
+        return cls(trace_id, span_id)
+
+
+class Span:
+    """Отрезок работы: имя, время начала, длительность и атрибуты."""
+
+    __slots__ = ("name", "context", "parent_id", "start", "duration", "attributes",
+                 "status", "_started")
+
+    def __init__(self, name: str, context: TraceContext, parent_id: Optional[str],
+                 attributes: dict):
+        self.name = name
+        self.context = context
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.status = "ok"
+        self.duration: Optional[float] = None
+        self.start = time.time()
+        self._started = time.perf_counter()
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.context.trace_id,
+            "span_id": self.context.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration": self.duration,
+            "status": self.status,
+            "pid": os.getpid(),
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    """Спан выключенной трассировки: атрибуты отбрасываются.
+
+    Служит и своим контекстным менеджером, чтобы выключенная трассировка
+    ничего не стоила в горячих местах вроде отрисовки заказа.
+    """
+
+    context = None
+
+    def set(self, **attributes) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        return None
+
+
+NOOP_SPAN = _NoopSpan()
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_context() -> Optional[TraceContext]:
+    """Контекст текущего спана, чтобы продолжить трассу в другой задаче или процессе."""
+    span = _current_span.get()
+    return span.context if span is not None else None
+
+
+def trace_headers() -> Dict[str, str]:
+    """Заголовок ``traceparent`` для исходящего запроса или пустой словарь."""
+    context = current_context()
+    return {"traceparent": context.traceparent} if context is not None else {}
+
+
+class JsonLinesExporter:
+    """Пишет законченные спаны по одному JSON на строку.
+
+    Спаны копятся в памяти и записываются пачкой из ``EXPORT_BATCH`` штук
+    или раз в ``EXPORT_INTERVAL`` секунд. Файл открывается на дозапись,
+    пачка уходит одним ``write``, поэтому процессы API могут писать в один
+    файл, не перемешивая строки.
+    """
+
+    def __init__(self, write: Callable[[str], None]):
+        self._write = write
+        self._buffer: List[str] = []
+        self._flushed_at = time.monotonic()
+
+    @classmethod
+    def to_file(cls, path: str) -> "JsonLinesExporter":
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        return cls(lambda text: os.write(fd, text.encode()))
+
+    @classmethod
+    def to_console(cls, stream: IO[str] = None) -> "JsonLinesExporter":
+        stream = stream or sys.stdout
+
+        def write(text: str) -> None:
+            stream.write(text)
+            stream.flush()
+
+        return cls(write)
+
+    def export(self, span: Span) -> None:
+        self._buffer.append(json.dumps(span.to_dict(), ensure_ascii=False, default=str))
+        if (
+            len(self._buffer) >= EXPORT_BATCH
+            or time.monotonic() - self._flushed_at >= EXPORT_INTERVAL
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        batch, self._buffer = self._buffer, []
+        self._flushed_at = time.monotonic()
+        if batch:
+            self._write("\n".join(batch) + "\n")
+
+
+class Tracer:
+    """Трассировка заказа: от запроса к API до нажатия кнопки сотрудником.
+
+    ``span`` замеряет блок кода и делает его родителем спанов, открытых
+    внутри, в том числе в порождённых задачах. Между процессами контекст
+    передаётся явно: заголовком ``traceparent`` или через индекс заказов.
+    Без экспортёра ``span`` ничего не делает.
+    """
+
+    def __init__(self, exporter: Optional[JsonLinesExporter] = None):
+        self._exporter = exporter
+
+    @classmethod
+    def from_settings(cls, config: Settings = settings) -> "Tracer":
+        if config.TRACING_EXPORTER == "console":
+            return cls(JsonLinesExporter.to_console())
+        if config.TRACING_EXPORTER == "file":
+            path = config.TRACING_FILE or os.path.join(config.DATA_DIR, "traces.jsonl")
+            return cls(JsonLinesExporter.to_file(path))
+        if config.TRACING_EXPORTER:
+            raise ValueError(f"Unknown TRACING_EXPORTER: {config.TRACING_EXPORTER}")
+        return cls()
+
+    @property
+    def enabled(self) -> bool:
+        return self._exporter is not None
+
+    def span(self, name: str, parent: Optional[TraceContext] = None, root: bool = False,
+             **attributes):
+        """Открывает спан ``name``.
+
+        Родитель — ``parent`` или текущий спан; с ``root`` без ``parent``
+        начинается новая трасса. Атрибуты можно дополнить внутри блока
+        через ``span.set``.
+        """
+        if self._exporter is None:
+            return NOOP_SPAN
+        return self._span(name, parent, root, attributes)
+
+    @contextmanager
+    def _span(self, name: str, parent: Optional[TraceContext], root: bool, attributes: dict):
+        if parent is None and not root:
+            parent = current_context()
+        # Идентификаторам не нужна криптостойкость, а os.urandom — лишний системный вызов
+        span = Span(
+            name,
+            TraceContext(parent.trace_id if parent else f"{random.getrandbits(128):032x}",
+                         f"{random.getrandbits(64):016x}"),
+            parent.span_id if parent else None,
+            attributes,
+        )
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.attributes.setdefault("error", repr(e))
+            raise
+        finally:
+            span.duration = time.perf_counter() - span._started
+            _current_span.reset(token)
+            self._exporter.export(span)
+
+    def flush(self) -> None:
+        """Записывает накопленные спаны (при остановке процесса)."""
+        if self._exporter is not None:
+            self._exporter.flush()
+
+
+tracer = Tracer.from_settings()
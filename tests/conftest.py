@@ -0,0 +1,8 @@
+import os
+import tempfile
+
+# Настройки читаются при импорте модулей: служебные базы — во временном каталоге
+os.environ.setdefault("BOT", "test")
+os.environ["DATA_DIR"] = tempfile.mkdtemp(prefix="orders_bot_tests_")
+os.environ.pop("TRACING_EXPORTER", None)
+
@@ -0,0 +1,127 @@
+import asyncio
+import os
+import tempfile
+import time
+from collections import Counter
+
+import pytest
+
+from src.core.broadcast import DONE, BroadcastEngine, BroadcastStore
+from src.core.settings import Settings
+from src.core.telegram_scheduler import TelegramResponse
+
+
+class Recipients:
+    """Авторизованные пользователи с user_id 1..count."""
+
+    def __init__(self, count: int):
+        self.user_ids = list(range(1, count + 1))
+
+    async def count_authorized(self) -> int:
+        return len(self.user_ids)
+
+    async def authorized_user_ids(self, after: int, limit: int):
+        return [user_id for user_id in self.user_ids if user_id > after][:limit]
+
+
+class SlowClient:
+    """Отправляет сообщение за ``delay`` секунд и запоминает получателей."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.sent = Counter()
+
+    async def send_message(self, chat_id, text, reply_markup=None):
+        await asyncio.sleep(self.delay)
+        self.sent[chat_id] += 1
+        return TelegramResponse(200, '{"ok": true}')
+
+
+@pytest.fixture
+def path():
+    return os.path.join(tempfile.mkdtemp(), "broadcasts.sqlite3")
+
+
+def make_engine(path: str, client, recipients, **config) -> BroadcastEngine:
+    config.setdefault("BROADCAST_PAGE_SIZE", 10)
+    config.setdefault("BROADCAST_CONCURRENCY", 1)
+    config.setdefault("BROADCAST_RESUME_INTERVAL", 0.05)
+    return BroadcastEngine(BroadcastStore(path), recipients, client, Settings(**config))
+
+
+async def wait_done(engine: BroadcastEngine, broadcast_id: str, timeout: float = 10) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        broadcast = await engine.get(broadcast_id)
+        if broadcast["status"] == DONE:
+            return broadcast
+        await asyncio.sleep(0.05)
+    raise AssertionError(f"broadcast is {broadcast}")
+
+
+def test_slow_page_keeps_lease_from_other_process(path):
+    # Страница идёт 1 с при аренде 0,3 с: без продления её перехватил бы сосед
+    async def scenario():
+        client = SlowClient(delay=0.1)
+        recipients = Recipients(10)
+        owner = make_engine(path, client, recipients, BROADCAST_LEASE_SECONDS=0.3)
+        neighbour = make_engine(path, client, recipients, BROADCAST_LEASE_SECONDS=0.3)
+        await neighbour.start()
+        try:
+            broadcast_id = await owner.create("Стоп-лист")
+            broadcast = await wait_done(owner, broadcast_id)
+        finally:
+            await neighbour.stop()
+            await owner.stop()
+        return client.sent, broadcast
+
+    sent, broadcast = asyncio.run(scenario())
+    assert max(sent.values()) == 1
+    assert broadcast["sent"] == 10
+
+
+def test_lost_lease_stops_page(path):
+    async def scenario():
+        client = SlowClient(delay=0.1)
+        owner = make_engine(path, client, Recipients(10), BROADCAST_LEASE_SECONDS=0.3)
+        broadcast_id = await owner.create("Стоп-лист")
+        await asyncio.sleep(0.15)
+
+        def steal(conn):
+            conn.execute("UPDATE broadcasts SET owner = 'other' WHERE id = ?", (broadcast_id,))
+
+        await owner._store.run(steal)
+        await asyncio.sleep(0.5)
+        running = broadcast_id in owner._tasks
+        await owner.stop()
+        return client.sent, running
+
+    sent, running = asyncio.run(scenario())
+    assert not running
+    # Отправка остановилась при первом продлении аренды, а не в конце страницы
+    assert sum(sent.values()) < 10
+
+
+def test_stopped_broadcast_resumes_from_checkpoint(path):
+    async def scenario():
+        client = SlowClient(delay=0.01)
+        recipients = Recipients(35)
+        first = make_engine(path, client, recipients)
+        broadcast_id = await first.create("Стоп-лист")
+        while (await first.get(broadcast_id))["cursor"] < 20:
+            await asyncio.sleep(0.01)
+        await first.stop()
+
+        second = make_engine(path, client, recipients)
+        await second.start()
+        try:
+            broadcast = await wait_done(second, broadcast_id)
+        finally:
+            await second.stop()
+        return client.sent, broadcast
+
+    sent, broadcast = asyncio.run(scenario())
+    assert sorted(sent) == list(range(1, 36))
+    assert broadcast["sent"] == 35
+    # Повторно могли уйти только сообщения прерванной страницы
+    assert sum(sent.values()) - 35 <= 10
@@ -0,0 +1,140 @@
+import asyncio
+import os
+import tempfile
+import time
+
+import pytest
+
+from src.core.job_queue import DONE, FAILED, QUEUED, RUNNING, JobQueue, JobStore
+from src.core.settings import Settings
+
+
+@pytest.fixture
+def path():
+    return os.path.join(tempfile.mkdtemp(), "jobs.sqlite3")
+
+
+class SlowHandler:
+    """Обработчик, который считает запуски и выполняется ``seconds`` секунд."""
+
+    def __init__(self, seconds: float = 0):
+        self.seconds = seconds
+        self.runs = 0
+
+    async def __call__(self, payload: dict) -> dict:
+        self.runs += 1
+        await asyncio.sleep(self.seconds)
+        return {"status": 200}
+
+
+def make_queue(path: str, handler, idempotent: bool = True, **config) -> JobQueue:
+    config.setdefault("JOB_WORKERS", 1)
+    config.setdefault("JOB_POLL_INTERVAL", 0.05)
+    queue = JobQueue(JobStore(path), Settings(**config))
+    queue.register("job", handler, idempotent=idempotent)
+    return queue
+
+
+async def wait_status(queue: JobQueue, job_id: str, status: str, timeout: float = 5) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = await queue.get(job_id)
+        if job["status"] == status:
+            return job
+        await asyncio.sleep(0.02)
+    raise AssertionError(f"job {job_id} is {job['status']}, expected {status}")
+
+
+async def set_running(store: JobStore, job_id: str, updated_at: float) -> None:
+    def update(conn):
+        conn.execute(
+            "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ?",
+            (RUNNING, updated_at, job_id),
+        )
+
+    await store.run(update)
+
+
+def test_interrupted_job_is_requeued_on_start(path):
+    async def scenario():
+        store = JobStore(path)
+        job_id = await store.add("job", {})
+        await store.claim()
+        store.close()
+
+        handler = SlowHandler()
+        queue = make_queue(path, handler)
+        await queue.start()
+        try:
+            await wait_status(queue, job_id, DONE)
+        finally:
+            await queue.stop()
+        return handler.runs
+
+    assert asyncio.run(scenario()) == 1
+
+
+def test_shared_state_requeues_only_stale_jobs(path):
+    async def scenario():
+        store = JobStore(path)
+        stale = await store.add("job", {})
+        alive = await store.add("job", {})
+        await set_running(store, stale, time.time() - 120)
+        await set_running(store, alive, time.time())
+
+        queue = make_queue(path, SlowHandler(), SHARED_STATE=True, JOB_STALE_SECONDS=60)
+        await queue._requeue_abandoned()
+        statuses = [(await store.get(job_id))["status"] for job_id in (stale, alive)]
+        store.close()
+        queue._store.close()
+        return statuses
+
+    assert asyncio.run(scenario()) == [QUEUED, RUNNING]
+
+
+def test_heartbeat_keeps_long_job_from_requeue(path):
+    async def scenario():
+        handler = SlowHandler(seconds=2.5)
+        queue = make_queue(path, handler, SHARED_STATE=True, JOB_STALE_SECONDS=1)
+        # Соседний процесс с той же очередью, но без своих воркеров
+        neighbour = make_queue(path, handler, SHARED_STATE=True, JOB_STALE_SECONDS=1)
+        await queue.start()
+        try:
+            job_id = await queue.enqueue("job", {})
+            deadline = time.monotonic() + 2
+            while time.monotonic() < deadline:
+                await neighbour._requeue_abandoned()
+                await asyncio.sleep(0.1)
+            await wait_status(queue, job_id, DONE)
+        finally:
+            await queue.stop()
+            neighbour._store.close()
+        return handler.runs
+
+    assert asyncio.run(scenario()) == 1
+
+
+@pytest.mark.parametrize("idempotent, status, runs", [(False, FAILED, 1), (True, DONE, 2)])
+def test_job_cancelled_at_shutdown(path, idempotent, status, runs):
+    async def scenario():
+        handler = SlowHandler(seconds=0.3)
+        queue = make_queue(path, handler, idempotent=idempotent)
+        await queue.start()
+        job_id = await queue.enqueue("job", {})
+        await wait_status(queue, job_id, RUNNING)
+        await queue.stop(timeout=0.05)
+
+        # Отправку не повторяем: Telegram мог уже принять сообщение
+        handler.seconds = 0
+        queue = make_queue(path, handler, idempotent=idempotent)
+        await queue.start()
+        try:
+            job = await wait_status(queue, job_id, status)
+        finally:
+            await queue.stop()
+        return job, handler.runs
+
+    job, handler_runs = asyncio.run(scenario())
+    assert handler_runs == runs
+    if status == FAILED:
+        assert "may have been sent" in job["result"]["message"]
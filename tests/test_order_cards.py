@@ -0,0 +1,97 @@
+import asyncio
+import os
+import tempfile
+
+import pytest
+
+from api_routes import order_cards
+from src.core.order_index import OrderIndex
+
+CHAT_ID = -100200300
+CARD_ID = 10
+
+
+class FakeTelegram:
+    """Отправка, правка и удаление сообщений без Telegram."""
+
+    def __init__(self, fail_edit_of=None):
+        self.calls = []
+        self.fail_edit_of = fail_edit_of
+        self._next_id = 100
+
+    async def send(self, chat_id, text, reply_markup=None):
+        self._next_id += 1
+        self.calls.append(("send", self._next_id, text))
+        return {"status": 200, "message_id": self._next_id}
+
+    async def edit(self, chat_id, message_id, text, reply_markup=None):
+        self.calls.append(("edit", message_id, text))
+        if message_id == self.fail_edit_of:
+            return {"status": 400, "message": "Failed to edit message: Bad Request"}
+        return {"status": 200}
+
+    async def delete(self, chat_id, message_id):
+        self.calls.append(("delete", message_id, None))
+        return {"status": 200}
+
+
+@pytest.fixture
+def index(monkeypatch):
+    index = OrderIndex(os.path.join(tempfile.mkdtemp(), "orders.sqlite3"))
+    monkeypatch.setattr(order_cards, "order_index", index)
+    yield index
+    index.close()
+
+
+def use(monkeypatch, telegram: FakeTelegram) -> None:
+    monkeypatch.setattr(order_cards, "_send_message", telegram.send)
+    monkeypatch.setattr(order_cards, "_edit_message", telegram.edit)
+    monkeypatch.setattr(order_cards, "_delete_message", telegram.delete)
+
+
+def test_sync_parts_edits_existing_and_sends_missing(monkeypatch, index):
+    telegram = FakeTelegram()
+    use(monkeypatch, telegram)
+    asyncio.run(index.save_parts(CHAT_ID, CARD_ID, [11, 12]))
+
+    error = asyncio.run(order_cards._sync_parts(CHAT_ID, CARD_ID, ["p1", "p2", "p3", "p4"]))
+
+    assert error is None
+    assert telegram.calls == [
+        ("edit", 11, "p1"), ("edit", 12, "p2"), ("send", 101, "p3"), ("send", 102, "p4"),
+    ]
+    assert asyncio.run(index.parts(CHAT_ID, CARD_ID)) == [11, 12, 101, 102]
+
+
+def test_sync_parts_deletes_stale_parts(monkeypatch, index):
+    telegram = FakeTelegram()
+    use(monkeypatch, telegram)
+    asyncio.run(index.save_parts(CHAT_ID, CARD_ID, [11, 12, 13]))
+
+    error = asyncio.run(order_cards._sync_parts(CHAT_ID, CARD_ID, ["p1"]))
+
+    assert error is None
+    assert telegram.calls == [("edit", 11, "p1"), ("delete", 12, None), ("delete", 13, None)]
+    assert asyncio.run(index.parts(CHAT_ID, CARD_ID)) == [11]
+
+
+def test_sync_parts_keeps_parts_after_failure(monkeypatch, index):
+    telegram = FakeTelegram(fail_edit_of=12)
+    use(monkeypatch, telegram)
+    asyncio.run(index.save_parts(CHAT_ID, CARD_ID, [11, 12, 13]))
+
+    error = asyncio.run(order_cards._sync_parts(CHAT_ID, CARD_ID, ["p1", "p2"]))
+
+    assert error["status"] == 400
+    # Дальше неудачной части не идём и ничего не удаляем
+    assert telegram.calls == [("edit", 11, "p1"), ("edit", 12, "p2")]
+    assert asyncio.run(index.parts(CHAT_ID, CARD_ID)) == [11, 12, 13]
+
+
+def test_sync_parts_without_parts_does_nothing(monkeypatch, index):
+    telegram = FakeTelegram()
+    use(monkeypatch, telegram)
+
+    assert asyncio.run(order_cards._sync_parts(CHAT_ID, CARD_ID, [])) is None
+    assert telegram.calls == []
+    assert asyncio.run(index.parts(CHAT_ID, CARD_ID)) == []
@@ -0,0 +1,96 @@
+import asyncio
+import json
+import os
+import tempfile
+
+import pytest
+from starlette.requests import Request
+
+from api_routes import routers
+from src.core.phones import PhoneRegistry
+from src.core.settings import Settings
+
+TOKEN = "admin-secret"
+BODY = b"phone\n+7 999 123-45-67\n89991234568\n"
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    config = Settings(PHONE_IMPORT_TOKEN=TOKEN, PHONE_IMPORT_MAX_BYTES=100)
+    registry = PhoneRegistry(os.path.join(tempfile.mkdtemp(), "phones.sqlite3"), config)
+    monkeypatch.setattr(routers, "settings", config)
+    monkeypatch.setattr(routers, "phone_registry", registry)
+    yield registry
+    registry.close()
+
+
+def make_request(body: bytes, headers: dict) -> Request:
+    """Запрос с телом, которое приходит кусками по 16 байт, как из сокета."""
+    chunks = [body[i:i + 16] for i in range(0, len(body), 16)] or [b""]
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+        for i, chunk in enumerate(chunks)
+    ]
+
+    async def receive():
+        return messages.pop(0)
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/phones/import",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+        "client": ("10.0.0.5", 40000),
+    }
+    return Request(scope, receive)
+
+
+def call(body: bytes, headers: dict, replace: bool = False):
+    request = make_request(body, headers)
+    response = asyncio.run(routers.import_phones(request, fmt="csv", replace=replace))
+    if isinstance(response, dict):
+        return 200, response
+    return response.status_code, json.loads(response.body)
+
+
+@pytest.mark.parametrize(
+    "headers",
+    [{}, {"Authorization": "Bearer wrong"}, {"Authorization": f"Basic {TOKEN}"}],
+)
+def test_import_requires_admin_token(registry, headers):
+    status, _ = call(BODY, headers, replace=True)
+
+    assert status == 401
+    assert len(registry) == 0
+
+
+def test_import_is_disabled_without_token(registry, monkeypatch):
+    monkeypatch.setattr(routers, "settings", Settings(PHONE_IMPORT_TOKEN=""))
+
+    status, _ = call(BODY, {"Authorization": "Bearer "})
+
+    assert status == 403
+
+
+@pytest.mark.parametrize("content_length", [True, False])
+def test_import_rejects_large_body(registry, content_length):
+    body = b"phone\n" + b"+79991234567\n" * 10
+    headers = {"Authorization": f"Bearer {TOKEN}"}
+    if content_length:
+        headers["Content-Length"] = str(len(body))
+
+    status, _ = call(body, headers)
+
+    assert status == 413
+    assert len(registry) == 0
+
+
+def test_import_with_token(registry, caplog):
+    caplog.set_level("INFO", logger=routers.logger.name)
+
+    status, result = call(BODY, {"Authorization": f"Bearer {TOKEN}"})
+
+    assert status == 200
+    assert result["imported"] == 2
+    assert len(registry) == 2
+    assert "Imported 2 phones" in caplog.text and "10.0.0.5" in caplog.text
@@ -0,0 +1,67 @@
+from api_routes.parse_utills import (
+    _wrap_line,
+    continuation_header,
+    markdown_error,
+    order_message_chunks,
+    split_message,
+    telegram_length,
+)
+from api_routes.py_models import OrderMessage
+from benchmarks.payloads import make_order
+
+
+def test_short_text_is_one_message():
+    text = "Заказ №: *1*\nСостав заказа"
+    assert list(split_message(text, limit=100)) == [text]
+
+
+def test_split_at_line_boundaries_with_continuation():
+    lines = [f"▫️ *Позиция {number}* (х1) — 590 ₽" for number in range(40)]
+    chunks = list(split_message("\n".join(lines), limit=200, continuation="Продолжение\n"))
+
+    assert len(chunks) > 1
+    assert all(telegram_length(chunk) <= 200 for chunk in chunks)
+    assert all(chunk.startswith("Продолжение\n") for chunk in chunks[1:])
+    rejoined = [chunks[0]] + [chunk[len("Продолжение\n"):] for chunk in chunks[1:]]
+    assert "\n".join(rejoined).split("\n") == lines
+
+
+def test_blank_lines_at_boundary_are_dropped():
+    text = "a" * 10 + "\n\n\n" + "b" * 10
+    assert list(split_message(text, limit=12)) == ["a" * 10, "b" * 10]
+
+
+def test_long_line_is_cut_at_spaces_and_reopens_bold():
+    line = "*" + "жирный текст " * 20 + "конец*"
+    chunks = list(_wrap_line(line, 30))
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert telegram_length(chunk) <= 30
+        assert markdown_error(chunk) is None
+        assert chunk.startswith("*") and chunk.endswith("*")
+
+
+def test_long_line_keeps_escapes_and_links_whole():
+    line = "\\*" * 30 + " [ссылка на заказ](https://example.com/orders/1) " + "_курсив_ " * 10
+    chunks = list(_wrap_line(line, 60))
+
+    assert all(telegram_length(chunk) <= 60 for chunk in chunks)
+    assert all(markdown_error(chunk) is None for chunk in chunks)
+    assert not any(chunk.endswith("\\") for chunk in chunks)
+    assert any("[ссылка на заказ](https://example.com/orders/1)" in chunk for chunk in chunks)
+
+
+def test_emoji_counts_as_two_utf16_units():
+    chunks = list(_wrap_line("😀" * 25, 10))
+    assert [telegram_length(chunk) for chunk in chunks] == [10] * 5
+
+
+def test_order_chunks_fit_limit_and_start_with_header():
+    order = OrderMessage.model_validate(make_order(products=120, additions=3))
+    header = continuation_header(order)
+    chunks = list(order_message_chunks(order, limit=1000))
+
+    assert len(chunks) > 1
+    assert all(telegram_length(chunk) <= 1000 for chunk in chunks)
+    assert all(chunk.startswith(header) for chunk in chunks[1:])
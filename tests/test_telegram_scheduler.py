@@ -0,0 +1,149 @@
+import asyncio
+from types import SimpleNamespace
+
+import aiohttp
+import pytest
+
+from src.core import telegram_scheduler as scheduler_module
+from src.core.settings import Settings
+from src.core.telegram_scheduler import TelegramScheduler
+
+URL = "https://api.telegram.org/bottest/"
+
+CONFIG = Settings(
+    TELEGRAM_MAX_RETRIES=3,
+    TELEGRAM_RETRY_BACKOFF=0,
+    TELEGRAM_GLOBAL_RATE=1000,
+    TELEGRAM_GLOBAL_BURST=1000,
+    TELEGRAM_CHAT_RATE=1000,
+    TELEGRAM_CHAT_BURST=1000,
+)
+
+
+def connector_error() -> aiohttp.ClientConnectorError:
+    key = SimpleNamespace(host="api.telegram.org", port=443, ssl=True)
+    return aiohttp.ClientConnectorError(key, ConnectionRefusedError(111, "Connection refused"))
+
+
+class FakeResponse:
+    def __init__(self, status: int, delay: float = 0):
+        self.status = status
+        self._delay = delay
+
+    async def __aenter__(self):
+        await asyncio.sleep(self._delay)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return None
+
+    async def text(self) -> str:
+        if self.status == 429:
+            return '{"ok": false, "parameters": {"retry_after": 0}}'
+        return '{"ok": %s}' % ("true" if self.status == 200 else "false")
+
+
+class FakeSession:
+    """Отвечает на запросы по сценарию: статус или исключение на каждый вызов."""
+
+    def __init__(self, outcomes=(), delays=None):
+        self.outcomes = list(outcomes)
+        self.delays = delays or {}
+        self.calls = []
+
+    def post(self, url, json=None, data=None):
+        self.calls.append((url.rsplit("/", 1)[-1], json))
+        outcome = self.outcomes.pop(0) if self.outcomes else 200
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return FakeResponse(outcome, self.delays.get((json or {}).get("n"), 0))
+
+
+@pytest.fixture
+def session(monkeypatch):
+    session = FakeSession()
+    monkeypatch.setattr(scheduler_module, "http_client", SimpleNamespace(session=session))
+    return session
+
+
+async def call(method: str, chat_id=1, **payload):
+    scheduler = TelegramScheduler(CONFIG)
+    try:
+        return await scheduler.request(chat_id, URL + method, json=payload)
+    finally:
+        await scheduler.close()
+
+
+@pytest.mark.parametrize(
+    "method, outcomes, status, calls",
+    [
+        # 5xx: новое сообщение могло уйти, правку и удаление повторяем
+        ("sendMessage", [502], 502, 1),
+        ("editMessageText", [502, 200], 200, 2),
+        ("deleteMessage", [500, 500, 200], 200, 3),
+        # 429: запрос не выполнен, повтор безопасен для любого метода
+        ("sendMessage", [429, 200], 200, 2),
+        ("editMessageText", [429, 429, 200], 200, 3),
+        # Соединение не установлено: запрос не ушёл
+        ("sendMessage", [connector_error(), 200], 200, 2),
+        # Повторы ограничены TELEGRAM_MAX_RETRIES, отдаётся последний ответ
+        ("editMessageText", [502, 502, 502, 502], 502, 4),
+        ("sendMessage", [429, 429, 429, 429], 429, 4),
+        ("sendMessage", [400], 400, 1),
+    ],
+)
+def test_retry_classification(session, method, outcomes, status, calls):
+    session.outcomes = outcomes
+
+    result = asyncio.run(call(method))
+
+    assert result.status == status
+    assert len(session.calls) == calls
+
+
+@pytest.mark.parametrize(
+    "error",
+    [aiohttp.ServerDisconnectedError(), asyncio.TimeoutError()],
+)
+def test_send_is_not_retried_after_write_error(session, error):
+    session.outcomes = [error, 200]
+
+    with pytest.raises(type(error)):
+        asyncio.run(call("sendMessage"))
+    assert len(session.calls) == 1
+
+
+@pytest.mark.parametrize(
+    "error",
+    [aiohttp.ServerDisconnectedError(), asyncio.TimeoutError()],
+)
+def test_edit_is_retried_after_write_error(session, error):
+    session.outcomes = [error, 200]
+
+    assert asyncio.run(call("editMessageText")).status == 200
+    assert len(session.calls) == 2
+
+
+def test_chat_requests_run_in_order(session):
+    # Первый запрос отвечает дольше второго, но второй ждёт его
+    session.delays = {0: 0.05}
+
+    async def scenario():
+        scheduler = TelegramScheduler(CONFIG)
+        finished = []
+
+        async def request(n, chat_id):
+            await scheduler.request(chat_id, URL + "sendMessage", json={"n": n})
+            finished.append(n)
+
+        try:
+            await asyncio.gather(request(0, "@orders"), request(1, "@orders"), request(2, 7))
+        finally:
+            await scheduler.close()
+        return finished
+
+    finished = asyncio.run(scenario())
+
+    assert [payload["n"] for _, payload in session.calls] == [0, 2, 1]
+    # Другой чат не ждёт медленный запрос, свой — ждёт
+    assert finished.index(2) < finished.index(0) < finished.index(1)